@@ -7,14 +7,17 @@ from ..tools import (
     #bash_tool,
     #python_code_tool,
     browser_tool,
-    python_repl_tool
+    python_repl_tool,
+    read_page_tool
 )
+from ..tools.kernel_pool import get_kernel_pool
 from .llm import get_llm_by_type
 
 logger = logging.getLogger(__name__)
 
 
 async def get_coder_agent(llm_type: Literal["basic", "reasoning", "economic", "coding"], llm_configs: Optional[Dict[str, Any]] = None):
+    get_kernel_pool() # start the kernels warming while the model plans its first step
     tools = [python_repl_tool]
     coder_llm = get_llm_by_type(llm_type, llm_configs)
     return create_react_agent(
@@ -29,6 +32,6 @@ async def get_browser_agent(llm_type: Literal["basic", "reasoning", "economic",
     browser_llm = get_llm_by_type(llm_type, llm_configs)
     browser_agent = create_react_agent(
         browser_llm,
-        tools=[browser_tool],
+        tools=[read_page_tool, browser_tool],
     )
     return browser_agent
\ No newline at end of file
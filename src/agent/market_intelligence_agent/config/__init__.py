@@ -13,6 +13,8 @@ from .env import (
     CODING_MODEL_PROVIDER,
     # Vision-language LLM
     CHROME_INSTANCE_PATH,
+    BROWSER_MAX_CONTEXTS,
+    SEC_USER_AGENT,
 )
 
 # Team configuration
@@ -34,4 +36,6 @@ __all__ = [
     # Other configurations
     "TEAM_MEMBERS",
     "CHROME_INSTANCE_PATH",
+    "BROWSER_MAX_CONTEXTS",
+    "SEC_USER_AGENT",
 ]
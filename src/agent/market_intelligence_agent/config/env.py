@@ -19,6 +19,9 @@ CODING_MODEL = os.getenv("CODING_MODEL", "o4-mini")
 CODING_MODEL_PROVIDER = os.getenv("CODING_MODEL_PROVIDER", "OPENAI")
 
 CHROME_INSTANCE_PATH = os.getenv("CHROME_INSTANCE_PATH", None)
+BROWSER_MAX_CONTEXTS = int(os.getenv("BROWSER_MAX_CONTEXTS", "3"))
+# SEC EDGAR rejects requests whose User-Agent lacks a company name and contact email
+SEC_USER_AGENT = os.getenv("SEC_USER_AGENT", None)
 
 # Budget configuration
 BUDGET = os.getenv("BUDGET", "low")
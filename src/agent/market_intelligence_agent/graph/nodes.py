@@ -44,6 +44,14 @@ def _get_llm_configs_from_state(state: State) -> Optional[Dict[str, Any]]:
         logger.warning("llm_configs not found or invalid in state. LLM creation will use defaults.")
         return None
 
+# Tool servers run with only HOME, PATH etc. besides the `env` given to them, so settings read by
+# the shared tool modules have to be passed explicitly. LANGALPHA_CACHE_DIR must match the
+# directory the coder's kernels (which inherit this process's environment) load artifacts from.
+def _server_env(**env: Optional[str]) -> Dict[str, str]:
+    """Environment for an MCP tool server: `env` plus the cache directory and <PROVIDER>_RATE_LIMIT overrides."""
+    shared = {k: v for k, v in os.environ.items() if k.endswith("_RATE_LIMIT") or k == "LANGALPHA_CACHE_DIR"}
+    return {**shared, **{k: v for k, v in env.items() if v is not None}}
+
 async def research_node(state: State) -> Command[Literal["supervisor"]]:
     """Research node that performs research tasks with proper resource management."""
     agent_llm_map = _get_map_from_state(state)
@@ -57,11 +65,13 @@ async def research_node(state: State) -> Command[Literal["supervisor"]]:
                 "command": "python",
                 "args": [str(source_dir / "tools" / "tavily.py")],
                 "transport": "stdio",
+                "env": _server_env(),
             },
             "tickertick": {
                 "command": "python",
                 "args": [str(source_dir / "tools" / "tickertick.py")],
                 "transport": "stdio",
+                "env": _server_env(),
             }
         }
     ) as client:
@@ -122,19 +132,19 @@ async def market_node(state: State) -> Command[Literal["supervisor"]]:
                 "command": "python",
                 "args": [str(source_dir / "tools" / "market_data.py")],
                 "transport": "stdio",
-                "env": {"POLYGON_API_KEY": polygon_api_key}
+                "env": _server_env(POLYGON_API_KEY=polygon_api_key)
             },
             "fundamental_data": {
                 "command": "python",
                 "args": [str(source_dir / "tools" / "fundamental_data.py")],
                 "transport": "stdio",
-                "env": {"ALPHA_VANTAGE_API_KEY": alpha_vantage_api_key}
+                "env": _server_env(ALPHA_VANTAGE_API_KEY=alpha_vantage_api_key)
             },
             "fundamental_data_fmp": {
                 "command": "python",
                 "args": [str(source_dir / "tools" / "fundamental_data_fmp.py")],
                 "transport": "stdio",
-                "env": {"FINANCIALMODELINGPREP_API_KEY": financialmodelingprep_api_key}
+                "env": _server_env(FINANCIALMODELINGPREP_API_KEY=financialmodelingprep_api_key)
             }
         }
     ) as client:
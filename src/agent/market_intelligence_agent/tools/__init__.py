@@ -1,9 +1,11 @@
 #from .code_tool import python_code_tool, bash_tool
 from .browser import browser_tool
+from .page_cache import read_page_tool
 from .python_repl import python_repl_tool
 __all__ = [
     #"bash_tool",
     #"python_code_tool",
     "browser_tool",
+    "read_page_tool",
     "python_repl_tool"
 ]
@@ -0,0 +1,110 @@
+"""
+Shared store of DataFrame artifacts handed from the data tools to the coder's Python kernels.
+
+A tool that produces a table (price bars, statements) saves it here as an uncompressed Arrow
+IPC file and returns a short handle instead of (or next to) the rows themselves. The coder
+agent's kernels load the table by handle with `load_artifact`, so the data never passes
+through a model message and is not fetched twice. `load_artifact_table` memory-maps the file,
+so its Arrow buffers are backed by the page cache rather than copied onto the heap;
+`load_artifact` converts that table to pandas.
+
+Handles are '<name>-<content hash>', so registering the same data twice yields the same file.
+Artifacts live under CACHE_DIR/artifacts (shared by every tool server and kernel process) and
+are removed ARTIFACT_TTL_DAYS after they were last written.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+from disk_cache import CACHE_DIR, DiskCache
+
+ARTIFACT_DIR = CACHE_DIR / "artifacts"
+ARTIFACT_TTL_DAYS = 7
+ARTIFACT_SUFFIX = ".arrow"
+PREVIEW_ROWS = 3
+
+_manifest = DiskCache("artifacts")
+_purged = False
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")[:60] or "artifact"
+
+
+def _purge_expired():
+    global _purged
+    if _purged:
+        return
+    _purged = True
+    cutoff = time.time() - ARTIFACT_TTL_DAYS * 86400
+    for path in ARTIFACT_DIR.glob(f"*{ARTIFACT_SUFFIX}"):
+        if path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+    _manifest.purge(ARTIFACT_TTL_DAYS * 86400)
+
+
+def save_artifact(frame: pd.DataFrame, name: str, source: Optional[str] = None, description: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Store a DataFrame (index included) as an Arrow artifact and return its manifest entry.
+
+    The entry has 'handle' (what `load_artifact` takes), 'rows', 'columns', 'source',
+    'description' and a small 'preview' of the first rows, suitable for a tool response.
+    """
+    _purge_expired()
+    table = pa.Table.from_pandas(frame, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer: # uncompressed, so readers can map it
+        writer.write_table(table)
+    data = sink.getvalue()
+    handle = f"{_slug(name)}-{hashlib.sha1(data.to_pybytes()).hexdigest()[:10]}"
+    path = ARTIFACT_DIR / f"{handle}{ARTIFACT_SUFFIX}"
+    if path.exists():
+        os.utime(path) # still in use: restart its retention period
+    else:
+        ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path) # readers never see a partial file
+    entry = {
+        "handle": handle,
+        "rows": len(frame),
+        "columns": [str(c) for c in frame.columns],
+        "source": source,
+        "description": description,
+        "preview": json.loads(frame.head(PREVIEW_ROWS).reset_index().to_json(orient="records", date_format="iso")),
+    }
+    _manifest.set(handle, entry)
+    return entry
+
+
+def _path(handle: str):
+    path = ARTIFACT_DIR / f"{handle}{ARTIFACT_SUFFIX}"
+    if not path.exists():
+        raise KeyError(f"Unknown or expired artifact '{handle}'; see list_artifacts()")
+    return path
+
+
+def load_artifact_table(handle: str) -> pa.Table:
+    """The artifact as an Arrow table whose buffers are memory-mapped from its file (no copy)."""
+    return pa.ipc.open_file(pa.memory_map(str(_path(handle)))).read_all()
+
+
+def load_artifact(handle: str) -> pd.DataFrame:
+    """The artifact as the DataFrame that was saved (index restored)."""
+    return load_artifact_table(handle).to_pandas(split_blocks=True)
+
+
+def list_artifacts(limit: int = 50) -> List[Dict[str, Any]]:
+    """Manifest entries of the most recently written artifacts, newest first (without previews)."""
+    entries = _manifest.latest(limit).values()
+    return [
+        {k: v for k, v in e.value.items() if k != "preview"}
+        for e in entries if (ARTIFACT_DIR / f"{e.value['handle']}{ARTIFACT_SUFFIX}").exists()
+    ]
@@ -1,23 +1,229 @@
 import asyncio
+import atexit
+import contextlib
+import re
+import signal
+import threading
+import time
 
 from pydantic import BaseModel, Field
-from typing import Optional, ClassVar, Type
+from typing import Dict, List, Optional, ClassVar, Tuple, Type
+from urllib.parse import urlsplit
 from langchain.tools import BaseTool
 from langchain_openai import ChatOpenAI
 from browser_use import AgentHistoryList, Browser, BrowserConfig
 from browser_use import Agent as BrowserAgent
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
 from ..tools.decorators import create_logged_tool
-from ..config import CHROME_INSTANCE_PATH
+from ..config import BROWSER_MAX_CONTEXTS, CHROME_INSTANCE_PATH
 
 import os
 
-expected_browser = None
-chrome_instance_path = CHROME_INSTANCE_PATH
-if chrome_instance_path:
-    expected_browser = Browser(
-        config=BrowserConfig(chrome_instance_path=chrome_instance_path)
-    )    
+BROWSER_MODEL = "gpt-4.1"
+CONTEXT_IDLE_SECONDS = 10 * 60 # idle contexts are closed after this long
+PAGE_LOAD_TIMEOUT_MS = 30000
 
+_DOMAIN_RE = re.compile(r"\b(?:https?://)?((?:[a-z0-9-]+\.)+[a-z]{2,})(?=[/\s:'\",)]|$)", re.IGNORECASE)
+
+
+def _domain(text: Optional[str]) -> Optional[str]:
+    """Host of the first URL or domain name in an instruction or page URL, without 'www.'."""
+    if not text:
+        return None
+    host = urlsplit(text).hostname if text.startswith(("http://", "https://")) else None
+    if host is None:
+        match = _DOMAIN_RE.search(text)
+        host = match.group(1).lower() if match else None
+    return host[4:] if host and host.startswith("www.") else host
+
+
+class _PooledContext:
+    def __init__(self, context: BrowserContext):
+        self.context = context
+        self.domain: Optional[str] = None # site of the page the last task ended on
+        self.last_used = time.monotonic()
+        self.busy = False
+
+
+class BrowserPool:
+    """
+    One browser with up to `max_contexts` reusable contexts, bound to the event loop it runs on.
+
+    Each task borrows a context for its duration. Contexts are kept open between tasks (with
+    their cookies, cache and tabs), and a task naming a site goes to the idle context that last
+    ended on that site, so follow-up steps on the same domain start from a warm page. At most
+    `max_contexts` tasks run at once; more wait for a context to come back.
+    """
+
+    def __init__(self, max_contexts: int = BROWSER_MAX_CONTEXTS):
+        self.max_contexts = max_contexts
+        self.loop = asyncio.get_running_loop()
+        if CHROME_INSTANCE_PATH:
+            self.browser = Browser(config=BrowserConfig(chrome_instance_path=CHROME_INSTANCE_PATH))
+        else:
+            self.browser = Browser(config=BrowserConfig(headless=True))
+        self._contexts: List[_PooledContext] = []
+        self._available = asyncio.Condition()
+
+    async def _acquire(self, domain: Optional[str]) -> _PooledContext:
+        async with self._available:
+            while True:
+                await self._close_idle()
+                idle = [c for c in self._contexts if not c.busy]
+                chosen = next((c for c in idle if domain and c.domain == domain), None)
+                if chosen is None and len(self._contexts) < self.max_contexts:
+                    chosen = _PooledContext(BrowserContext(browser=self.browser, config=BrowserContextConfig()))
+                    self._contexts.append(chosen)
+                if chosen is None and idle:
+                    chosen = max(idle, key=lambda c: c.last_used)
+                if chosen is not None:
+                    chosen.busy = True
+                    return chosen
+                await self._available.wait()
+
+    async def _release(self, pooled: _PooledContext, broken: bool = False):
+        if broken:
+            await self._close_context(pooled)
+        else:
+            try:
+                pooled.domain = _domain((await pooled.context.get_current_page()).url)
+            except Exception:
+                pooled.domain = None
+        async with self._available:
+            pooled.busy = False
+            pooled.last_used = time.monotonic()
+            if broken:
+                self._contexts.remove(pooled)
+            self._available.notify()
+
+    async def _close_idle(self):
+        cutoff = time.monotonic() - CONTEXT_IDLE_SECONDS
+        for pooled in [c for c in self._contexts if not c.busy and c.last_used < cutoff]:
+            self._contexts.remove(pooled)
+            await self._close_context(pooled)
+
+    @staticmethod
+    async def _close_context(pooled: _PooledContext):
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass
+
+    async def run(self, instruction: str, llm) -> AgentHistoryList:
+        """Run a browser-use agent for the instruction in a pooled context."""
+        pooled = await self._acquire(_domain(instruction))
+        broken = False
+        try:
+            agent = BrowserAgent(task=instruction, llm=llm, browser=self.browser, browser_context=pooled.context)
+            return await agent.run()
+        except Exception:
+            broken = True
+            raise
+        finally:
+            await self._release(pooled, broken)
+
+    async def fetch_html(self, url: str) -> Tuple[str, Dict[str, str], str]:
+        """Render a page in a new tab of a pooled context; returns (html, response headers, final URL)."""
+        pooled = await self._acquire(_domain(url))
+        broken = False
+        try:
+            try:
+                session = await pooled.context.get_session()
+                page = await session.context.new_page()
+            except Exception:
+                broken = True
+                raise
+            try: # a page that fails to load leaves the context usable
+                response = await page.goto(url, wait_until="networkidle", timeout=PAGE_LOAD_TIMEOUT_MS)
+                return await page.content(), (await response.all_headers() if response else {}), page.url
+            finally:
+                await page.close()
+        finally:
+            await self._release(pooled, broken)
+
+    async def close(self):
+        async with self._available:
+            for pooled in self._contexts:
+                await self._close_context(pooled)
+            self._contexts.clear()
+        await self.browser.close()
+
+
+_pools: Dict[asyncio.AbstractEventLoop, BrowserPool] = {}
+_llm: Optional[ChatOpenAI] = None
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_loop_lock = threading.Lock()
+
+
+def _kill_driver(pool: BrowserPool):
+    """
+    Kill the Playwright driver of a pool whose event loop is closed (its browser can no longer be
+    closed normally). A browser launched by the driver exits with it.
+    """
+    try:
+        process = pool.browser.playwright._impl_obj._connection._transport._proc
+    except AttributeError: # browser never started, or already stopped
+        return
+    with contextlib.suppress(ProcessLookupError):
+        os.kill(process.pid, signal.SIGKILL)
+
+
+def _discard_stale_pools():
+    for loop in [l for l in _pools if l.is_closed()]:
+        _kill_driver(_pools.pop(loop))
+
+
+def get_browser_pool() -> BrowserPool:
+    """The browser pool of the running event loop, started on first use."""
+    loop = asyncio.get_running_loop()
+    _discard_stale_pools()
+    if loop not in _pools:
+        _pools[loop] = BrowserPool()
+    return _pools[loop]
+
+
+@atexit.register
+def _shutdown_pools():
+    """Close every pool's browser and Playwright driver when the process exits."""
+    _discard_stale_pools()
+    for loop, pool in list(_pools.items()):
+        try:
+            if loop.is_running(): # e.g. the shared background loop of synchronous callers
+                asyncio.run_coroutine_threadsafe(pool.close(), loop).result(timeout=10)
+            else:
+                loop.run_until_complete(asyncio.wait_for(pool.close(), timeout=10))
+        except Exception:
+            _kill_driver(pool)
+    _pools.clear()
+
+
+def _browser_llm() -> ChatOpenAI:
+    global _llm
+    if _llm is None:
+        _llm = ChatOpenAI(model=BROWSER_MODEL, api_key=os.getenv("OPENAI_API_KEY"))
+    return _llm
+
+
+def _sync_runner_loop() -> asyncio.AbstractEventLoop:
+    """Event loop in a daemon thread that synchronous callers share, so their browser stays warm too."""
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="browser-pool", daemon=True).start()
+    return _sync_loop
+
+
+async def _run_instruction(instruction: str) -> str:
+    try:
+        result = await get_browser_pool().run(instruction, _browser_llm())
+        return (
+            str(result)
+            if not isinstance(result, AgentHistoryList)
+            else result.final_result()
+        )
+    except Exception as e:
+        return f"Error executing browser task: {str(e)}"
 
 
 class BrowserUseInput(BaseModel):
@@ -33,44 +239,13 @@ class BrowserTool(BaseTool):
         "Use this tool to interact with web browsers. Input should be a natural language description of what you want to do with the browser, such as 'Go to google.com and search for browser-use', or 'Navigate to Reddit and find the top post about AI'."
     )
 
-    _agent: Optional[BrowserAgent] = None
-
     def _run(self, instruction: str) -> str:
-        """Run the browser task synchronously."""
-        self._agent = BrowserAgent(
-            task=instruction,  # Will be set per request
-            llm=ChatOpenAI(model="gpt-4.1", api_key=os.getenv("OPENAI_API_KEY")),
-            browser=expected_browser,
-        )
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                result = loop.run_until_complete(self._agent.run())
-                return (
-                    str(result)
-                    if not isinstance(result, AgentHistoryList)
-                    else result.final_result
-                )
-            finally:
-                loop.close()
-        except Exception as e:
-            return f"Error executing browser task: {str(e)}"
+        """Run the browser task synchronously, on the shared background loop."""
+        return asyncio.run_coroutine_threadsafe(_run_instruction(instruction), _sync_runner_loop()).result()
 
     async def _arun(self, instruction: str) -> str:
-        """Run the browser task asynchronously."""
-        self._agent = BrowserAgent(
-            task=instruction, llm=create_basic_llm(model="gpt-4.1", provider="OPENAI")  # Will be set per request
-        )
-        try:
-            result = await self._agent.run()
-            return (
-                str(result)
-                if not isinstance(result, AgentHistoryList)
-                else result.final_result
-            )
-        except Exception as e:
-            return f"Error executing browser task: {str(e)}"
+        """Run the browser task asynchronously, on the caller's event loop."""
+        return await _run_instruction(instruction)
 
 
 BrowserTool = create_logged_tool(BrowserTool)
@@ -0,0 +1,142 @@
+"""
+SQLite-backed payload cache shared by the tool servers.
+
+Each cache is one database file under CACHE_DIR holding JSON values by string key, together
+with the time they were fetched and an optional tag (e.g. the fiscal period a payload
+covers). Freshness policy is left to the callers; the store only records what was written
+and when. Entries therefore survive across the short-lived MCP server processes.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, NamedTuple, Optional
+
+CACHE_DIR = Path(os.getenv('LANGALPHA_CACHE_DIR', Path.home() / '.cache' / 'langalpha'))
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    fetched_at: float
+    tag: Optional[str]
+
+
+class DiskCache:
+    """Key/value store of JSON payloads with fetch timestamps, safe across threads and processes."""
+
+    def __init__(self, name: str, directory: Path = CACHE_DIR):
+        self.name = name
+        self.path = Path(directory) / f"{name}.sqlite"
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0}
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    @contextmanager
+    def _connection(self):
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    with sqlite3.connect(self.path, timeout=30) as conn:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS entries ("
+                            "key TEXT PRIMARY KEY, value TEXT NOT NULL, fetched_at REAL NOT NULL, tag TEXT)"
+                        )
+                    conn.close()
+                    self._ready = True
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._connection() as conn:
+            row = conn.execute("SELECT value, fetched_at, tag FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return CacheEntry(json.loads(row[0]), row[1], row[2])
+
+    def set(self, key: str, value: Any, tag: Optional[str] = None, fetched_at: Optional[float] = None):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, fetched_at, tag) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), fetched_at or time.time(), tag),
+            )
+        self.stats["writes"] += 1
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        """Entries of the given keys that exist, in one query."""
+        keys = list(keys)
+        found: Dict[str, CacheEntry] = {}
+        with self._connection() as conn:
+            for i in range(0, len(keys), 500): # stay under SQLite's bound-parameter limit
+                chunk = keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT key, value, fetched_at, tag FROM entries WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((k, CacheEntry(json.loads(v), t, tag)) for k, v, t, tag in rows)
+        self.stats["hits"] += len(found)
+        self.stats["misses"] += len(keys) - len(found)
+        return found
+
+    def set_many(self, values: Dict[str, Any], tag: Optional[str] = None):
+        """Write several entries in one transaction."""
+        now = time.time()
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, fetched_at, tag) VALUES (?, ?, ?, ?)",
+                [(k, json.dumps(v), now, tag) for k, v in values.items()],
+            )
+        self.stats["writes"] += len(values)
+
+    def latest(self, limit: int) -> Dict[str, CacheEntry]:
+        """The `limit` most recently written entries, newest first."""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT key, value, fetched_at, tag FROM entries ORDER BY fetched_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return {k: CacheEntry(json.loads(v), t, tag) for k, v, t, tag in rows}
+
+    def claim(self, key: str, ttl: float) -> bool:
+        """
+        Write a marker entry for `key` unless one younger than `ttl` seconds exists, atomically
+        across processes. Returns whether this caller now holds the claim; release it with `delete`.
+        """
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ? AND fetched_at < ?", (key, now - ttl))
+            return conn.execute(
+                "INSERT OR IGNORE INTO entries (key, value, fetched_at, tag) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(os.getpid()), now, "claim"),
+            ).rowcount == 1
+
+    def delete(self, key: str):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def purge(self, older_than: float) -> int:
+        """Delete entries fetched more than `older_than` seconds ago. Returns the number removed."""
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM entries WHERE fetched_at < ?", (time.time() - older_than,)).rowcount
+
+    def summary(self) -> Dict[str, Any]:
+        """Entry count, on-disk size, fetch-time range and this process's hit/miss counters."""
+        with self._connection() as conn:
+            count, oldest, newest = conn.execute("SELECT COUNT(*), MIN(fetched_at), MAX(fetched_at) FROM entries").fetchone()
+        iso = lambda ts: time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(ts)) if ts else None
+        return {
+            "cache": self.name,
+            "entries": count,
+            "size_bytes": sum(p.stat().st_size for p in self.path.parent.glob(f"{self.path.name}*")),
+            "oldest_entry": iso(oldest),
+            "newest_entry": iso(newest),
+            **self.stats,
+        }
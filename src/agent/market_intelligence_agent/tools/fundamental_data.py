@@ -1,16 +1,30 @@
 from __future__ import annotations
 from datetime import date, datetime
-from typing import Dict, Any, List, Sequence, Union, Optional
+from typing import Callable, Dict, Any, List, NamedTuple, Sequence, Union, Optional
 import os
 import requests
 import csv
+import functools
+from bisect import bisect_left, bisect_right
+from itertools import chain, compress
+from operator import itemgetter
+import numpy as np
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from math import isnan
 from statistics import mean
 from mcp.server.fastmcp import FastMCP
+from rate_limiter import ThrottledError, TransientError, call_with_retry, get_limiter_stats, raise_for_throttle
+from disk_cache import DiskCache
+from output_governor import get_output_stats, govern_output
+from transcript_index import BM25Index, chunk_transcript
 
 # Setup
 load_dotenv()
+logger = logging.getLogger(__name__)
 API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
 BASE_URL = "https://www.alphavantage.co/query"
 
@@ -23,11 +37,38 @@ if not API_KEY:
 
 # Helper functions
 
+RETRYABLE_ERRORS = (TransientError, requests.ConnectionError, requests.Timeout)
+FETCH_WORKERS = 8
+
+# One pooled session (keep-alive connections) and worker pool shared by every request in this process
+_session = requests.Session()
+_session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=FETCH_WORKERS))
+_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="alpha_vantage")
+
+
+def _is_throttle_message(message: str) -> bool:
+    """
+    True for the per-second/per-minute frequency notes. The per-minute note also quotes the daily
+    quota ("5 calls per minute and 500 calls per day"); a message naming only the daily quota
+    is not retryable.
+    """
+    message = message.lower()
+    return "per minute" in message or "per second" in message
+
 def _get(function: str, **params) -> Dict[str, Any]:
     """Call the Alpha Vantage REST endpoint and return the JSON payload."""
     params = {k: v for k, v in params.items() if v is not None}
-    params.update({"function": function, "apikey": API_KEY})
-    resp = requests.get(BASE_URL, params=params, timeout=30)
+    if function in CACHED_FUNCTIONS:
+        return _cached_get(function, params)
+    return _fetch(function, params)
+
+def _fetch(function: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    params = {**params, "function": function, "apikey": API_KEY}
+    return call_with_retry("alpha_vantage", _request_json, params, retry_on=RETRYABLE_ERRORS)
+
+def _request_json(params: Dict[str, Any]) -> Dict[str, Any]:
+    resp = _session.get(BASE_URL, params=params, timeout=30)
+    raise_for_throttle("Alpha Vantage", resp.status_code, resp.headers)
     resp.raise_for_status()
     data = resp.json()
     # Check for API error messages or notes
@@ -38,9 +79,128 @@ def _get(function: str, **params) -> Dict[str, Any]:
             if key in data and data[key]:
                 messages.append(f"{key}: {data[key]}")
         if messages:
-            raise RuntimeError(f"Alpha Vantage API message: {'; '.join(messages)}")
+            message = f"Alpha Vantage API message: {'; '.join(messages)}"
+            if _is_throttle_message(message):
+                raise ThrottledError(message)
+            raise RuntimeError(message)
     return data
 
+### Fundamentals cache
+# Statement payloads only change when a company reports, so they are kept on disk and
+# re-downloaded once the earnings calendar shows that a newer fiscal period has been reported.
+# OVERVIEW also carries price-derived fields (P/E, market cap, moving averages), so it gets
+# a one-day ceiling on top of the report-date rule.
+CACHED_FUNCTIONS = {"INCOME_STATEMENT", "BALANCE_SHEET", "CASH_FLOW", "EARNINGS", "OVERVIEW"}
+CACHE_MAX_AGE_DAYS = {"OVERVIEW": 1}
+DEFAULT_CACHE_MAX_AGE_DAYS = 100 # fallback when no report date is known (e.g. ETFs, calendar errors)
+REPORT_DATE_RECHECK_DAYS = 7
+REVALIDATE_AFTER_REPORT_HOURS = 12 # Alpha Vantage can lag a report; re-poll at most this often
+
+_fundamentals_cache = DiskCache("alpha_vantage_fundamentals")
+_cache_counters = {"fresh": 0, "stale_served": 0, "misses": 0, "revalidations": 0, "revalidation_errors": 0}
+_revalidating: set = set()
+_revalidating_lock = threading.Lock()
+_report_locks: Dict[str, threading.Lock] = {} # symbol -> lock held while its report dates are looked up
+_report_locks_lock = threading.Lock()
+
+def _latest_period(payload: Dict[str, Any]) -> Optional[str]:
+    """Most recent fiscal period contained in a statement, earnings or overview payload."""
+    dates = [
+        row.get("fiscalDateEnding", "")
+        for key in ("quarterlyReports", "annualReports", "quarterlyEarnings", "annualEarnings")
+        for row in payload.get(key, [])
+    ]
+    dates.append(payload.get("LatestQuarter") or "")
+    return max(dates) or None
+
+def _report_dates(symbol: str) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Latest passed ('last') and next ('next') earnings report of a symbol, rechecked weekly.
+
+    The calendar only lists upcoming reports, so when a recheck replaces a report date that has
+    passed, that report is kept as 'last'; otherwise a filing made between two rechecks would
+    never be noticed. Storing a payload looks the dates up too, so the report that follows it
+    is known before it drops off the calendar.
+    """
+    key = f"report:{symbol}"
+    with _report_locks_lock:
+        lock = _report_locks.setdefault(symbol, threading.Lock())
+    with lock: # statements of one symbol are checked concurrently; look the date up once
+        entry = _fundamentals_cache.get(key)
+        stored = entry.value if entry else None
+        if stored and "reportDate" in stored: # entry written before 'last' was tracked
+            stored = {"last": None, "next": stored}
+        if entry and time.time() - entry.fetched_at < REPORT_DATE_RECHECK_DAYS * 86400:
+            return stored or {"last": None, "next": None}
+        try:
+            rows = [r for r in earnings_calendar(symbol) if r.get("reportDate")]
+        except RuntimeError as e:
+            logger.warning(f"earnings calendar unavailable for {symbol}: {e}")
+            return stored or {"last": None, "next": None}
+        today = date.today().isoformat()
+        last = stored["last"] if stored else None
+        if stored and stored["next"] and stored["next"]["reportDate"] <= today:
+            last = stored["next"]
+        reports = {"last": last, "next": min(rows, key=lambda r: r["reportDate"]) if rows else None}
+        _fundamentals_cache.set(key, reports)
+        return reports
+
+def _is_fresh(function: str, symbol: str, fetched_at: float, period: Optional[str]) -> bool:
+    age_days = (time.time() - fetched_at) / 86400
+    if age_days > CACHE_MAX_AGE_DAYS.get(function, DEFAULT_CACHE_MAX_AGE_DAYS):
+        return False
+    today = date.today().isoformat()
+    passed = [r for r in _report_dates(symbol).values() if r and r["reportDate"] <= today]
+    if not passed:
+        return True
+    report = max(passed, key=lambda r: r["reportDate"])
+    # The report is out: fresh once the payload covers the reported period, or if we polled recently
+    if period and report.get("fiscalDateEnding") and period >= report["fiscalDateEnding"]:
+        return True
+    return age_days * 24 < REVALIDATE_AFTER_REPORT_HOURS
+
+def _store(key: str, symbol: str, payload: Dict[str, Any]):
+    if payload: # empty payloads are what Alpha Vantage returns for unknown symbols
+        _fundamentals_cache.set(key, payload, tag=_latest_period(payload))
+        # Note the upcoming report now: once it has passed, the calendar no longer lists it
+        _report_dates(symbol)
+
+def _revalidate(key: str, function: str, params: Dict[str, Any]):
+    try:
+        _store(key, params["symbol"], _fetch(function, params))
+        _cache_counters["revalidations"] += 1
+    except Exception as e:
+        _cache_counters["revalidation_errors"] += 1
+        logger.warning(f"revalidation of {key} failed: {e}")
+    finally:
+        with _revalidating_lock:
+            _revalidating.discard(key)
+
+def _cached_get(function: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Serve a fundamentals payload from the disk cache (stale-while-revalidate).
+
+    Fresh entries are returned directly. Stale entries are returned immediately while a
+    background refresh replaces them; only a missing entry blocks on the API.
+    """
+    key = f"{function}:{json.dumps(params, sort_keys=True)}"
+    entry = _fundamentals_cache.get(key)
+    if entry is None:
+        _cache_counters["misses"] += 1
+        payload = _fetch(function, params)
+        _store(key, params["symbol"], payload)
+        return payload
+    if _is_fresh(function, params["symbol"], entry.fetched_at, entry.tag):
+        _cache_counters["fresh"] += 1
+        return entry.value
+    _cache_counters["stale_served"] += 1
+    with _revalidating_lock:
+        schedule = key not in _revalidating
+        _revalidating.add(key)
+    if schedule:
+        _executor.submit(_revalidate, key, function, params)
+    return entry.value
+
 def _num(x: Optional[str]) -> Optional[float]:
     """Convert a string to a float, returning None for empty or invalid strings."""
     try:
@@ -48,55 +208,198 @@ def _num(x: Optional[str]) -> Optional[float]:
     except ValueError:
         return None
 
-def _parse_records(records: List[Dict[str, Any]], fields: List[str]) -> Dict[str, Dict[str, Any]]:
-    """Parse a list of records (e.g., annual reports) into a dictionary keyed by fiscal date."""
-    parsed: Dict[str, Dict[str, Any]] = {}
-    for row in records:
-        date = row.get("fiscalDateEnding")
-        if not date:
-            continue
-        entry = parsed.setdefault(date, {})
-        for f in fields:
-            if f in row:
-                entry[f] = _num(row[f])
-    return parsed
-
-
-def _compute_extras(entry: Dict[str, Any]):
-    """Add derived financial metrics like Free Cash Flow (FCF) and Net Debt to an entry."""
-    ocf = entry.get("operatingCashflow")
-    capex = entry.get("capitalExpenditures")
-    if ocf is not None and capex is not None:
-        entry["freeCashFlow"] = ocf - capex
-
-    cash = entry.get("cashAndShortTermInvestments") or entry.get("cashAndCashEquivalentsAtCarryingValue")
-    debt = 0.0
-    for dkey in ("longTermDebt", "shortTermDebt"):
-        if entry.get(dkey) is not None and not isnan(entry[dkey]): # Ensure value is not NaN
-            debt += entry[dkey]
-
-    if cash is not None and not isnan(cash): # Ensure cash is not NaN
-        entry["netDebt"] = debt - cash
-    elif debt > 0: # If no cash data but debt exists
-        entry["netDebt"] = debt
-    # If neither cash nor debt data, netDebt will not be set.
-
-def _latest_close(symbol: str) -> Optional[float]:
-    """Fetch the latest adjusted closing price for a symbol."""
+def _flat_cells(rows: List[Dict[str, Any]], fields: List[str]) -> List[Any]:
+    """Raw values of `fields` for each row, flattened row by row."""
+    getter = itemgetter(*fields)
     try:
-        data = _get("TIME_SERIES_DAILY_ADJUSTED", symbol=symbol, outputsize="compact")
-        ts = data.get("Time Series (Daily)", {})
-        if not ts:
-            return None
-        latest_date = max(ts.keys()) # Find the most recent date string
-        return float(ts[latest_date]["5. adjusted close"])
-    except RuntimeError as e:
-        print(f"API error fetching latest close for {symbol}: {e}")
+        if len(fields) == 1:
+            return list(map(getter, rows))
+        return list(chain.from_iterable(map(getter, rows)))
+    except KeyError: # some report lacks a field entirely
+        return [r.get(f) for r in rows for f in fields]
+
+
+def _to_floats(cells: List[Any]) -> np.ndarray:
+    """
+    Convert raw API values to a float array; None, "None" and empty strings become NaN.
+    `cells` is modified in place. Only inputs containing unparsable values fall back to
+    `_num` per value.
+    """
+    # numpy parses the strings itself (None already maps to NaN); the missing markers are
+    # sparse, so they are located with list.index rather than by testing every value
+    for marker in ("None", ""):
+        i = -1
+        try:
+            while True:
+                i = cells.index(marker, i + 1)
+                cells[i] = None
+        except ValueError:
+            pass
+    try:
+        return np.array(cells, dtype=float)
+    except (TypeError, ValueError):
+        return np.array([_num(v) if isinstance(v, str) else v for v in cells], dtype=float)
+
+
+_DERIVED_FIELDS = ["freeCashFlow", "netDebt"]
+
+
+def _statement_table(
+    payloads: Dict[str, Dict[str, Any]], report_key: str, earnings_key: str, earnings_fields: List[str],
+    select: Optional[Callable[[np.ndarray], Any]] = None,
+) -> tuple:
+    """
+    Merge one period type (annual or quarterly) of the statement payloads into a float matrix.
+
+    Returns (dates, names, matrix): fiscal dates sorted newest first, the field names and a
+    [date x field] matrix with NaN for missing values. Dates are the union of the income
+    statement, balance sheet and cash flow reports; earnings fields are only attached to dates
+    those reports already cover, so EPS alone never creates a sparse period. `select` maps the
+    sorted dates to the rows to keep (an index or boolean mask); only the reports of kept dates
+    are parsed, which is most of the cost. Values are parsed in one pass and derived metrics
+    (free cash flow, net debt) are added vectorized.
+    """
+    sources = []
+    for name, key, fields in (("income_statement", report_key, _IS_FIELDS), ("balance_sheet", report_key, _BS_FIELDS),
+                              ("cash_flow", report_key, _CF_FIELDS), ("earnings", earnings_key, earnings_fields)):
+        records = payloads[name].get(key, [])
+        sources.append((records, [r.get("fiscalDateEnding") for r in records], fields))
+    dates = np.array(sorted(set().union(*(keys for _, keys, _ in sources[:3])) - {None, ""}, reverse=True), dtype=object)
+    if select is not None:
+        dates = dates[select(dates)]
+    position = {d: i for i, d in enumerate(dates.tolist())}
+    # Earnings dates without a report, and reports of dates not selected, are never parsed
+    for i, (records, keys, fields) in enumerate(sources):
+        if not position.keys() >= set(keys):
+            kept = list(map(position.__contains__, keys))
+            sources[i] = (list(compress(records, kept)), list(compress(keys, kept)), fields)
+    values = _to_floats(list(chain.from_iterable(_flat_cells(records, fields) for records, _, fields in sources)))
+    names = [f for _, _, fields in sources for f in fields] + _DERIVED_FIELDS
+
+    # Each statement fills its own block of columns; the derived columns come last
+    matrix = np.full((len(dates), len(names)), np.nan)
+    offset = column = 0
+    for records, keys, fields in sources:
+        block = values[offset:offset + len(records) * len(fields)].reshape(len(records), len(fields))
+        offset += block.size
+        matrix[np.fromiter(map(position.__getitem__, keys), np.intp, len(keys)), column:column + len(fields)] = block
+        column += len(fields)
+
+    _add_derived_columns(dict(zip(names, matrix.T)))
+    return dates, names, matrix
+
+
+def _add_derived_columns(columns: Dict[str, np.ndarray]):
+    """Fill the free cash flow and net debt columns in place (NaN where inputs are missing)."""
+    columns["freeCashFlow"][:] = columns["operatingCashflow"] - columns["capitalExpenditures"]
+    # Cash falls back to cash equivalents when short-term investments are missing or zero
+    primary = columns["cashAndShortTermInvestments"]
+    cash = np.where(~np.isnan(primary) & (primary != 0), primary, columns["cashAndCashEquivalentsAtCarryingValue"])
+    debt = sum(np.where(np.isnan(part), 0.0, part) for part in (columns["longTermDebt"], columns["shortTermDebt"]))
+    # Without cash data, net debt is the gross debt (if any)
+    columns["netDebt"][:] = np.where(~np.isnan(cash), debt - cash, np.where(debt > 0, debt, np.nan))
+
+
+def _fiscal_years(symbol: str, dates: np.ndarray) -> np.ndarray:
+    """Fiscal year of each date (-1 for malformed dates, which are reported once)."""
+    years = np.array([int(d[:4]) if d[:4].isdigit() else -1 for d in dates], dtype=int)
+    for d in dates[years < 0]:
+        print(f"[fundamental_data_from_reports WARNING {symbol}] Malformed fiscalDateEnding '{d}' in annual reports. Skipping entry.")
+    return years
+
+
+def _serialize_table(dates: np.ndarray, names: List[str], matrix: np.ndarray, columnar: bool = False):
+    """
+    Serialize a statement table: one dict per period, or one list per field.
+
+    Fields without data in any period are omitted. Other missing values are left out of the
+    period dicts and are None in the columnar lists, which have to stay aligned.
+    """
+    missing = np.isnan(matrix)
+    keep = ~missing.all(axis=0)
+    names = [n for n, k in zip(names, keep.tolist()) if k]
+    missing = missing[:, keep]
+    if columnar:
+        columns = np.where(missing, None, matrix[:, keep]).T.tolist()
+        return {"fiscalDateEnding": dates.tolist(), **dict(zip(names, columns))}
+    rows = [dict(zip(names, values), fiscalDateEnding=d) for d, values in zip(dates.tolist(), matrix[:, keep].tolist())]
+    # Missing values are sparse: build full rows, then drop their NaN cells
+    for i, j in zip(*(index.tolist() for index in np.nonzero(missing))):
+        del rows[i][names[j]]
+    return rows
+
+def _polygon_price(symbol: str) -> Optional[float]:
+    """Latest trade (or session close) from the Polygon snapshot, when a Polygon key is configured."""
+    api_key = os.getenv("POLYGON_API_KEY")
+    if not api_key:
         return None
-    except (KeyError, ValueError) as e:
-        # print(f"Error processing price data for {symbol}: {e}")
+    from polygon import RESTClient
+    snap = call_with_retry(
+        "polygon", RESTClient(api_key).get_snapshot_ticker, market_type="stocks", ticker=symbol
+    )
+    for price in (
+        getattr(snap.last_trade, "price", None),
+        getattr(snap.day, "close", None),
+        getattr(snap.prev_day, "close", None),
+    ):
+        if price: # the day bar is zero-filled before the open
+            return float(price)
+    return None
+
+def _latest_price(symbol: str) -> Optional[float]:
+    """
+    Fetch the latest price for a symbol: the Polygon snapshot if available, else GLOBAL_QUOTE.
+
+    Both are single-quote endpoints, unlike the full daily time series.
+    """
+    try:
+        price = _polygon_price(symbol)
+        if price:
+            return price
+    except Exception as e:
+        print(f"Polygon snapshot unavailable for {symbol}, falling back to GLOBAL_QUOTE: {e}")
+    try:
+        quote = _get("GLOBAL_QUOTE", symbol=symbol).get("Global Quote", {})
+        return _num(quote.get("05. price"))
+    except RuntimeError as e:
+        print(f"API error fetching latest price for {symbol}: {e}")
         return None
 
+class _RequestContext:
+    """
+    Per-request memo of the data one valuation needs, so each endpoint is fetched at most once.
+
+    Lookups are started on the shared executor as soon as they are requested (`prefetch`)
+    and later reads wait on the same future.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol.upper()
+        self._memo: Dict[Any, Any] = {}
+
+    def _submit(self, key, fn, *args):
+        if key not in self._memo:
+            self._memo[key] = _executor.submit(fn, self.symbol, *args)
+        return self._memo[key]
+
+    def prefetch(self, overview: bool = True):
+        self._submit("price", _latest_price)
+        if overview:
+            self._submit("overview", company_overview)
+
+    def price(self) -> Optional[float]:
+        return self._submit("price", _latest_price).result()
+
+    def overview(self) -> Dict[str, Any]:
+        return self._submit("overview", company_overview).result()
+
+    def reports(self, start_year: int, end_year: int) -> Dict[str, Any]:
+        # Runs inline: it fans out its four statement fetches on the executor itself
+        key = ("reports", start_year, end_year)
+        if key not in self._memo:
+            self._memo[key] = fundamental_data_from_reports(self.symbol, start_year, end_year)
+        return self._memo[key]
+
 # API Call and Calculation Functions
 
 ## Advanced Analytics
@@ -126,47 +429,49 @@ def advanced_analytics(
     return _get("ANALYTICS_FIXED_WINDOW", **params)
 
 ## Earnings
-def earnings_calendar(symbol: Optional[str] = None, horizon: str = "3month") -> List[Dict[str, Any]]:
-    """Fetches earnings calendar data, optionally for a specific symbol."""
+def _request_csv(url: str) -> requests.Response:
+    response = _session.get(url, timeout=30)
+    raise_for_throttle("Alpha Vantage", response.status_code, response.headers)
+    response.raise_for_status()
+    return response
+
+def _fetch_earnings_calendar(horizon: str) -> List[Dict[str, Any]]:
+    """Downloads the full earnings calendar for a horizon."""
     # Alpha Vantage returns CSV for this endpoint
     base_query_params = f"function=EARNINGS_CALENDAR&horizon={horizon}&apikey={API_KEY}"
     csv_url = f"{BASE_URL}?{base_query_params}"
-    if symbol:
-        csv_url += f"&symbol={symbol.upper()}"
 
     try:
-        with requests.Session() as s:
-            response = s.get(csv_url, timeout=30)
-            response.raise_for_status()
-            decoded_content = response.content.decode('utf-8')
-            
-            # Handle potential "Note:" or "Information:" messages in CSV response
-            if decoded_content.startswith(("Note:", "Information:", "{", "[")): # Check for JSON error messages too
-                try:
-                    # Attempt to parse as JSON if it looks like it (common for API limit messages)
-                    json_error = requests.utils.to_json(decoded_content)
-                    if isinstance(json_error, dict) and ("Note" in json_error or "Information" in json_error or "Error Message" in json_error):
-                         raise RuntimeError(f"Alpha Vantage API message: {json_error}")
-                except (ValueError, TypeError): # Not a JSON error, might be plain text note in CSV
-                     if decoded_content.strip().startswith("Note:") or decoded_content.strip().startswith("Information:"):
-                        raise RuntimeError(f"Alpha Vantage API message: {decoded_content.strip()}")
-                # If not identifiable as an error, proceed assuming it's CSV data
-
-
-            csv_reader = csv.DictReader(decoded_content.splitlines())
-            json_array = []
-            for row in csv_reader:
-                # Ensure all expected keys are present, providing defaults if not.
-                json_object = {
-                    "symbol": row.get("symbol"),
-                    "name": row.get("name"),
-                    "reportDate": row.get("reportDate"),
-                    "fiscalDateEnding": row.get("fiscalDateEnding"),
-                    "estimate": _num(row.get("estimate")), # Use _num for safe conversion
-                    "currency": row.get("currency")
-                }
-                json_array.append(json_object)
-            return json_array
+        response = call_with_retry("alpha_vantage", _request_csv, csv_url, retry_on=RETRYABLE_ERRORS)
+        decoded_content = response.content.decode('utf-8')
+        
+        # Handle potential "Note:" or "Information:" messages in CSV response
+        if decoded_content.startswith(("Note:", "Information:", "{", "[")): # Check for JSON error messages too
+            try:
+                # Attempt to parse as JSON if it looks like it (common for API limit messages)
+                json_error = requests.utils.to_json(decoded_content)
+                if isinstance(json_error, dict) and ("Note" in json_error or "Information" in json_error or "Error Message" in json_error):
+                     raise RuntimeError(f"Alpha Vantage API message: {json_error}")
+            except (ValueError, TypeError): # Not a JSON error, might be plain text note in CSV
+                 if decoded_content.strip().startswith("Note:") or decoded_content.strip().startswith("Information:"):
+                    raise RuntimeError(f"Alpha Vantage API message: {decoded_content.strip()}")
+            # If not identifiable as an error, proceed assuming it's CSV data
+
+
+        csv_reader = csv.DictReader(decoded_content.splitlines())
+        json_array = []
+        for row in csv_reader:
+            # Ensure all expected keys are present, providing defaults if not.
+            json_object = {
+                "symbol": row.get("symbol"),
+                "name": row.get("name"),
+                "reportDate": row.get("reportDate"),
+                "fiscalDateEnding": row.get("fiscalDateEnding"),
+                "estimate": _num(row.get("estimate")), # Use _num for safe conversion
+                "currency": row.get("currency")
+            }
+            json_array.append(json_object)
+        return json_array
     except requests.RequestException as e:
         raise RuntimeError(f"Network or API request error for earnings calendar: {e}")
     except RuntimeError as e: # Propagate API message errors
@@ -175,12 +480,122 @@ def earnings_calendar(symbol: Optional[str] = None, horizon: str = "3month") ->
         raise RuntimeError(f"Error processing earnings calendar CSV data: {e}")
 
 
+### Earnings calendar index
+# The calendar changes at most once a day, so each horizon is downloaded in full once per day
+# and indexed by symbol and report date; symbol and date-range lookups are then served locally.
+# A calendar from a previous day is still served while a background refresh replaces it.
+_calendar_cache = DiskCache("alpha_vantage_calendar")
+
+class _CalendarIndex(NamedTuple):
+    fetched_at: float
+    rows: List[Dict[str, Any]] # sorted by reportDate
+    report_dates: List[str] # reportDate of each row, for bisection
+    by_symbol: Dict[str, List[Dict[str, Any]]]
+
+_calendar_indexes: Dict[str, _CalendarIndex] = {}
+_calendar_lock = threading.Lock()
+_calendar_refreshing: set = set()
+
+def _build_calendar_index(rows: List[Dict[str, Any]], fetched_at: float) -> _CalendarIndex:
+    rows = sorted(rows, key=lambda r: r.get("reportDate") or "")
+    by_symbol: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_symbol.setdefault((row.get("symbol") or "").upper(), []).append(row)
+    return _CalendarIndex(fetched_at, rows, [r.get("reportDate") or "" for r in rows], by_symbol)
+
+def _load_calendar(horizon: str) -> _CalendarIndex:
+    rows = _fetch_earnings_calendar(horizon)
+    fetched_at = time.time()
+    _calendar_cache.set(horizon, rows, fetched_at=fetched_at)
+    index = _calendar_indexes[horizon] = _build_calendar_index(rows, fetched_at)
+    return index
+
+def _refresh_calendar(horizon: str):
+    try:
+        _load_calendar(horizon)
+    except Exception as e:
+        logger.warning(f"background refresh of the {horizon} earnings calendar failed: {e}")
+    finally:
+        with _calendar_lock:
+            _calendar_refreshing.discard(horizon)
+
+def _calendar_index(horizon: str) -> _CalendarIndex:
+    """The indexed calendar of a horizon: from memory, then disk, downloading only if neither has it."""
+    index = _calendar_indexes.get(horizon)
+    if index is None:
+        with _calendar_lock: # concurrent first lookups share one download
+            index = _calendar_indexes.get(horizon)
+            if index is None:
+                entry = _calendar_cache.get(horizon)
+                if entry is None:
+                    return _load_calendar(horizon)
+                index = _calendar_indexes[horizon] = _build_calendar_index(entry.value, entry.fetched_at)
+    if date.fromtimestamp(index.fetched_at) < date.today():
+        with _calendar_lock:
+            schedule = horizon not in _calendar_refreshing
+            _calendar_refreshing.add(horizon)
+        if schedule:
+            _executor.submit(_refresh_calendar, horizon)
+    return index
+
+def earnings_calendar(
+    symbol: Optional[str] = None,
+    horizon: str = "3month",
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Earnings calendar events, optionally for one symbol and/or report dates within [from_date, to_date]."""
+    index = _calendar_index(horizon)
+    if symbol:
+        rows = [
+            r for r in index.by_symbol.get(symbol.upper(), [])
+            if (not from_date or (r["reportDate"] or "") >= from_date) and (not to_date or (r["reportDate"] or "") <= to_date)
+        ]
+    else:
+        start = bisect_left(index.report_dates, from_date) if from_date else 0
+        end = bisect_right(index.report_dates, to_date) if to_date else len(index.rows)
+        rows = index.rows[start:end]
+    return [dict(r) for r in rows] # copies, so callers cannot alter the index
+
+# A published transcript never changes, so once it has content it is kept on disk for good
+_transcripts_cache = DiskCache("alpha_vantage_transcripts")
+
 def earnings_call_transcript(symbol: str, year: int, quarter: int) -> Dict[str, Any]:
     """Fetches earnings call transcript for a given symbol, year, and quarter."""
     if not (1 <= quarter <= 4):
         raise ValueError("Quarter must be between 1 and 4.")
     quarter_param = f"{year}Q{quarter}"
-    return _get("EARNINGS_CALL_TRANSCRIPT", symbol=symbol.upper(), quarter=quarter_param)
+    key = f"{symbol.upper()}:{quarter_param}"
+    entry = _transcripts_cache.get(key)
+    if entry is not None:
+        return entry.value
+    payload = _get("EARNINGS_CALL_TRANSCRIPT", symbol=symbol.upper(), quarter=quarter_param)
+    if payload.get("transcript"): # calls not yet transcribed come back empty; ask again next time
+        _transcripts_cache.set(key, payload)
+    return payload
+
+
+@functools.lru_cache(maxsize=32)
+def _transcript_index(symbol: str, year: int, quarter: int) -> tuple:
+    """Speaker-turn passages of a transcript and their BM25 index, built once per process."""
+    payload = earnings_call_transcript(symbol, year, quarter)
+    if not payload.get("transcript"):
+        raise RuntimeError(f"No transcript available for {symbol.upper()} {year}Q{quarter}.")
+    passages = chunk_transcript(payload["transcript"])
+    return passages, BM25Index([f"{p['title'] or ''} {p['text']}" for p in passages])
+
+
+def earnings_call_passages(symbol: str, year: int, quarter: int, question: str, top_k: int = 5) -> Dict[str, Any]:
+    """Top-k passages of an earnings call transcript for a question, best match first."""
+    passages, index = _transcript_index(symbol.upper(), year, quarter)
+    hits = index.search(question, top_k)
+    return {
+        "symbol": symbol.upper(),
+        "quarter": f"{year}Q{quarter}",
+        "question": question,
+        "passagesSearched": len(passages),
+        "passages": [{**passages[i], "score": round(score, 3)} for i, score in hits],
+    }
 
 
 def company_overview(symbol: str) -> Dict[str, Any]:
@@ -219,8 +634,13 @@ _CF_FIELDS = ["operatingCashflow", "capitalExpenditures"]
 _ER_ANNUAL_FIELDS = ["reportedEPS"] # Annual earnings usually only have reportedEPS
 _ER_QUARTERLY_FIELDS = ["reportedEPS", "estimatedEPS", "surprise", "surprisePercentage"] # Quarterly has more detail
 
+_STATEMENT_FETCHERS = [
+    ("income_statement", income_statement), ("balance_sheet", balance_sheet),
+    ("cash_flow", cash_flow), ("earnings", earnings),
+]
+
 # --- MODIFIED FUNCTION ---
-def fundamental_data_from_reports(symbol: str, start_year: int, end_year: int, filings: int = 4) -> Dict[str, Any]:
+def fundamental_data_from_reports(symbol: str, start_year: int, end_year: int, filings: int = 4, columnar: bool = False) -> Dict[str, Any]:
     """
     Fetches and merges key financial data from Income, Balance Sheet, Cash Flow,
     and Earnings reports.
@@ -233,186 +653,253 @@ def fundamental_data_from_reports(symbol: str, start_year: int, end_year: int, f
 
     symbol_upper = symbol.upper()
 
-    # Fetch raw payloads from Alpha Vantage
-    try:
-        is_payload = income_statement(symbol_upper)
-        bs_payload = balance_sheet(symbol_upper)
-        cf_payload = cash_flow(symbol_upper)
-        er_payload = earnings(symbol_upper) # For EPS data
-    except RuntimeError as e:
-        print(f"[fundamental_data_from_reports ERROR {symbol_upper}] API call failed during data fetching: {e}")
-        return {"symbol": symbol_upper, "annual": [], "quarterly": [], "error": str(e)}
-
-
-    # --- Annual Data Processing ---
-    annual_data: Dict[str, Dict[str, Any]] = {} # Keyed by fiscalDateEnding
-
-    # First, populate with data from Income Statement, Balance Sheet, and Cash Flow
-    for payload, fields in [
-        (is_payload.get("annualReports", []), _IS_FIELDS),
-        (bs_payload.get("annualReports", []), _BS_FIELDS),
-        (cf_payload.get("annualReports", []), _CF_FIELDS),
-    ]:
-        parsed_financial_data = _parse_records(payload, fields)
-        for date_key, values in parsed_financial_data.items():
-            annual_data.setdefault(date_key, {}).update(values)
-
-    # Second, merge reportedEPS from annualEarnings into EXISTING annual_data entries
-    # using _ER_ANNUAL_FIELDS
-    parsed_annual_eps = _parse_records(er_payload.get("annualEarnings", []), _ER_ANNUAL_FIELDS)
-    merged_eps_count_annual = 0
-    for date_key, eps_values in parsed_annual_eps.items():
-        if date_key in annual_data:
-            annual_data[date_key].update(eps_values)
-            merged_eps_count_annual +=1
-    # print(f"[fundamental_data_from_reports DEBUG {symbol_upper}] Merged {merged_eps_count_annual} annual EPS records into existing reports.")
-
-    # Filter by year range and add derived metrics (_compute_extras)
-    annual_out_list: List[Dict[str, Any]] = []
-    for date_key, metrics in annual_data.items():
+    # Fetch raw payloads from Alpha Vantage concurrently; a failed statement leaves the others usable
+    payloads, errors = _collect_statements(symbol_upper, _submit_statements(symbol_upper))
+    if len(errors) == len(payloads):
+        return {"symbol": symbol_upper, "annual": [], "quarterly": [], "error": "; ".join(errors.values())}
+    result = _merge_reports(symbol_upper, payloads, start_year, end_year, filings, columnar)
+    if errors:
+        result["partial_errors"] = errors # statements that could not be fetched; their fields are missing
+    return result
+
+
+def _submit_statements(symbol: str) -> Dict[str, Any]:
+    """Start the four statement fetches for a symbol on the shared executor."""
+    return {name: _executor.submit(fetch, symbol) for name, fetch in _STATEMENT_FETCHERS}
+
+
+def _collect_statements(symbol: str, futures: Dict[str, Any]) -> tuple:
+    """Wait for submitted statement fetches. Returns (payloads, errors); failed payloads are empty."""
+    payloads: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, str] = {}
+    for name, future in futures.items():
         try:
-            report_year = int(date_key[:4]) 
-            if start_year <= report_year <= end_year:
-                metrics["fiscalDateEnding"] = date_key 
-                _compute_extras(metrics) 
-                annual_out_list.append(metrics)
-        except (ValueError, TypeError):
-            print(f"[fundamental_data_from_reports WARNING {symbol_upper}] Malformed fiscalDateEnding '{date_key}' in annual reports. Skipping entry.")
-            continue
-    
-    annual_out_list.sort(key=lambda x: x["fiscalDateEnding"], reverse=True)
-
-    # --- Quarterly Data Processing (similar logic for merging EPS but with more fields) ---
-    quarterly_data: Dict[str, Dict[str, Any]] = {} # Keyed by fiscalDateEnding
-
-    # First, populate with data from Income Statement, Balance Sheet, and Cash Flow
-    for payload, fields in [
-        (is_payload.get("quarterlyReports", []), _IS_FIELDS),
-        (bs_payload.get("quarterlyReports", []), _BS_FIELDS),
-        (cf_payload.get("quarterlyReports", []), _CF_FIELDS),
-    ]:
-        parsed_financial_data = _parse_records(payload, fields)
-        for date_key, values in parsed_financial_data.items():
-            quarterly_data.setdefault(date_key, {}).update(values)
-
-    # Second, merge detailed earnings data from quarterlyEarnings into EXISTING quarterly_data entries
-    # using _ER_QUARTERLY_FIELDS
-    parsed_quarterly_earnings_details = _parse_records(er_payload.get("quarterlyEarnings", []), _ER_QUARTERLY_FIELDS)
-    merged_earnings_count_quarterly = 0
-    for date_key, earnings_detail_values in parsed_quarterly_earnings_details.items():
-        if date_key in quarterly_data:  # Only update if a comprehensive report for this date already exists
-            quarterly_data[date_key].update(earnings_detail_values)
-            merged_earnings_count_quarterly += 1
-    # print(f"[fundamental_data_from_reports DEBUG {symbol_upper}] Merged {merged_earnings_count_quarterly} quarterly earnings details into existing reports.")
-
-    # Add derived metrics and sort
-    quarterly_out_list: List[Dict[str, Any]] = []
-    for date_key, metrics in quarterly_data.items():
-        metrics["fiscalDateEnding"] = date_key 
-        _compute_extras(metrics)
-        quarterly_out_list.append(metrics)
-    
-    quarterly_out_list.sort(key=lambda x: x["fiscalDateEnding"], reverse=True)
-    
-    final_quarterly_list = quarterly_out_list[:filings] if filings > 0 else []
+            payloads[name] = future.result()
+        except (RuntimeError, requests.RequestException) as e:
+            print(f"[fundamental_data_from_reports ERROR {symbol}] {name} fetch failed: {e}")
+            payloads[name] = {}
+            errors[name] = str(e)
+    return payloads, errors
+
+
+def _merge_reports(symbol_upper: str, payloads: Dict[str, Dict[str, Any]], start_year: int, end_year: int, filings: int, columnar: bool = False) -> Dict[str, Any]:
+    """Merge raw statement payloads into annual (within the year range) and quarterly reports."""
+    def in_range(dates: np.ndarray) -> np.ndarray:
+        years = _fiscal_years(symbol_upper, dates)
+        return (years >= start_year) & (years <= end_year)
+
+    annual = _statement_table(payloads, "annualReports", "annualEarnings", _ER_ANNUAL_FIELDS, in_range)
+    quarterly = _statement_table(payloads, "quarterlyReports", "quarterlyEarnings", _ER_QUARTERLY_FIELDS, lambda dates: slice(0, max(filings, 0)))
 
     return {
         "symbol": symbol_upper,
-        "annual": annual_out_list,
-        "quarterly": final_quarterly_list
+        "annual": _serialize_table(*annual, columnar=columnar),
+        "quarterly": _serialize_table(*quarterly, columnar=columnar)
     }
+
+### Peer Comparison
+COMPARISON_DEFAULT_METRICS = ["totalRevenue", "operatingMargin", "netIncome", "freeCashFlow", "netDebt", "reportedEPS"]
+_MARGIN_METRICS = {"operatingMargin": "operatingIncome", "netMargin": "netIncome", "fcfMargin": "freeCashFlow"} # ratio to totalRevenue
+COMPARISON_METRICS = _IS_FIELDS + _BS_FIELDS + _CF_FIELDS + _ER_ANNUAL_FIELDS + _DERIVED_FIELDS + list(_MARGIN_METRICS)
+
+def _format_number(value: Optional[float], metric: str) -> str:
+    if value is None:
+        return "-"
+    if metric in _MARGIN_METRICS:
+        return f"{value * 100:.1f}%"
+    for scale, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if abs(value) >= scale:
+            return f"{value / scale:.2f}{suffix}"
+    return f"{value:.2f}"
+
+def _latest_fiscal_years(symbol: str, years: int, dates: np.ndarray) -> np.ndarray:
+    """Mask of the reports in the symbol's `years` most recent fiscal years; the compared years are among them."""
+    fiscal_years = _fiscal_years(symbol, dates)
+    return np.isin(fiscal_years, sorted(set(fiscal_years[fiscal_years >= 0].tolist()), reverse=True)[:years])
+
+def fundamental_comparison(symbols: Sequence[str], metrics: Optional[Sequence[str]] = None, years: int = 3) -> Dict[str, Any]:
+    """
+    Compare annual fundamentals of several symbols, aligned by fiscal year.
+
+    Every peer's statement fetches are put in flight at once, then merged per symbol into
+    columns. The result is columnar: metric -> symbol -> values, one per fiscal year in
+    `fiscalYears` (newest first), with None where a peer has no report for that year.
+    """
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+    metrics = list(metrics) if metrics else COMPARISON_DEFAULT_METRICS
+    unknown = [m for m in metrics if m not in COMPARISON_METRICS]
+    if not symbols:
+        raise ValueError("At least one symbol is required.")
+    if unknown:
+        raise ValueError(f"Unknown metrics {unknown}. Available: {', '.join(COMPARISON_METRICS)}")
+
+    pending = {symbol: _submit_statements(symbol) for symbol in symbols}
+    tables: Dict[str, tuple] = {}
+    errors: Dict[str, Any] = {}
+    for symbol, futures in pending.items():
+        payloads, statement_errors = _collect_statements(symbol, futures)
+        if statement_errors:
+            errors[symbol] = statement_errors
+        if len(statement_errors) == len(payloads):
+            continue
+        dates, names, matrix = _statement_table(
+            payloads, "annualReports", "annualEarnings", _ER_ANNUAL_FIELDS, functools.partial(_latest_fiscal_years, symbol, years)
+        )
+        columns = dict(zip(names, matrix.T))
+        revenue = np.where(columns["totalRevenue"] != 0, columns["totalRevenue"], np.nan)
+        for metric, numerator in _MARGIN_METRICS.items():
+            columns[metric] = np.round(columns[numerator] / revenue, 4)
+        fiscal_years = _fiscal_years(symbol, dates)
+        # dates are newest first, so the first row of each fiscal year is its latest report
+        rows = {}
+        for i, y in enumerate(fiscal_years.tolist()):
+            rows.setdefault(y, i)
+        tables[symbol] = (dates, columns, rows)
+
+    fiscal_years = sorted({y for _, _, rows in tables.values() for y in rows if y >= 0}, reverse=True)[:years]
+    value = lambda column, i: None if i is None or np.isnan(column[i]) else float(column[i])
+    metric_columns = {
+        metric: {
+            symbol: [value(columns[metric], rows.get(y)) for y in fiscal_years]
+            for symbol, (_, columns, rows) in tables.items()
+        }
+        for metric in metrics
+    }
+    fiscal_year_ends = {
+        symbol: [dates[rows[y]] if y in rows else None for y in fiscal_years]
+        for symbol, (dates, _, rows) in tables.items()
+    }
+
+    result: Dict[str, Any] = {
+        "symbols": list(tables),
+        "fiscalYears": fiscal_years,
+        "fiscalDateEnding": fiscal_year_ends,
+        "metrics": metric_columns,
+    }
+    if errors:
+        result["errors"] = errors
+    return result
+
+def comparison_table(comparison: Dict[str, Any]) -> str:
+    """Render a comparison as a fixed-width text table (metric x fiscal year rows, one column per symbol)."""
+    symbols, years = comparison["symbols"], comparison["fiscalYears"]
+    rows = [["metric", "FY"] + symbols]
+    for metric, values in comparison["metrics"].items():
+        for i, year in enumerate(years):
+            rows.append([metric if i == 0 else "", str(year)] + [_format_number(values[s][i], metric) for s in symbols])
+    widths = [max(len(row[c]) for row in rows) for c in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(cell.ljust(w) if c < 2 else cell.rjust(w) for c, (cell, w) in enumerate(zip(row, widths))).rstrip()
+        for row in rows
+    )
+
 ## Economic Indicators
+# ttl_hours follows each series' release cadence: monthly series are re-checked daily,
+# quarterly ones weekly and annual ones monthly.
 INDICATOR_CONFIGS = [
-    {"id": "REAL_GDP_USA", "av_function": "REAL_GDP", "params": {"interval": "quarterly"}}, # Default is USA
-    {"id": "REAL_GDP_PER_CAPITA_USA", "av_function": "REAL_GDP_PER_CAPITA", "params": {}},
-    {"id": "TREASURY_YIELD_10Y", "av_function": "TREASURY_YIELD", "params": {"interval": "monthly", "maturity": "10year"}},
-    {"id": "FEDERAL_FUNDS_RATE", "av_function": "FEDERAL_FUNDS_RATE", "params": {"interval": "monthly"}},
-    {"id": "CPI_USA", "av_function": "CPI", "params": {"interval": "monthly"}}, # Default is USA
-    {"id": "INFLATION_USA", "av_function": "INFLATION", "params": {}}, # Default is USA, annual
-    {"id": "RETAIL_SALES_USA", "av_function": "RETAIL_SALES", "params": {}}, # Default is USA, monthly
-    {"id": "DURABLE_GOODS_ORDERS_USA", "av_function": "DURABLES", "params": {}}, # Default is monthly
-    {"id": "UNEMPLOYMENT_RATE_USA", "av_function": "UNEMPLOYMENT", "params": {}}, # Default is monthly
-    {"id": "NONFARM_PAYROLL_USA", "av_function": "NONFARM_PAYROLL", "params": {}}, # Default is monthly
+    {"id": "REAL_GDP_USA", "av_function": "REAL_GDP", "params": {"interval": "quarterly"}, "ttl_hours": 168}, # Default is USA
+    {"id": "REAL_GDP_PER_CAPITA_USA", "av_function": "REAL_GDP_PER_CAPITA", "params": {}, "ttl_hours": 168},
+    {"id": "TREASURY_YIELD_10Y", "av_function": "TREASURY_YIELD", "params": {"interval": "monthly", "maturity": "10year"}, "ttl_hours": 24},
+    {"id": "FEDERAL_FUNDS_RATE", "av_function": "FEDERAL_FUNDS_RATE", "params": {"interval": "monthly"}, "ttl_hours": 24},
+    {"id": "CPI_USA", "av_function": "CPI", "params": {"interval": "monthly"}, "ttl_hours": 24}, # Default is USA
+    {"id": "INFLATION_USA", "av_function": "INFLATION", "params": {}, "ttl_hours": 720}, # Default is USA, annual
+    {"id": "RETAIL_SALES_USA", "av_function": "RETAIL_SALES", "params": {}, "ttl_hours": 24}, # Default is USA, monthly
+    {"id": "DURABLE_GOODS_ORDERS_USA", "av_function": "DURABLES", "params": {}, "ttl_hours": 24}, # Default is monthly
+    {"id": "UNEMPLOYMENT_RATE_USA", "av_function": "UNEMPLOYMENT", "params": {}, "ttl_hours": 24}, # Default is monthly
+    {"id": "NONFARM_PAYROLL_USA", "av_function": "NONFARM_PAYROLL", "params": {}, "ttl_hours": 24}, # Default is monthly
 ]
 
+_indicators_cache = DiskCache("alpha_vantage_indicators")
+_indicator_memo: Dict[str, tuple] = {} # indicator id -> (expires_at, result)
+INDICATOR_ERROR_TTL_SECONDS = 900
+
+def _fetch_indicator(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Fetch the latest data point of one indicator. Failures are reported via the 'status' key."""
+    indicator_id = config["id"]
+    av_function_name = config["av_function"]
+    params = config["params"]
+
+    try:
+        api_response = _get(av_function_name, **params)
+
+        indicator_name = api_response.get("name", "N/A")
+        indicator_unit = api_response.get("unit", "N/A")
+        raw_data_points = api_response.get("data")
+
+        if not raw_data_points:
+            print(f"Warning [EconIndicator]: No data points found for {indicator_id} ({indicator_name}). Skipping.")
+            return {
+                "indicatorId": indicator_id,
+                "name": indicator_name,
+                "status": "No data found",
+                "latestDataPoint": {}
+            }
+
+        # Data is typically sorted newest to oldest by Alpha Vantage for these endpoints
+        latest_point = raw_data_points[0] # Assume first is latest
+        date_str = latest_point.get("date")
+        value_str = latest_point.get("value")
+
+        if date_str is None or value_str is None:
+            print(f"Warning [EconIndicator]: Latest data point for {indicator_id} is malformed. Skipping.")
+            return {
+                "indicatorId": indicator_id,
+                "name": indicator_name,
+                "status": "Malformed latest data",
+                "latestDataPoint": {}
+            }
+
+        return {
+            "indicatorId": indicator_id,
+            "name": indicator_name,
+            "intervalReported": api_response.get("interval", params.get("interval", "N/A")),
+            "unit": indicator_unit,
+            "latestDataPoint": {
+                "date": date_str,
+                "value": _num(value_str) # Convert value to number
+            }
+        }
+    except RuntimeError as e: # Catch API errors from _get
+        print(f"API Error fetching {indicator_id}: {e}")
+        return {"indicatorId": indicator_id, "name": config.get("av_function"), "status": "API error", "error_message": str(e), "latestDataPoint": {}}
+    except Exception as e: # Catch any other unexpected errors
+        print(f"Unexpected error processing {indicator_id}: {e}")
+        return {"indicatorId": indicator_id, "name": config.get("av_function"), "status": "Processing error", "error_message": str(e), "latestDataPoint": {}}
+
+def _cached_indicator(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Serve an indicator from memory, then disk, within its TTL; fetch it otherwise."""
+    indicator_id, ttl = config["id"], config["ttl_hours"] * 3600
+    now = time.time()
+    memo = _indicator_memo.get(indicator_id)
+    if memo and memo[0] > now:
+        return memo[1]
+    entry = _indicators_cache.get(indicator_id)
+    if entry and now - entry.fetched_at < ttl:
+        result, fetched_at = entry.value, entry.fetched_at
+    else:
+        result, fetched_at = _fetch_indicator(config), now
+        if "status" in result: # errors and empty series are only remembered briefly, in memory
+            _indicator_memo[indicator_id] = (now + INDICATOR_ERROR_TTL_SECONDS, result)
+            return result
+        _indicators_cache.set(indicator_id, result, tag=result["latestDataPoint"]["date"])
+    _indicator_memo[indicator_id] = (fetched_at + ttl, result)
+    return result
+
 def fetch_economic_indicators() -> List[Dict[str, Any]]:
     """
     Fetches the latest data point for a predefined list of US economic indicators.
+    Indicators are cached per their release cadence; missing ones are fetched concurrently
+    (paced by the shared Alpha Vantage rate limiter).
     """
-    results: List[Dict[str, Any]] = []
-    
-    for config in INDICATOR_CONFIGS:
-        indicator_id = config["id"]
-        av_function_name = config["av_function"]
-        params = config["params"]
-        
-        try:
-            api_response = _get(av_function_name, **params)
-            
-            indicator_name = api_response.get("name", "N/A")
-            indicator_unit = api_response.get("unit", "N/A")
-            raw_data_points = api_response.get("data")
-
-            if not raw_data_points:
-                print(f"Warning [EconIndicator]: No data points found for {indicator_id} ({indicator_name}). Skipping.")
-                results.append({
-                    "indicatorId": indicator_id,
-                    "name": indicator_name,
-                    "status": "No data found",
-                    "latestDataPoint": {}
-                })
-                continue
-            
-            # Data is typically sorted newest to oldest by Alpha Vantage for these endpoints
-            latest_point = raw_data_points[0] # Assume first is latest
-            date_str = latest_point.get("date")
-            value_str = latest_point.get("value")
-
-            if date_str is None or value_str is None:
-                print(f"Warning [EconIndicator]: Latest data point for {indicator_id} is malformed. Skipping.")
-                results.append({
-                    "indicatorId": indicator_id,
-                    "name": indicator_name,
-                    "status": "Malformed latest data",
-                    "latestDataPoint": {}
-                })
-                continue
-
-            results.append({
-                "indicatorId": indicator_id,
-                "name": indicator_name,
-                "intervalReported": api_response.get("interval", params.get("interval", "N/A")),
-                "unit": indicator_unit,
-                "latestDataPoint": {
-                    "date": date_str,
-                    "value": _num(value_str) # Convert value to number
-                }
-            })
-        except RuntimeError as e: # Catch API errors from _get
-            print(f"API Error fetching {indicator_id}: {e}")
-            results.append({"indicatorId": indicator_id, "name": config.get("av_function"), "status": "API error", "error_message": str(e), "latestDataPoint": {}})
-        except Exception as e: # Catch any other unexpected errors
-            print(f"Unexpected error processing {indicator_id}: {e}")
-            results.append({"indicatorId": indicator_id, "name": config.get("av_function"), "status": "Processing error", "error_message": str(e), "latestDataPoint": {}})
-            
-    return results
+    return list(_executor.map(_cached_indicator, INDICATOR_CONFIGS))
 
 
-def dcf_valuation(
-    symbol: str,
-    *,
-    # ------------ valuation levers ------------------------------------------
-    growth_years:    int   = 5,
-    growth_rate:     float | None = None,    # None ⇒ auto-derive
-    discount_rate:   float = 0.09,
-    terminal_growth: float = 0.03,           # must stay < discount_rate
-):
+def _dcf_inputs(symbol: str, growth_years: int, growth_rate: float | None = None) -> Dict[str, Any]:
     """
-    Single-stage DCF that auto-picks a growth rate:
-    1. If caller passes a number → use it.
-    2. Else try implied CAGR from Forward P/E and EPS (company_overview).
-    3. Else derive historical FCF CAGR from the annual statements.
-    Returns a rich dictionary with the inputs, assumptions, and upside %.
+    Fetch fundamentals once and derive the DCF drivers for a symbol.
+
+    The growth rate is picked as in `dcf_valuation`: caller override, else implied CAGR from
+    Forward P/E and EPS, else historical FCF CAGR, else 20%.
     """
     # --- choose statement window -------------------------------------------
     today        = date.today()
@@ -420,8 +907,10 @@ def dcf_valuation(
     start_year   = current_year - growth_years
     end_year     = current_year
 
-    # --- pull annual statements --------------------------------------------
-    rpt = fundamental_data_from_reports(symbol, start_year, end_year)
+    # --- pull annual statements (price/overview load concurrently) ----------
+    ctx = _RequestContext(symbol)
+    ctx.prefetch(overview=growth_rate is None)
+    rpt = ctx.reports(start_year, end_year)
     annuals = rpt.get("annual", [])
     if not annuals:
         raise RuntimeError(f"No annual statements for {symbol}")
@@ -431,7 +920,7 @@ def dcf_valuation(
 
     # Core fundamentals
     fcf0   = newest.get("freeCashFlow")
-    net_cash = -newest.get("netDebt", 0.0)
+    net_cash = 0.0 - (newest.get("netDebt") or 0.0)
     shares   = newest.get("commonStockSharesOutstanding")
 
     if fcf0 is None or fcf0 == 0:
@@ -446,8 +935,8 @@ def dcf_valuation(
 
     if growth_rate is None:
         # —— Try Forward P/E → implied EPS CAGR -----------------------------
-        ovw   = company_overview(symbol)
-        price = _latest_close(symbol)
+        ovw   = ctx.overview()
+        price = ctx.price()
         try:
             fwd_pe = float(ovw.get("ForwardPE", ""))
             eps_t  = float(ovw.get("EPS", ""))
@@ -473,22 +962,68 @@ def dcf_valuation(
             growth_rate = 0.20   # last-ditch default
             growth_source = "default20pct"
 
-    # Latest market price
-    market_price = _latest_close(symbol)
+    return {
+        "symbol"      : symbol.upper(),
+        "asOfDate"    : today.isoformat(),
+        "fcf0"        : fcf0,
+        "netCash"     : net_cash,
+        "shares"      : shares,
+        "growthRate"  : growth_rate,
+        "growthSource": growth_source,
+        "marketPrice" : ctx.price(),  # memoized by the context
+    }
+
+
+def _dcf_components(fcf0: float, growth, discount, terminal, growth_years: int):
+    """
+    Present value of the explicit FCF stream, terminal value and its present value.
+
+    `growth`, `discount` and `terminal` may be scalars or arrays of any broadcastable shape;
+    the years form an extra trailing axis. Cells with terminal >= discount are NaN.
+    """
+    g, r, tg = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (growth, discount, terminal)))
+    t = np.arange(1, growth_years + 1)
+    fcf = fcf0 * (1 + g[..., None]) ** t
+    pv_explicit = (fcf / (1 + r[..., None]) ** t).sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tv = np.where(tg < r, fcf[..., -1] * (1 + tg) / (r - tg), np.nan)
+    pv_tv = tv / (1 + r) ** growth_years
+    return pv_explicit, tv, pv_tv
+
+
+def _intrinsic_per_share(inputs: Dict[str, Any], growth, discount, terminal, growth_years: int):
+    """Equity value per share for each (growth, discount, terminal) scenario."""
+    pv_explicit, _, pv_tv = _dcf_components(inputs["fcf0"], growth, discount, terminal, growth_years)
+    return (pv_explicit + pv_tv + inputs["netCash"]) / inputs["shares"]
+
+
+def dcf_valuation(
+    symbol: str,
+    *,
+    # ------------ valuation levers ------------------------------------------
+    growth_years:    int   = 5,
+    growth_rate:     float | None = None,    # None ⇒ auto-derive
+    discount_rate:   float = 0.09,
+    terminal_growth: float = 0.03,           # must stay < discount_rate
+):
+    """
+    Single-stage DCF that auto-picks a growth rate:
+    1. If caller passes a number → use it.
+    2. Else try implied CAGR from Forward P/E and EPS (company_overview).
+    3. Else derive historical FCF CAGR from the annual statements.
+    Returns a rich dictionary with the inputs, assumptions, and upside %.
+    """
+    inputs = _dcf_inputs(symbol, growth_years, growth_rate)
+    fcf0, net_cash, shares = inputs["fcf0"], inputs["netCash"], inputs["shares"]
+    growth_rate, market_price = inputs["growthRate"], inputs["marketPrice"]
 
     if terminal_growth >= discount_rate:
         raise ValueError("terminal_growth must be below discount_rate")
 
-    # ---- explicit FCF PV ---------------------------------------------------
-    pv_explicit, fcf_t = 0.0, fcf0
-    for t in range(1, growth_years + 1):
-        fcf_t *= 1 + growth_rate
-        pv_explicit += fcf_t / (1 + discount_rate) ** t
-
-    # ---- terminal value ----------------------------------------------------
-    fcf_terminal = fcf_t * (1 + terminal_growth)
-    tv  = fcf_terminal / (discount_rate - terminal_growth)
-    pv_tv = tv / (1 + discount_rate) ** growth_years
+    # ---- explicit FCF PV and terminal value --------------------------------
+    pv_explicit, tv, pv_tv = (
+        float(x) for x in _dcf_components(fcf0, growth_rate, discount_rate, terminal_growth, growth_years)
+    )
 
     # ---- equity & per-share -----------------------------------------------
     equity_value        = pv_explicit + pv_tv + net_cash
@@ -502,12 +1037,12 @@ def dcf_valuation(
 
     # ---- output dictionary -------------------------------------------------
     return {
-        "symbol"   : symbol.upper(),
-        "asOfDate" : today.isoformat(),
+        "symbol"   : inputs["symbol"],
+        "asOfDate" : inputs["asOfDate"],
         "assumptions": {
             "growthYears"    : growth_years,
             "growthRateUsed" : round(growth_rate, 4),
-            "growthSource"   : growth_source,
+            "growthSource"   : inputs["growthSource"],
             "discountRate"   : discount_rate,
             "terminalGrowth" : terminal_growth,
         },
@@ -528,11 +1063,106 @@ def dcf_valuation(
             "upsidePercent"         : upside_pct,
         },
     }
+
+
+MC_PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+MAX_SIMULATIONS = 200_000
+
+def _base_value(value: Optional[float], values: Optional[List[float]], default: Optional[float]) -> Optional[float]:
+    """Explicit base-case value, else the middle of the sorted grid values, else the default."""
+    if value is not None:
+        return value
+    return values[len(values) // 2] if values else default
+
+def dcf_sensitivity(
+    symbol: str,
+    *,
+    growth_years:     int = 5,
+    growth_rate:      Optional[float] = None,            # base case; None ⇒ middle of growth_rates, else auto-derive
+    discount_rate:    Optional[float] = None,            # base case; None ⇒ middle of discount_rates, else 9%
+    terminal_growth:  Optional[float] = None,            # base case; None ⇒ middle of terminal_growths, else 2.5%
+    growth_rates:     Optional[Sequence[float]] = None,  # None ⇒ base growth ± 2/4 pp
+    discount_rates:   Optional[Sequence[float]] = None,  # None ⇒ base discount ± 1/2 pp
+    terminal_growths: Optional[Sequence[float]] = None,  # None ⇒ base terminal ± 0.5 pp
+    simulations:      int = 0,
+    growth_std:       float = 0.03,
+    discount_std:     float = 0.01,
+    terminal_std:     float = 0.005,
+    seed:             Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Intrinsic value per share over a growth × discount × terminal-growth grid, plus an
+    optional Monte Carlo over normally distributed drivers centred on the base case.
+    Fundamentals are fetched once (without the overview when the base growth is given, directly
+    or through `growth_rates`); every scenario is evaluated in one broadcast.
+    """
+    growth_rates, discount_rates, terminal_growths = (
+        sorted(values) if values else None for values in (growth_rates, discount_rates, terminal_growths)
+    )
+    growth_source = "override" if growth_rate is not None else "growthRates" if growth_rates else None
+    inputs = _dcf_inputs(symbol, growth_years, _base_value(growth_rate, growth_rates, None))
+    base_growth = inputs["growthRate"]
+    base_discount = _base_value(discount_rate, discount_rates, 0.09)
+    base_terminal = _base_value(terminal_growth, terminal_growths, 0.025)
+    price = inputs["marketPrice"]
+    per_share = functools.partial(_intrinsic_per_share, inputs, growth_years=growth_years)
+
+    growth_rates = growth_rates or [round(base_growth + d, 4) for d in (-0.04, -0.02, 0, 0.02, 0.04)]
+    discount_rates = discount_rates or [round(base_discount + d, 4) for d in (-0.02, -0.01, 0, 0.01, 0.02)]
+    terminal_growths = terminal_growths or [round(base_terminal + d, 4) for d in (-0.005, 0, 0.005)]
+
+    tg, g, r = np.meshgrid(terminal_growths, growth_rates, discount_rates, indexing="ij")
+    grid = np.round(per_share(g, r, tg), 2)
+    result: Dict[str, Any] = {
+        "symbol"     : inputs["symbol"],
+        "asOfDate"   : inputs["asOfDate"],
+        "currentPrice": price,
+        "baseCase"   : {"growthRate": round(base_growth, 4), "growthSource": growth_source or inputs["growthSource"],
+                        "discountRate": base_discount, "terminalGrowth": base_terminal, "growthYears": growth_years},
+        "grid": {
+            "rows"          : "growthRate",
+            "columns"       : "discountRate",
+            "growthRates"   : growth_rates,
+            "discountRates" : discount_rates,
+            # one table per terminal growth; null where terminal growth >= discount rate
+            "tables": [
+                {"terminalGrowth": t, "values": [[None if np.isnan(v) else float(v) for v in row] for row in table]}
+                for t, table in zip(terminal_growths, grid)
+            ],
+        },
+    }
+
+    if simulations > 0:
+        n = min(int(simulations), MAX_SIMULATIONS)
+        rng = np.random.default_rng(seed)
+        values = per_share(
+            rng.normal(base_growth, growth_std, n),
+            rng.normal(base_discount, discount_std, n),
+            rng.normal(base_terminal, terminal_std, n),
+        )
+        values = values[np.isfinite(values)]
+        mc: Dict[str, Any] = {
+            "draws": n,
+            "validDraws": int(values.size),  # draws with terminal growth >= discount rate are discarded
+            "drivers": {
+                "growthRate"    : {"mean": round(base_growth, 4), "std": growth_std},
+                "discountRate"  : {"mean": base_discount, "std": discount_std},
+                "terminalGrowth": {"mean": base_terminal, "std": terminal_std},
+            },
+        }
+        if values.size:
+            mc["percentiles"] = dict(zip((f"p{p}" for p in MC_PERCENTILES), np.round(np.percentile(values, MC_PERCENTILES), 2).tolist()))
+            mc["mean"] = round(float(values.mean()), 2)
+            if price:
+                mc["probabilityAbovePrice"] = round(float((values > price).mean()), 4)
+        result["monteCarlo"] = mc
+    return result
     
 # Wrapper functions exposed as tools
 mcp = FastMCP("AlphaVantageTools")
 
 @mcp.tool()
+@govern_output()
 def get_dcf_valuation(
     symbol: str,
     growth_years: int,
@@ -583,11 +1213,81 @@ def get_dcf_valuation(
     return dcf_valuation(symbol, growth_years=growth_years, growth_rate=growth_rate, discount_rate=discount_rate, terminal_growth=terminal_growth)
 
 @mcp.tool()
+@govern_output()
+def get_dcf_sensitivity(
+    symbol: str,
+    growth_years: int = 5,
+    growth_rate: Optional[float] = None,
+    discount_rate: Optional[float] = None,
+    terminal_growth: Optional[float] = None,
+    growth_rates: Optional[List[float]] = None,
+    discount_rates: Optional[List[float]] = None,
+    terminal_growths: Optional[List[float]] = None,
+    simulations: int = 0,
+    growth_std: float = 0.03,
+    discount_std: float = 0.01,
+    terminal_std: float = 0.005,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Computes a DCF sensitivity table and, optionally, a Monte Carlo distribution of intrinsic
+    value per share in a single call. Use this instead of calling get_dcf_valuation repeatedly
+    to build a scenario table.
+
+    Fundamentals are fetched once. Unless given (as growth_rate, or through growth_rates), the
+    base growth rate is derived exactly as in get_dcf_valuation (forward P/E, else historical
+    FCF CAGR).
+
+    Parameters:
+    ----------
+    symbol : str
+        The stock ticker symbol, Required.
+    growth_years : int
+        The number of years to project FCF growth explicitly. Default is 5.
+    growth_rate, discount_rate, terminal_growth : float
+        Base case. Each defaults to the middle value of the corresponding (sorted) list if one
+        is given, else to the derived growth rate, 0.09 and 0.025.
+    growth_rates : List[float]
+        Growth rates for the grid rows. Default is the base growth rate -4, -2, 0, +2 and +4 points.
+    discount_rates : List[float]
+        Discount rates (WACC) for the grid columns. Default is the base discount rate -2, -1, 0, +1 and +2 points.
+    terminal_growths : List[float]
+        Terminal growth rates; one table is returned per value. Default is the base terminal growth -0.5, 0 and +0.5 points.
+    simulations : int
+        Number of Monte Carlo draws (e.g. 100000). Default is 0 (no simulation). Capped at 200000.
+    growth_std, discount_std, terminal_std : float
+        Standard deviations of the normally distributed drivers, whose means are the base case.
+    seed : int
+        Optional random seed for reproducible simulations.
+
+    Returns:
+    -------
+    Dict[str, Any]
+        - 'currentPrice' and 'baseCase' (growthRate, growthSource, discountRate, terminalGrowth, growthYears).
+        - 'grid': growthRates (rows), discountRates (columns) and 'tables', one per terminal growth,
+          with intrinsic value per share in each cell (null where terminal growth >= discount rate).
+        - 'monteCarlo' (if simulations > 0): draws, validDraws, drivers, percentiles (p5..p95),
+          mean and probabilityAbovePrice.
+        Returns an 'error' key on failure.
+    """
+    try:
+        return dcf_sensitivity(
+            symbol, growth_years=growth_years, growth_rate=growth_rate, discount_rate=discount_rate,
+            terminal_growth=terminal_growth, growth_rates=growth_rates, discount_rates=discount_rates,
+            terminal_growths=terminal_growths, simulations=simulations, growth_std=growth_std,
+            discount_std=discount_std, terminal_std=terminal_std, seed=seed
+        )
+    except Exception as e:
+        return {"error": f"An unexpected error occurred in get_dcf_sensitivity: {str(e)}", "symbol": str(symbol)}
+
+@mcp.tool()
+@govern_output(max_tokens=8000)
 def get_fundamental_data(
     symbol: str,
     start_year: int,
     end_year: int,
-    quarterly_filings_count: int = 4
+    quarterly_filings_count: int = 4,
+    columnar: bool = False
 ) -> Dict[str, Any]:
     """
     Fetches and consolidates fundamental financial data for a company over a specified period.
@@ -606,14 +1306,21 @@ def get_fundamental_data(
         The ending year for fetching annual data (inclusive). Required. Must be >= start_year.
     quarterly_filings_count : int, optional
         Number of most recent quarterly filings to retrieve (default: 4). Set to 0 for none.
+    columnar : bool, optional
+        If True, 'annual' and 'quarterly' are {field: [values...]} with one value per period
+        (aligned with 'fiscalDateEnding') instead of one dictionary per period. Much more compact
+        for long histories (default: False).
 
     Returns:
     -------
     Dict[str, Any]
         A dictionary containing the symbol and lists of processed 'annual' and 'quarterly'
         financial reports. Each report in the lists is a dictionary containing various
-        financial metrics (Revenue, Net Income, OCF, FCF, Net Debt, EPS, etc.) for that period.
-        Returns an 'error' key on failure.
+        financial metrics (Revenue, Net Income, OCF, FCF, Net Debt, EPS, etc.) for that period,
+        newest first; fields that were not reported are left out of a period (null in the
+        columnar lists).
+        Returns an 'error' key on failure. If only some statements could be fetched, the reports
+        are built from the rest and 'partial_errors' names the missing statements.
     """
     try:
         # Basic input validation
@@ -631,7 +1338,8 @@ def get_fundamental_data(
             symbol=symbol,
             start_year=start_year,
             end_year=end_year,
-            filings=quarterly_filings_count
+            filings=quarterly_filings_count,
+            columnar=columnar
         )
     except Exception as e:
         # Catch unexpected errors from the underlying function
@@ -639,6 +1347,54 @@ def get_fundamental_data(
 
 
 @mcp.tool()
+@govern_output(max_tokens=8000)
+def get_fundamental_comparison(
+    symbols: List[str],
+    metrics: Optional[List[str]] = None,
+    years: int = 3,
+    as_text: bool = False
+) -> Dict[str, Any]:
+    """
+    Compares annual fundamentals of several companies side by side in one call, aligned by fiscal year.
+    Use this instead of calling get_fundamental_data once per peer.
+
+    Parameters:
+    ----------
+    symbols : List[str]
+        The stock ticker symbols to compare (e.g., ["AAPL", "MSFT", "GOOGL"]). Required.
+    metrics : List[str], optional
+        Metrics to compare. Default: totalRevenue, operatingMargin, netIncome, freeCashFlow, netDebt,
+        reportedEPS. Also available: operatingIncome, ebit, ebitda, depreciationAndAmortization,
+        interestExpense, incomeTaxExpense, incomeBeforeTax, totalAssets, totalLiabilities,
+        totalShareholderEquity, cashAndShortTermInvestments, cashAndCashEquivalentsAtCarryingValue,
+        longTermDebt, shortTermDebt, commonStockSharesOutstanding, operatingCashflow,
+        capitalExpenditures, netMargin, fcfMargin (margins are ratios to totalRevenue).
+    years : int, optional
+        Number of most recent fiscal years to include (default: 3).
+    as_text : bool, optional
+        If True, also return 'table': a compact fixed-width text table with abbreviated numbers
+        (e.g. 391.04B, 31.5%), convenient for reports.
+
+    Returns:
+    -------
+    Dict[str, Any]
+        - 'symbols': symbols with data, 'fiscalYears': fiscal years (newest first).
+        - 'fiscalDateEnding': per symbol, the fiscal year-end date of each column (fiscal years differ by company).
+        - 'metrics': {metric: {symbol: [value per fiscal year]}}, null where a year is not reported.
+        - 'errors': per symbol, statements that could not be fetched (if any).
+        Returns an 'error' key on failure.
+    """
+    try:
+        result = fundamental_comparison(symbols, metrics, years)
+        if as_text:
+            result["table"] = comparison_table(result)
+        return result
+    except Exception as e:
+        return {"error": f"An unexpected error occurred in get_fundamental_comparison: {str(e)}"}
+
+
+@mcp.tool()
+@govern_output()
 def get_company_overview(symbol: str) -> Dict[str, Any]:
     """
     Retrieves a comprehensive overview of a company from Alpha Vantage.
@@ -682,11 +1438,18 @@ def get_company_overview(symbol: str) -> Dict[str, Any]:
 
 
 @mcp.tool()
-def get_earnings_calendar(symbol: Optional[str] = None, horizon: str = "3month") -> Union[List[Dict[str, Any]], Dict[str, str]]:
+@govern_output()
+def get_earnings_calendar(
+    symbol: Optional[str] = None,
+    horizon: str = "3month",
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None
+) -> Union[List[Dict[str, Any]], Dict[str, str]]:
     """
     Fetches the upcoming or recent earnings calendar events from Alpha Vantage.
 
-    Can fetch for all companies or filter for a specific symbol.
+    Can fetch for all companies or filter for a specific symbol and/or a range of report dates.
+    The full calendar is refreshed once a day and looked up locally, so repeated calls are cheap.
 
     Parameters:
     ----------
@@ -694,12 +1457,16 @@ def get_earnings_calendar(symbol: Optional[str] = None, horizon: str = "3month")
         Stock ticker symbol. If None (default), fetches general calendar.
     horizon : str, optional
         Time horizon ("3month", "6month", "12month"). Default "3month".
+    from_date : Optional[str], optional
+        Only events reported on or after this date (YYYY-MM-DD).
+    to_date : Optional[str], optional
+        Only events reported on or before this date (YYYY-MM-DD).
 
     Returns:
     -------
     Union[List[Dict[str, Any]], Dict[str, str]]
-        On success: A list of dictionaries, each representing an earnings event with keys
-        like 'symbol', 'name', 'reportDate', 'fiscalDateEnding', 'estimate' (EPS), 'currency'.
+        On success: A list of dictionaries sorted by report date, each representing an earnings
+        event with keys like 'symbol', 'name', 'reportDate', 'fiscalDateEnding', 'estimate' (EPS), 'currency'.
         On failure: A dictionary containing an 'error' key with a description.
         Returns an empty list if a specific symbol is requested but has no calendar data.
     """
@@ -709,9 +1476,15 @@ def get_earnings_calendar(symbol: Optional[str] = None, horizon: str = "3month")
             return {"error": "If provided, symbol must be a non-empty string."}
         if horizon not in ["3month", "6month", "12month"]:
             return {"error": "Invalid horizon. Must be '3month', '6month', or '12month'."}
+        for name, value in (("from_date", from_date), ("to_date", to_date)):
+            if value is not None:
+                try:
+                    date.fromisoformat(value)
+                except (TypeError, ValueError):
+                    return {"error": f"Invalid {name}: {value}. Expected YYYY-MM-DD."}
 
         # Call the internal function (which now returns a list or raises RuntimeError)
-        return earnings_calendar(symbol=symbol, horizon=horizon)
+        return earnings_calendar(symbol=symbol.strip() if symbol else None, horizon=horizon, from_date=from_date, to_date=to_date)
 
     except RuntimeError as e: # Catch specific API errors raised by earnings_calendar
         return {"error": str(e), "symbol": str(symbol) if symbol else "N/A"}
@@ -721,6 +1494,7 @@ def get_earnings_calendar(symbol: Optional[str] = None, horizon: str = "3month")
 
 
 @mcp.tool()
+@govern_output(max_tokens=8000)
 def get_earnings_call_transcript(symbol: str, year: int, quarter: int) -> Dict[str, Any]:
     """
     Retrieves the earnings call transcript for a specific company, year, and quarter.
@@ -741,6 +1515,9 @@ def get_earnings_call_transcript(symbol: str, year: int, quarter: int) -> Dict[s
         'symbol', 'quarter', 'date', and 'transcript' (a list of speaker/speech pairs).
         On failure or if transcript not found: A dictionary containing an 'error' key
         or an API message (e.g., {"Information": "No transcript..."}).
+
+    Full transcripts are long (often tens of thousands of tokens). To answer a specific question
+    about a call, prefer `search_earnings_call_transcript`, which returns only the relevant passages.
     """
     try:
         # Basic input validation
@@ -770,6 +1547,58 @@ def get_earnings_call_transcript(symbol: str, year: int, quarter: int) -> Dict[s
 
 
 @mcp.tool()
+@govern_output()
+def search_earnings_call_transcript(symbol: str, year: int, quarter: int, question: str, top_k: int = 5) -> Dict[str, Any]:
+    """
+    Finds the passages of an earnings call transcript most relevant to a question.
+
+    The transcript is split into speaker turns (long prepared remarks into smaller passages) and
+    ranked by keyword relevance (BM25) to the question, so only the top matches are returned
+    instead of the whole call. Transcripts are cached locally after the first request.
+
+    Parameters:
+    ----------
+    symbol : str
+        Stock ticker symbol. Required.
+    year : int
+        Fiscal year of the earnings call. Required.
+    quarter : int
+        Fiscal quarter (1, 2, 3, or 4). Required.
+    question : str
+        What to look for, e.g. "gross margin guidance" or "capital expenditure plans for data centers".
+        Specific terms work better than generic ones. Required.
+    top_k : int, optional
+        Maximum number of passages to return, 1 to 20 (default: 5).
+
+    Returns:
+    -------
+    Dict[str, Any]
+        On success: {'symbol', 'quarter', 'question', 'passagesSearched', 'passages'}, where each
+        passage has 'speaker', 'title', 'turn' (position of the speaker turn in the call), 'text'
+        and 'score'. 'passages' is empty if no passage matches the question's terms.
+        On failure or if the transcript is not available: A dictionary containing an 'error' key.
+    """
+    try:
+        if not isinstance(symbol, str) or not symbol.strip():
+            return {"error": "Symbol must be a non-empty string.", "symbol": str(symbol)}
+        if not isinstance(year, int) or year < 1900 or year > datetime.now().year + 5:
+            return {"error": f"Invalid year: {year}. Please provide a realistic fiscal year.", "symbol": symbol}
+        if not isinstance(quarter, int) or not (1 <= quarter <= 4):
+            return {"error": f"Invalid quarter: {quarter}. Must be an integer between 1 and 4.", "symbol": symbol, "year": year}
+        if not isinstance(question, str) or not question.strip():
+            return {"error": "Question must be a non-empty string.", "symbol": symbol, "year": year, "quarter": quarter}
+        if not isinstance(top_k, int) or not (1 <= top_k <= 20):
+            return {"error": f"Invalid top_k: {top_k}. Must be an integer between 1 and 20.", "symbol": symbol}
+
+        return earnings_call_passages(symbol.strip(), year, quarter, question, top_k)
+    except (RuntimeError, ValueError) as e:
+        return {"error": str(e), "symbol": str(symbol), "year": year, "quarter": quarter}
+    except Exception as e:
+        return {"error": f"An unexpected error occurred: {str(e)}", "symbol": str(symbol), "year": year, "quarter": quarter}
+
+
+@mcp.tool()
+@govern_output()
 def get_advanced_analytics_metrics(
     symbols: Union[str, Sequence[str]],
     interval: str = "DAILY",
@@ -829,6 +1658,7 @@ def get_advanced_analytics_metrics(
 
 
 @mcp.tool()
+@govern_output()
 def get_latest_economic_indicators() -> Union[List[Dict[str, Any]], Dict[str,str]]:
     """
     Fetches latest data points for a predefined list of key U.S. economic indicators.
@@ -857,13 +1687,55 @@ def get_latest_economic_indicators() -> Union[List[Dict[str, Any]], Dict[str,str
         return {"error": f"An unexpected error occurred while fetching economic indicators: {str(e)}"}
 
 
+@mcp.tool()
+@govern_output()
+def get_fundamentals_cache_stats() -> Dict[str, Any]:
+    """
+    Reports the state of the local Alpha Vantage fundamentals cache and API rate limiter.
+
+    Useful to check how much of the data was served locally versus fetched from the API,
+    and whether requests are being throttled.
+
+    Returns:
+    -------
+    Dict[str, Any]
+        'cache': entry count, size on disk, oldest/newest entry and read counters.
+        'requests': fresh hits, stale entries served while refreshing, misses and revalidations
+        in this server session.
+        'earnings_calendar': size and download time of each calendar horizon loaded in this session.
+        'rate_limiter': request counts, waiting time, throttling events and queue depth.
+        'tool_outputs': per tool, calls, truncated results, average and maximum result size and
+        estimated tokens saved by truncation, across all tool servers.
+    """
+    try:
+        return {
+            "cache": _fundamentals_cache.summary(),
+            "requests": dict(_cache_counters),
+            "earnings_calendar": {
+                horizon: {
+                    "events": len(index.rows),
+                    "symbols": len(index.by_symbol),
+                    "fetched_at": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(index.fetched_at)),
+                }
+                for horizon, index in list(_calendar_indexes.items())
+            },
+            "rate_limiter": get_limiter_stats(),
+            "tool_outputs": get_output_stats(),
+        }
+    except Exception as e:
+        return {"error": f"An unexpected error occurred while reading cache stats: {str(e)}"}
+
+
 # __all__ can be useful for `from module import *` but less critical for tool-based exposure
 __all__: List[str] = [
     "calculate_dcf",
+    "dcf_sensitivity",
+    "fundamental_comparison",
     "fundamental_data_from_reports",
     "company_overview",
     "earnings_calendar",
     "earnings_call_transcript",
+    "earnings_call_passages",
     "advanced_analytics",
     "fetch_economic_indicators",
     "income_statement", "balance_sheet", "cash_flow", "earnings" # Exposing base data functions too
@@ -1,13 +1,19 @@
 from __future__ import annotations
 from datetime import date
 from typing import Dict, Any, List, Sequence, Union, Optional
+import asyncio
 import os
-import requests
+import time
+import httpx
 import csv
 from dotenv import load_dotenv
 from math import isnan
 from statistics import mean
 from mcp.server.fastmcp import FastMCP
+from rate_limiter import TransientError, async_call_with_retry, raise_for_throttle
+from disk_cache import DiskCache
+from output_governor import govern_output
+from http_client import LoopLocalClient
 
 # Setup
 load_dotenv()
@@ -22,8 +28,63 @@ if not API_KEY:
 
 # Helper functions
 
-def _get(endpoint: str) -> Dict[str, Any]:
-    resp = requests.get(BASE_URL + endpoint+"&apikey="+API_KEY, timeout=30)
+MAX_CONNECTIONS = 8
+RETRYABLE_ERRORS = (TransientError, httpx.TransportError)
+
+# Responses are cached on disk by endpoint and parameters. Segment data only changes with annual
+# filings; price targets and grades move with analyst actions, so they are refreshed within a day.
+CACHE_TTL_HOURS = {
+    "revenue-product-segmentation": 7 * 24,
+    "revenue-geographic-segmentation": 7 * 24,
+    "price-target-consensus": 12,
+    "grades-consensus": 12,
+    "grades-historical": 24,
+}
+DEFAULT_CACHE_TTL_HOURS = 12
+
+_cache = DiskCache("fmp_responses")
+_http = LoopLocalClient(
+    base_url=BASE_URL,
+    params={"apikey": API_KEY},
+    timeout=30,
+    limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+)
+_inflight: Dict[str, asyncio.Future] = {}
+
+async def _get(endpoint: str, **params: Any) -> Any:
+    """
+    Fetch an FMP endpoint, served from the response cache while it is fresh.
+
+    Concurrent requests for the same endpoint and parameters share one API call.
+    """
+    key = f"{endpoint}?{'&'.join(f'{k}={v}' for k, v in sorted(params.items()))}"
+    entry = _cache.get(key)
+    if entry and time.time() - entry.fetched_at < CACHE_TTL_HOURS.get(endpoint, DEFAULT_CACHE_TTL_HOURS) * 3600:
+        return entry.value
+    pending = _inflight.get(key)
+    if pending is not None and pending.get_loop() is asyncio.get_running_loop():
+        return await asyncio.shield(pending)
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        data = await async_call_with_retry("fmp", _request_json, endpoint, params, retry_on=RETRYABLE_ERRORS)
+        if data: # empty lists are what FMP returns for unknown symbols
+            _cache.set(key, data)
+        future.set_result(data)
+        return data
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception() # mark retrieved: waiters are optional
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+async def _request_json(endpoint: str, params: Dict[str, Any]) -> Any:
+    resp = await _http.get().get(endpoint, params=params)
+    raise_for_throttle("Financial Modeling Prep", resp.status_code, resp.headers)
     resp.raise_for_status()
     data = resp.json()
     # Check for API error messages or notes
@@ -44,60 +105,67 @@ def _process_item(item):
             ((k, v/1_000_000) for k, v in item['data'].items()),
             key=lambda x: x[1], reverse=True
         ))
-        item['data'] = sorted_data
+        item = {**item, 'data': sorted_data} # payloads may be shared with concurrent callers
     return item
-def revenue_product_segmentation(symbol: str, num_years: int=0) -> Dict[str, Any]:
-    endpointbase = "revenue-product-segmentation"
-    endpoint = endpointbase+"?symbol="+symbol
-    resp = _get(endpoint)
+async def revenue_product_segmentation(symbol: str, num_years: int=0) -> Dict[str, Any]:
+    resp = await _get("revenue-product-segmentation", symbol=symbol.upper())
     if isinstance(resp, list):
         filtered = [_process_item(item) for item in resp[0:num_years]]
         return filtered
     return resp
 
-def revenue_geographic_segmentation(symbol: str, num_years: int=0) -> Dict[str, Any]:
-    endpointbase = "revenue-geographic-segmentation"
-    endpoint = endpointbase+"?symbol="+symbol
-    resp = _get(endpoint)
+async def revenue_geographic_segmentation(symbol: str, num_years: int=0) -> Dict[str, Any]:
+    resp = await _get("revenue-geographic-segmentation", symbol=symbol.upper())
     if isinstance(resp, list):
         filtered = [_process_item(item) for item in resp[0:num_years]]
         return filtered
     return resp
 
-def price_target_consensus(symbol: str) -> Dict[str, Any]:
-    endpointbase = "price-target-consensus"
-    endpoint = endpointbase+"?symbol="+symbol
-    resp = _get(endpoint)
+async def price_target_consensus(symbol: str) -> Dict[str, Any]:
+    resp = await _get("price-target-consensus", symbol=symbol.upper())
     return resp
 
-def price_target_consensus(symbol: str) -> Dict[str, Any]:
-    endpointbase = "price-target-consensus"
-    endpoint = endpointbase+"?symbol="+symbol
-    resp = _get(endpoint)
-    return resp
-
-def grades_consensus(symbol: str) -> Dict[str, Any]:
-    endpointbase = "grades-consensus"
-    endpoint = endpointbase+"?symbol="+symbol
-    resp = _get(endpoint)
+async def grades_consensus(symbol: str) -> Dict[str, Any]:
+    resp = await _get("grades-consensus", symbol=symbol.upper())
     return resp
     
-def grades_historical(symbol: str, num_months: int=3) -> Dict[str, Any]:
-    endpointbase = "grades-historical"
-    endpoint = endpointbase+"?symbol="+symbol
-    resp = _get(endpoint)
+async def grades_historical(symbol: str, num_months: int=3) -> Dict[str, Any]:
+    resp = await _get("grades-historical", symbol=symbol.upper())
     if isinstance(resp, list):
         filtered = resp[0:num_months]
         return filtered
     return resp
 
+async def segment_and_consensus(symbol: str, num_years: int=1, num_months: int=3) -> Dict[str, Any]:
+    """Product and geographic segments, price target consensus and grades of a symbol, fetched concurrently."""
+    sections = {
+        "revenueByProduct": revenue_product_segmentation(symbol, num_years),
+        "revenueByGeographicRegion": revenue_geographic_segmentation(symbol, num_years),
+        "priceTargetConsensus": price_target_consensus(symbol),
+        "gradesConsensus": grades_consensus(symbol),
+        "gradesHistorical": grades_historical(symbol, num_months),
+    }
+    results = await asyncio.gather(*sections.values(), return_exceptions=True)
+    bundle: Dict[str, Any] = {"symbol": symbol.upper()}
+    errors: Dict[str, str] = {}
+    for name, result in zip(sections, results):
+        if isinstance(result, Exception):
+            errors[name] = str(result) or type(result).__name__
+            bundle[name] = None
+        else:
+            bundle[name] = result
+    if errors:
+        bundle["errors"] = errors
+    return bundle
+
 
     
 # Wrapper functions exposed as tools
 mcp = FastMCP("FinancialModelingPrepTools")
 
 @mcp.tool()
-def get_revenue_by_product(symbol: str, num_years: int=1) -> Dict[str, Any]:
+@govern_output()
+async def get_revenue_by_product(symbol: str, num_years: int=1) -> Dict[str, Any]:
     """
     Get the revenue in millions by product for a given stock symbol and number of years for the range.
     Note: The data is normalized by 1 million.
@@ -108,10 +176,11 @@ def get_revenue_by_product(symbol: str, num_years: int=1) -> Dict[str, Any]:
     num_years : int
         The number of years to filter the results by. Default is 1. Change if you want more or less.
     """
-    return revenue_product_segmentation(symbol, num_years)
+    return await revenue_product_segmentation(symbol, num_years)
 
 @mcp.tool()
-def get_revenue_by_geographic_region(symbol: str, num_years: int=1) -> Dict[str, Any]:
+@govern_output()
+async def get_revenue_by_geographic_region(symbol: str, num_years: int=1) -> Dict[str, Any]:
     """
     Get the revenue in millions by geographic region for a given stock symbol and number of years for the range.
     Note: The data is normalized by 1 million.
@@ -122,10 +191,11 @@ def get_revenue_by_geographic_region(symbol: str, num_years: int=1) -> Dict[str,
     num_years : int
         The number of years to filter the results by. Default is 1. Change if you want more or less.
     """
-    return revenue_geographic_segmentation(symbol, num_years)
+    return await revenue_geographic_segmentation(symbol, num_years)
 
 @mcp.tool()
-def get_price_target_consensus(symbol: str) -> Dict[str, Any]:
+@govern_output()
+async def get_price_target_consensus(symbol: str) -> Dict[str, Any]:
     """
     Get the price target consensus for a given stock symbol.
     Parameters:
@@ -133,10 +203,11 @@ def get_price_target_consensus(symbol: str) -> Dict[str, Any]:
     symbol : str
         The stock ticker symbol, Required.
     """
-    return price_target_consensus(symbol)
+    return await price_target_consensus(symbol)
 
 @mcp.tool()
-def get_grades_consensus(symbol: str) -> Dict[str, Any]:
+@govern_output()
+async def get_grades_consensus(symbol: str) -> Dict[str, Any]:
     """
     Get the grades consensus for a given stock symbol.
     Useful to get the latest grades for a stock by sell-side analyst.
@@ -145,10 +216,11 @@ def get_grades_consensus(symbol: str) -> Dict[str, Any]:
     symbol : str
         The stock ticker symbol, Required.
     """
-    return grades_consensus(symbol)
+    return await grades_consensus(symbol)
 
 @mcp.tool()
-def get_grades_historical(symbol: str, num_months: int=3) -> Dict[str, Any]:
+@govern_output()
+async def get_grades_historical(symbol: str, num_months: int=3) -> Dict[str, Any]:
     """
     Get the grades historical for a given stock symbol by number of months.
     Useful to observe the changes of grades over time.
@@ -159,7 +231,31 @@ def get_grades_historical(symbol: str, num_months: int=3) -> Dict[str, Any]:
     num_months : int
         The number of months to filter the results by. Default is 3. Change if you want more or less.
     """
-    return grades_historical(symbol, num_months)
+    return await grades_historical(symbol, num_months)
+
+@mcp.tool()
+@govern_output()
+async def get_segment_and_consensus_summary(symbol: str, num_years: int=1, num_months: int=3) -> Dict[str, Any]:
+    """
+    Get revenue by product, revenue by geographic region (in millions), the price target consensus,
+    the grades consensus and the historical grades for a stock symbol in one call.
+    All five datasets are fetched concurrently; prefer this over calling the individual tools one by one.
+    Parameters:
+    ----------
+    symbol : str
+        The stock ticker symbol, Required.
+    num_years : int
+        The number of years of segment data. Default is 1.
+    num_months : int
+        The number of months of historical grades. Default is 3.
+    Returns:
+    -------
+    Dict[str, Any]
+        Keys 'revenueByProduct', 'revenueByGeographicRegion', 'priceTargetConsensus', 'gradesConsensus'
+        and 'gradesHistorical'. A section that could not be fetched is None and its error is listed
+        under 'errors'.
+    """
+    return await segment_and_consensus(symbol, num_years, num_months)
 
 
 # __all__ can be useful for `from module import *` but less critical for tool-based exposure
@@ -168,7 +264,8 @@ __all__: List[str] = [
     "get_revenue_by_geographic_region",
     "get_price_target_consensus",
     "get_grades_consensus",
-    "get_grades_historical"
+    "get_grades_historical",
+    "get_segment_and_consensus_summary"
 ]
 
 if __name__ == "__main__":
@@ -0,0 +1,31 @@
+"""
+Pooled httpx.AsyncClient shared by the async tool servers.
+
+An AsyncClient is tied to the event loop it was first used on, so the client is created lazily
+on the running loop and replaced if a different loop asks for it (e.g. successive asyncio.run
+calls in scripts). Within an MCP server process there is one loop and so one connection pool.
+"""
+import asyncio
+import logging
+from typing import Any, Optional
+
+import httpx
+
+# httpx logs every request URL at INFO; several providers pass their API key as a query parameter
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+class LoopLocalClient:
+    """Lazily created httpx.AsyncClient, reused for every request on the running event loop."""
+
+    def __init__(self, **client_kwargs: Any):
+        self._kwargs = client_kwargs
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(**self._kwargs)
+            self._loop = loop
+        return self._client
@@ -0,0 +1,222 @@
+"""
+Pool of warm, isolated Python worker processes for the coder agent's python_repl_tool.
+
+Workers are separate interpreters running this file as a script (so they import nothing of
+the agent beyond the artifact store) that talk to the pool over a socket pair with multiprocessing's Connection. They
+are started ahead of use and import numpy and pandas (as `np` and `pd`) and the artifact
+loaders (`load_artifact`, `load_artifact_table`, `list_artifacts`) while idle; a replacement
+starts warming as soon as a worker is retired or dies. Each worker keeps one namespace per
+run (the graph's thread_id); a run is bound to the worker holding its namespace, so variables
+survive between its steps, while other runs execute concurrently on the other workers. Every
+execution is limited in CPU time (RLIMIT_CPU) and wall time, and every worker in address
+space (RLIMIT_AS); a worker that overruns or dies is replaced. After MAX_EXECUTIONS a
+worker takes no new runs and is replaced once its runs have gone idle.
+"""
+import contextlib
+import io
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from multiprocessing.connection import Connection
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+KERNEL_POOL_SIZE = int(os.getenv("KERNEL_POOL_SIZE", "2"))
+MAX_EXECUTIONS = 50 # per worker before it is retired
+CPU_LIMIT_SECONDS = int(os.getenv("KERNEL_CPU_LIMIT_SECONDS", "60")) # per execution
+WALL_TIMEOUT_SECONDS = 120 # per execution, covers sleeping and blocking code too
+MEMORY_LIMIT_MB = int(os.getenv("KERNEL_MEMORY_LIMIT_MB", "4096")) # per worker
+RUN_IDLE_SECONDS = 30 * 60 # a run's namespace is dropped after this long without executions
+
+
+class KernelError(Exception):
+    """The worker could not finish the execution (timeout, crash); the run's variables are gone."""
+
+
+class _CpuTimeExceeded(BaseException):
+    pass
+
+
+def _raise_cpu_exceeded(signum, frame):
+    raise _CpuTimeExceeded()
+
+
+def _worker_main(conn, memory_limit_mb: int, cpu_limit: int):
+    """Worker loop: execute (run_key, code) messages in per-run namespaces and reply (output, error)."""
+    import resource
+    import signal
+
+    import numpy as np
+    import pandas as pd
+
+    preloaded = {"np": np, "pd": pd}
+    try: # tables handed over by the data tools, loaded by handle
+        from artifact_store import list_artifacts, load_artifact, load_artifact_table
+        preloaded.update(load_artifact=load_artifact, load_artifact_table=load_artifact_table, list_artifacts=list_artifacts)
+    except ImportError:
+        logger.warning("artifact_store unavailable; load_artifact is not defined in the kernels")
+
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    if memory_limit_mb:
+        limit = memory_limit_mb * 2 ** 20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    signal.signal(signal.SIGXCPU, _raise_cpu_exceeded)
+    namespaces: Dict[str, dict] = {}
+    while True:
+        try:
+            command, run_key, code = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if command == "drop":
+            namespaces.pop(run_key, None)
+            continue
+        namespace = namespaces.setdefault(run_key, {"__name__": "__main__", **preloaded})
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        cpu_budget = int(usage.ru_utime + usage.ru_stime) + cpu_limit + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_budget, resource.RLIM_INFINITY))
+        stdout = io.StringIO()
+        error = None
+        try:
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stdout):
+                exec(code, namespace)
+        except _CpuTimeExceeded:
+            error = f"TimeoutError: execution used more than {cpu_limit}s of CPU time"
+        except MemoryError:
+            error = f"MemoryError: the kernel is limited to {memory_limit_mb} MB"
+        except BaseException as e:
+            error = repr(e)
+            logger.debug(traceback.format_exc())
+        finally:
+            resource.setrlimit(resource.RLIMIT_CPU, (resource.RLIM_INFINITY, resource.RLIM_INFINITY))
+        conn.send((stdout.getvalue(), error))
+
+
+class _Worker:
+    def __init__(self):
+        parent, child = socket.socketpair()
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), str(child.fileno()), str(MEMORY_LIMIT_MB), str(CPU_LIMIT_SECONDS)],
+            pass_fds=[child.fileno()], stdin=subprocess.DEVNULL, close_fds=True,
+        )
+        child.close()
+        self.conn = Connection(parent.detach())
+        self.lock = threading.Lock() # one execution at a time
+        self.executions = 0
+        self.runs: Dict[str, float] = {} # run key -> last execution time
+
+    @property
+    def retired(self) -> bool:
+        return self.executions >= MAX_EXECUTIONS
+
+    def execute(self, run_key: str, code: str, timeout: float) -> Tuple[str, Optional[str]]:
+        with self.lock:
+            try:
+                self.conn.send(("exec", run_key, code))
+                if not self.conn.poll(timeout):
+                    self.kill()
+                    raise KernelError(f"execution exceeded {timeout:.0f}s of wall time")
+                return self.conn.recv()
+            except (EOFError, OSError) as e:
+                self.kill()
+                raise KernelError(f"the kernel process died ({e or 'no reply'})") from e
+            finally:
+                self.executions += 1
+                self.runs[run_key] = time.monotonic()
+
+    def drop(self, run_key: str):
+        self.runs.pop(run_key, None)
+        with contextlib.suppress(OSError):
+            self.conn.send(("drop", run_key, None))
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def kill(self):
+        if self.alive():
+            self.process.kill()
+        with contextlib.suppress(subprocess.TimeoutExpired):
+            self.process.wait(timeout=5)
+        self.conn.close()
+
+
+class KernelPool:
+    """Fixed-size pool of warm kernels with per-run namespaces and run-to-worker affinity."""
+
+    def __init__(self, size: int = KERNEL_POOL_SIZE):
+        self._workers: List[_Worker] = [_Worker() for _ in range(size)]
+        self._bindings: Dict[str, _Worker] = {}
+        self._lock = threading.Lock()
+
+    def _worker_for(self, run_key: str) -> _Worker:
+        with self._lock:
+            self._collect()
+            worker = self._bindings.get(run_key)
+            if worker is None:
+                candidates = [w for w in self._workers if not w.retired] or self._workers
+                worker = min(candidates, key=lambda w: (len(w.runs), w.lock.locked(), w.executions))
+                self._bindings[run_key] = worker
+                worker.runs[run_key] = time.monotonic()
+            return worker
+
+    def _collect(self):
+        """Drop idle runs' namespaces and replace dead workers and retired workers without runs."""
+        cutoff = time.monotonic() - RUN_IDLE_SECONDS
+        for i, worker in enumerate(self._workers):
+            idle = [run_key for run_key, last_used in worker.runs.items() if last_used < cutoff]
+            if idle and worker.lock.acquire(blocking=False): # never write to the connection during an execution
+                try:
+                    for run_key in idle:
+                        worker.drop(run_key)
+                        self._bindings.pop(run_key, None)
+                finally:
+                    worker.lock.release()
+            if not worker.alive():
+                for run_key in worker.runs:
+                    self._bindings.pop(run_key, None)
+                self._workers[i] = _Worker()
+            elif worker.retired and not worker.runs and worker.lock.acquire(blocking=False):
+                try:
+                    worker.kill()
+                finally:
+                    worker.lock.release()
+                self._workers[i] = _Worker()
+
+    def run(self, code: str, run_key: str = "default", timeout: float = WALL_TIMEOUT_SECONDS) -> Tuple[str, Optional[str]]:
+        """Execute code in the run's namespace; returns (captured output, error repr or None)."""
+        worker = self._worker_for(run_key)
+        try:
+            return worker.execute(run_key, code, timeout)
+        except KernelError:
+            with self._lock:
+                self._collect() # the killed worker is replaced and its runs unbound
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            for worker in self._workers:
+                worker.kill()
+            self._workers.clear()
+            self._bindings.clear()
+
+
+_pool: Optional[KernelPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_kernel_pool() -> KernelPool:
+    """The process-wide kernel pool, started (and warmed) on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = KernelPool()
+    return _pool
+
+
+if __name__ == "__main__": # worker process: <socket fd> <memory limit MB> <CPU limit s>
+    _worker_main(Connection(int(sys.argv[1])), int(sys.argv[2]), int(sys.argv[3]))
@@ -1,14 +1,25 @@
 import os
+import asyncio
+import functools
+import threading
+import time
 import pandas as pd
 import json
 import numpy as np
 from datetime import date, timedelta, datetime
+from zoneinfo import ZoneInfo
+from concurrent.futures import ThreadPoolExecutor, Future
 from polygon.rest import RESTClient
 from polygon.rest.models import TickerSnapshot, Agg # Import necessary models
 from mcp.server.fastmcp import FastMCP
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator
+from urllib3.exceptions import MaxRetryError
 # Import trading strategies
 import trading_strategies
+from artifact_store import save_artifact
+from disk_cache import DiskCache
+from output_governor import govern_output, read_output
+from rate_limiter import BATCH, INTERACTIVE, ThrottledError, TransientError, call_with_retry
 import logging
 
 # Load environment variables
@@ -30,9 +41,6 @@ else:
         # Client remains None, tools should check for this
 
 
-today = date.today()
-default_to_date = today.isoformat()
-
 TREND_MIN_BARS = 60
 MEAN_REVERSION_MIN_BARS = 50
 MOMENTUM_MIN_BARS = 126
@@ -40,10 +48,28 @@ VOLATILITY_MIN_BARS = 84
 STAT_ARB_MIN_BARS = 126
 COMBINED_MIN_BARS = 126
 
+def _polygon(method, *args, priority: int = INTERACTIVE, **kwargs):
+    """
+    Call a RESTClient method under the shared Polygon quota, retrying with jittered backoff.
+
+    Paginated results are materialized inside the limited call. The client's own urllib3 retry
+    (short fixed backoff on 429/5xx) runs first; once it gives up the failure is handed to the
+    limiter, which slows every Polygon caller in this process on throttling.
+    """
+    def send():
+        try:
+            result = method(*args, **kwargs)
+            return list(result) if isinstance(result, Iterator) else result
+        except MaxRetryError as e:
+            if '429' in str(e.reason):
+                raise ThrottledError(f"Polygon rate limit: {e.reason}") from e
+            raise TransientError(f"Polygon request failed: {e.reason}") from e
+    return call_with_retry('polygon', send, priority=priority, retries=2)
+
 def _to_dict(obj):
     """Helper function to convert Polygon objects to dictionaries."""
     if hasattr(obj, '__dict__'):
-        data = vars(obj)
+        data = dict(vars(obj))
         for key, value in data.items():
             if isinstance(value, list):
                 data[key] = [_to_dict(item) for item in value]
@@ -54,7 +80,407 @@ def _to_dict(obj):
         return [_to_dict(item) for item in obj]
     else:
         return obj
-    
+
+# --- Snapshot Serialization ---
+# Flat output field -> dotted attribute path on a polygon TickerSnapshot.
+SNAPSHOT_SCHEMA: Dict[str, str] = {
+    'ticker': 'ticker',
+    'change': 'todays_change',
+    'change_percent': 'todays_change_percent',
+    'updated': 'updated',
+    'fair_market_value': 'fair_market_value',
+    'day_open': 'day.open',
+    'day_high': 'day.high',
+    'day_low': 'day.low',
+    'day_close': 'day.close',
+    'day_volume': 'day.volume',
+    'day_vwap': 'day.vwap',
+    'prev_open': 'prev_day.open',
+    'prev_high': 'prev_day.high',
+    'prev_low': 'prev_day.low',
+    'prev_close': 'prev_day.close',
+    'prev_volume': 'prev_day.volume',
+    'prev_vwap': 'prev_day.vwap',
+    'min_open': 'min.open',
+    'min_high': 'min.high',
+    'min_low': 'min.low',
+    'min_close': 'min.close',
+    'min_volume': 'min.volume',
+    'min_vwap': 'min.vwap',
+    'min_accumulated_volume': 'min.accumulated_volume',
+    'min_timestamp': 'min.timestamp',
+    'last_trade_price': 'last_trade.price',
+    'last_trade_size': 'last_trade.size',
+    'last_trade_timestamp': 'last_trade.sip_timestamp',
+    'bid': 'last_quote.bid_price',
+    'bid_size': 'last_quote.bid_size',
+    'ask': 'last_quote.ask_price',
+    'ask_size': 'last_quote.ask_size',
+}
+
+# Projection used when a tool caller does not ask for specific fields.
+DEFAULT_SNAPSHOT_FIELDS: List[str] = [
+    'ticker', 'change_percent', 'day_close', 'day_volume', 'day_vwap',
+    'prev_close', 'prev_volume', 'last_trade_price',
+]
+
+def _snapshot_getters(fields: Optional[List[str]]) -> List[tuple]:
+    """Resolve a field projection into (name, path) pairs, dropping unknown field names."""
+    names = fields or DEFAULT_SNAPSHOT_FIELDS
+    return [(name, SNAPSHOT_SCHEMA[name].split('.')) for name in names if name in SNAPSHOT_SCHEMA]
+
+def _resolve(obj, path: List[str]):
+    """Walk an attribute path, returning None as soon as a link is missing."""
+    for attr in path:
+        obj = getattr(obj, attr, None)
+        if obj is None:
+            return None
+    return obj
+
+def _serialize_snapshots(snapshots, fields: Optional[List[str]] = None, columnar: bool = False):
+    """
+    Flatten polygon TickerSnapshot objects according to SNAPSHOT_SCHEMA.
+
+    Args:
+        snapshots: An iterable of TickerSnapshot objects.
+        fields: Flat field names to keep (see SNAPSHOT_SCHEMA). Defaults to DEFAULT_SNAPSHOT_FIELDS.
+        columnar: If True, return {"count", "columns"} with one list per field instead of one dict per ticker.
+
+    Returns:
+        A list of flat dictionaries (missing values omitted), or a columnar dictionary.
+    """
+    getters = _snapshot_getters(fields)
+    if columnar:
+        columns: Dict[str, List[Any]] = {name: [] for name, _ in getters}
+        count = 0
+        for snapshot in snapshots:
+            for name, path in getters:
+                columns[name].append(_resolve(snapshot, path))
+            count += 1
+        return {'count': count, 'columns': columns}
+
+    rows = []
+    for snapshot in snapshots:
+        row = {}
+        for name, path in getters:
+            value = _resolve(snapshot, path)
+            if value is not None:
+                row[name] = value
+        rows.append(row)
+    return rows
+
+# --- Bar Cache & Resampling ---
+# Bars fetched during this server's lifetime. Each entry records the ticker, granularity
+# and date window it covers so coarser requests can be derived locally. A window reaching the
+# day it was fetched may hold partial bars, so it is only reused for BAR_PROVISIONAL_TTL_SECONDS
+# by requests that also reach that day; its earlier days stay valid.
+MARKET_TZ = 'America/New_York'
+REGULAR_SESSION_MINUTES = (9 * 60 + 30, 16 * 60)  # 09:30-16:00 ET
+BAR_CACHE_MAX_ENTRIES = 64
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'vwap', 'timestamp', 'transactions']
+_INTRADAY_MINUTES = {'minute': 1, 'hour': 60}
+BAR_PROVISIONAL_TTL_SECONDS = 5 * 60 # windows reaching today may hold partial bars
+_bar_cache: List[Dict[str, Any]] = []
+_bar_cache_lock = threading.Lock()
+
+def _market_today() -> str:
+    """Current US/Eastern calendar date (YYYY-MM-DD), the trading date Polygon's bars are keyed by."""
+    return datetime.now(ZoneInfo(MARKET_TZ)).date().isoformat()
+
+def _can_derive(src_timespan: str, src_multiplier: int, timespan: str, multiplier: int) -> bool:
+    """Whether bars of (multiplier, timespan) can be built from cached (src_multiplier, src_timespan) bars."""
+    if (src_timespan, src_multiplier) == (timespan, multiplier):
+        return True
+    if timespan in _INTRADAY_MINUTES:
+        if src_timespan not in _INTRADAY_MINUTES:
+            return False
+        src_minutes = src_multiplier * _INTRADAY_MINUTES[src_timespan]
+        return (multiplier * _INTRADAY_MINUTES[timespan]) % src_minutes == 0
+    # Polygon's day bars include extended-hours trades, so days are never rebuilt from intraday bars
+    if timespan not in ('day', 'week') or multiplier != 1:
+        return False
+    return src_timespan == 'day' and src_multiplier == 1 and timespan == 'week'
+
+def _find_cached_bars(ticker: str, multiplier: int, timespan: str, from_date: str, to_date: str) -> Optional[Dict[str, Any]]:
+    """Return the finest cached entry that covers the window and can produce the requested bars."""
+    with _bar_cache_lock:
+        entries = list(_bar_cache)
+    candidates = [
+        entry for entry in entries
+        if entry['ticker'] == ticker and entry['from'] <= from_date and entry['to'] >= to_date
+        and (to_date < entry['fetched_on'] or time.time() - entry['fetched_at'] < BAR_PROVISIONAL_TTL_SECONDS)
+        and _can_derive(entry['timespan'], entry['multiplier'], timespan, multiplier)
+    ]
+    if not candidates:
+        return None
+    # Prefer an exact match (no resampling), otherwise the finest source
+    for entry in candidates:
+        if (entry['timespan'], entry['multiplier']) == (timespan, multiplier):
+            return entry
+    return min(candidates, key=lambda e: e['multiplier'] * _INTRADAY_MINUTES.get(e['timespan'], 1440))
+
+def _store_bars(ticker: str, multiplier: int, timespan: str, from_date: str, to_date: str, bars: pd.DataFrame, fetched_at: float):
+    """Remember fetched bars, replacing an older copy of the window and evicting the oldest entries beyond BAR_CACHE_MAX_ENTRIES."""
+    entry = {
+        'ticker': ticker, 'multiplier': multiplier, 'timespan': timespan,
+        'from': from_date, 'to': to_date, 'bars': bars,
+        'fetched_at': fetched_at, 'fetched_on': datetime.fromtimestamp(fetched_at, ZoneInfo(MARKET_TZ)).date().isoformat(),
+    }
+    window = ('ticker', 'multiplier', 'timespan', 'from', 'to')
+    with _bar_cache_lock:
+        _bar_cache[:] = [e for e in _bar_cache if any(e[k] != entry[k] for k in window)]
+        _bar_cache.append(entry)
+        del _bar_cache[:-BAR_CACHE_MAX_ENTRIES]
+
+def _local_times(bars: pd.DataFrame) -> pd.DatetimeIndex:
+    """Bar start times as naive US/Eastern wall-clock timestamps."""
+    utc = pd.DatetimeIndex(pd.to_datetime(bars['timestamp'], unit='ms', utc=True))
+    return utc.tz_convert(MARKET_TZ).tz_localize(None)
+
+def _slice_window(bars: pd.DataFrame, from_date: str, to_date: str) -> pd.DataFrame:
+    """Restrict bars to the inclusive [from_date, to_date] window of US/Eastern calendar dates."""
+    if bars.empty:
+        return bars
+    days = _local_times(bars).normalize()
+    mask = (days >= pd.Timestamp(from_date)) & (days <= pd.Timestamp(to_date))
+    return bars[np.asarray(mask)]
+
+def resample_ohlcv(bars: pd.DataFrame, multiplier: int, timespan: str, regular_session: bool = True) -> pd.DataFrame:
+    """
+    Aggregate finer OHLCV bars into coarser bars, vectorized with a single groupby.
+
+    Intraday targets are aligned to US/Eastern clock boundaries and keep extended-hours bars,
+    as Polygon does. Day and week targets built from intraday bars only use the regular session
+    (09:30-16:00 ET) when `regular_session` is True. Weeks start on Sunday, matching Polygon's weekly bar timestamps. Only
+    periods that contain trades produce bars, so weekends and exchange holidays never appear.
+
+    Args:
+        bars: DataFrame with BAR_COLUMNS, 'timestamp' in epoch milliseconds (bar start, UTC).
+        multiplier: Target timespan multiplier.
+        timespan: Target timespan ('minute', 'hour', 'day' or 'week').
+        regular_session: Drop pre/post-market bars before building day or week bars.
+
+    Returns:
+        A DataFrame with BAR_COLUMNS, one row per target bar, sorted by timestamp.
+    """
+    if bars.empty:
+        return bars
+    local = _local_times(bars)
+    if timespan in ('day', 'week') and regular_session:
+        minutes = local.hour * 60 + local.minute
+        in_session = (minutes >= REGULAR_SESSION_MINUTES[0]) & (minutes < REGULAR_SESSION_MINUTES[1])
+        bars, local = bars[np.asarray(in_session)], local[in_session]
+        if bars.empty:
+            return bars
+
+    if timespan in _INTRADAY_MINUTES:
+        keys = local.floor(f"{multiplier * _INTRADAY_MINUTES[timespan]}min")
+    elif timespan == 'day':
+        keys = local.normalize()
+    else:
+        day = local.normalize()
+        keys = day - pd.to_timedelta((day.dayofweek + 1) % 7, unit='D')
+
+    grouped = bars.groupby(np.asarray(keys), sort=True)
+    out = grouped.agg(
+        open=('open', 'first'), high=('high', 'max'), low=('low', 'min'),
+        close=('close', 'last'), volume=('volume', 'sum'),
+    )
+    if 'vwap' in bars.columns:
+        notional = (bars['vwap'] * bars['volume']).groupby(np.asarray(keys), sort=True).sum()
+        out['vwap'] = (notional / out['volume']).where(out['volume'] > 0)
+    if 'transactions' in bars.columns:
+        out['transactions'] = grouped['transactions'].sum()
+    starts = pd.DatetimeIndex(out.index).tz_localize(MARKET_TZ, ambiguous=True, nonexistent='shift_forward')
+    out['timestamp'] = starts.tz_convert('UTC').asi8 // 1_000_000
+    return out.reset_index(drop=True)[[c for c in BAR_COLUMNS if c in out.columns]]
+
+# --- Request Coalescing ---
+class _SingleFlight:
+    """
+    Coalesce identical concurrent calls within this process: the first caller for a key runs
+    the function, later callers for the same key block on the same Future instead of calling
+    upstream. The function should store its result wherever later callers look for it, so a
+    caller arriving just after the flight ends finds it there.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight: Dict[tuple, Future] = {}
+        self.stats = {'calls': 0, 'upstream': 0, 'deduplicated': 0}
+
+    def do(self, key: tuple, fn, *args, **kwargs):
+        with self._lock:
+            self.stats['calls'] += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.stats['upstream'] += 1
+            else:
+                self.stats['deduplicated'] += 1
+        if not leader:
+            logging.info(f"{self.name}: joined in-flight request {key} ({self.stats})")
+            return future.result()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return future.result()
+
+_aggs_flight = _SingleFlight('list_aggs')
+
+# Every graph node starts its own server process, so fetched windows are also shared through a
+# DiskCache: the first process to claim a window fetches it and the others wait for its result
+# (or for the claim to expire) instead of calling Polygon. Shared copies are dropped after
+# BAR_SHARED_MAX_AGE_SECONDS, as adjusted prices change with later splits.
+BAR_SHARED_MAX_AGE_SECONDS = 24 * 3600
+BAR_CLAIM_SECONDS = 120
+BAR_CLAIM_POLL_SECONDS = 0.25
+_shared_bars = DiskCache("polygon_aggs")
+_shared_bars_purged = False
+
+def _offload(func):
+    """Run a blocking tool in a worker thread so concurrent invocations can overlap (and coalesce)."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return wrapper
+
+def _fetch_aggs(ticker: str, multiplier: int, timespan: str, from_date: str, to_date: str, limit: int) -> pd.DataFrame:
+    """Fetch aggregate bars, sharing one upstream call between identical concurrent requests of any process."""
+    key = (ticker, multiplier, timespan, from_date, to_date)
+    return _aggs_flight.do(key, _fetch_shared_aggs, ticker, multiplier, timespan, from_date, to_date, limit)
+
+def _fetch_shared_aggs(ticker: str, multiplier: int, timespan: str, from_date: str, to_date: str, limit: int) -> pd.DataFrame:
+    """Bars of one window from the shared cache, or from Polygon once this process holds the window's claim; stored in the bar cache before returning."""
+    global _shared_bars_purged
+    if not _shared_bars_purged:
+        _shared_bars_purged = True
+        _shared_bars.purge(BAR_SHARED_MAX_AGE_SECONDS)
+    key = json.dumps([ticker, multiplier, timespan, from_date, to_date])
+    while True:
+        entry = _shared_bars.get(key)
+        if entry is not None:
+            age = time.time() - entry.fetched_at
+            if age < (BAR_SHARED_MAX_AGE_SECONDS if entry.tag == 'final' else BAR_PROVISIONAL_TTL_SECONDS):
+                bars, fetched_at = pd.DataFrame(entry.value, columns=BAR_COLUMNS), entry.fetched_at
+                break
+        if _shared_bars.claim(f"claim:{key}", BAR_CLAIM_SECONDS):
+            try:
+                bars, fetched_at = _list_aggs(ticker, multiplier, timespan, from_date, to_date, limit), time.time()
+                final = to_date < _market_today()
+                _shared_bars.set(key, bars.to_dict('list'), tag='final' if final else 'provisional', fetched_at=fetched_at)
+            finally:
+                _shared_bars.delete(f"claim:{key}")
+            break
+        time.sleep(BAR_CLAIM_POLL_SECONDS)
+    _store_bars(ticker, multiplier, timespan, from_date, to_date, bars, fetched_at)
+    return bars
+
+def _list_aggs(ticker: str, multiplier: int, timespan: str, from_date: str, to_date: str, limit: int) -> pd.DataFrame:
+    """Fetch aggregate bars from Polygon as a DataFrame with BAR_COLUMNS."""
+    aggs = _polygon(
+        rest_client.list_aggs,
+        ticker=ticker, multiplier=multiplier, timespan=timespan,
+        from_=from_date, to=to_date, limit=limit, sort='asc'
+    )
+    if not aggs:
+        return pd.DataFrame(columns=BAR_COLUMNS)
+    return pd.DataFrame(aggs)[BAR_COLUMNS]
+
+def _get_bars(ticker: str, multiplier: int, timespan: str, from_date: str, to_date: str, limit: int) -> pd.DataFrame:
+    """
+    Return OHLCV bars for a ticker, deriving them from finer cached bars when possible.
+
+    A request is served without network access when a previously fetched window for the same
+    ticker covers [from_date, to_date] at an equal or finer compatible granularity. Otherwise
+    the bars are fetched from Polygon and cached for later requests.
+
+    Returns:
+        A copy of the bars (DataFrame with BAR_COLUMNS), safe for callers to modify.
+    """
+    entry = _find_cached_bars(ticker, multiplier, timespan, from_date, to_date)
+    if entry is None:
+        return _fetch_aggs(ticker, multiplier, timespan, from_date, to_date, limit).copy()
+    bars = _slice_window(entry['bars'], from_date, to_date)
+    if (entry['timespan'], entry['multiplier']) != (timespan, multiplier):
+        return resample_ohlcv(bars, multiplier, timespan, regular_session=False)
+    return bars.reset_index(drop=True)
+
+# --- Universe Panel (grouped daily aggregates) ---
+# One grouped-daily payload per trading day, kept in a DiskCache so the rolling panel survives
+# across server processes and only new days are downloaded. Past days are final and kept for
+# good; today's payload may still be partial (intraday or not yet published), so it is only
+# reused for GROUPED_DAILY_PROVISIONAL_TTL_SECONDS and a panel that includes it is rebuilt as often.
+GROUPED_DAILY_COLUMNS = ['ticker', 'open', 'high', 'low', 'close', 'volume', 'vwap']
+GROUPED_DAILY_WORKERS = 8
+GROUPED_DAILY_PROVISIONAL_TTL_SECONDS = 15 * 60
+PANEL_CACHE_MAX_ENTRIES = 8
+_grouped_daily_cache = DiskCache("polygon_grouped_daily")
+_grouped_daily: Dict[str, pd.DataFrame] = {} # final days only
+_panels: Dict[tuple, tuple] = {} # (as_of_date, lookback_days) -> (built_at, provisional, panel), oldest first
+
+def _load_grouped_daily(day: str) -> pd.DataFrame:
+    """Return the grouped daily bars of every US stock for one date, from memory, disk or Polygon."""
+    if day in _grouped_daily:
+        return _grouped_daily[day]
+    final = day < _market_today()
+    entry = _grouped_daily_cache.get(day)
+    if entry and (entry.tag == 'final' or time.time() - entry.fetched_at < GROUPED_DAILY_PROVISIONAL_TTL_SECONDS):
+        frame = pd.DataFrame(entry.value, columns=GROUPED_DAILY_COLUMNS)
+    else:
+        # Panel backfill yields to interactive requests queued on the same quota
+        aggs = _polygon(rest_client.get_grouped_daily_aggs, day, adjusted=True, include_otc=False, priority=BATCH)
+        frame = pd.DataFrame(aggs, columns=GROUPED_DAILY_COLUMNS) if aggs else pd.DataFrame(columns=GROUPED_DAILY_COLUMNS)
+        _grouped_daily_cache.set(day, frame.to_dict('list'), tag='final' if final else 'provisional')
+    if final:
+        _grouped_daily[day] = frame
+    return frame
+
+def _build_universe_panel(as_of_date: str, lookback_days: int) -> Dict[str, pd.DataFrame]:
+    """
+    Assemble a date x ticker panel for the last `lookback_days` trading days up to `as_of_date`.
+
+    Missing days are fetched concurrently. Weekends are skipped up front and exchange holidays
+    drop out because their grouped payload is empty.
+
+    Returns:
+        A dictionary with 'close', 'volume' and 'vwap' DataFrames indexed by date, one column per ticker.
+    """
+    key = (as_of_date, lookback_days)
+    if key in _panels:
+        built_at, provisional, panel = _panels[key]
+        if not provisional or time.time() - built_at < GROUPED_DAILY_PROVISIONAL_TTL_SECONDS:
+            return panel
+    end = date.fromisoformat(as_of_date)
+    # ~5% of weekdays are holidays; over-provision so the window still has lookback_days sessions
+    candidates = []
+    day = end
+    while len(candidates) < lookback_days + lookback_days // 15 + 3:
+        if day.weekday() < 5:
+            candidates.append(day.isoformat())
+        day -= timedelta(days=1)
+    candidates.reverse()
+
+    with ThreadPoolExecutor(max_workers=GROUPED_DAILY_WORKERS) as pool:
+        frames = list(pool.map(_load_grouped_daily, candidates))
+    sessions = [(d, f) for d, f in zip(candidates, frames) if not f.empty][-lookback_days:]
+    if not sessions:
+        return {}
+    long = pd.concat([f.assign(date=d) for d, f in sessions], ignore_index=True)
+    long = long.drop_duplicates(subset=['date', 'ticker'])
+    panel = {field: long.pivot(index='date', columns='ticker', values=field) for field in ('close', 'volume', 'vwap')}
+    _panels.pop(key, None)
+    _panels[key] = (time.time(), sessions[-1][0] >= _market_today(), panel)
+    while len(_panels) > PANEL_CACHE_MAX_ENTRIES:
+        _panels.pop(next(iter(_panels)), None)
+    return panel
+
 def get_ticker_price(ticker, multiplier=1, timespan='day', from_date='2025-03-13', to_date='2025-03-17', limit=10000) -> pd.DataFrame:
         """
         Get stock data for a ticker from Polygon API
@@ -68,11 +494,8 @@ def get_ticker_price(ticker, multiplier=1, timespan='day', from_date='2025-03-13
         Returns:
             A pandas DataFrame containing the stock data
         """
-        aggs = []
-        for a in rest_client.list_aggs(ticker=ticker, multiplier=multiplier, timespan=timespan, from_=from_date, to=to_date, limit=limit):
-            aggs.append(a)
-        if aggs != []:
-            df = pd.DataFrame(aggs)
+        df = _get_bars(ticker, multiplier, timespan, from_date, to_date, limit)
+        if not df.empty:
             df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms', origin='unix')
             df['ticker'] = ticker
             # Reorder columns to make ticker the first column
@@ -88,12 +511,14 @@ def get_ticker_price(ticker, multiplier=1, timespan='day', from_date='2025-03-13
 
 
 @mcp.tool()
+@govern_output()
+@_offload
 def get_stock_metrics(
     ticker: str,
     multiplier: int = 1,
     timespan: str = 'day',
     from_date: Optional[str] = None,
-    to_date: str = default_to_date,
+    to_date: Optional[str] = None,
     limit: int = 100
 ) -> Dict[str, Any]:
     """
@@ -114,6 +539,7 @@ def get_stock_metrics(
         or calculations cannot be performed (e.g., insufficient data).
         All numeric values are rounded, and volume figures are formatted (e.g., "1.23M").
     """
+    to_date = to_date or _market_today()
     if rest_client is None:
         return {"error": "Polygon RESTClient is not initialized. Check API Key."}
 
@@ -124,29 +550,17 @@ def get_stock_metrics(
     if from_date is None:
         from_date = (date.fromisoformat(to_date) - timedelta(days=180)).isoformat()
 
-    aggs_list = []
     try:
-        # Fetch aggregates using the RESTClient directly
-        for a in rest_client.list_aggs(
-            ticker=ticker,
-            multiplier=multiplier,
-            timespan=timespan,
-            from_=from_date,
-            to=to_date,
-            limit=limit,
-            sort='asc' # Ensure data is sorted for calculations
-        ):
-            aggs_list.append(a)
-
+        # Served from cached finer bars when possible, otherwise fetched from Polygon (sorted asc)
+        df = _get_bars(ticker, multiplier, timespan, from_date, to_date, limit)
     except Exception as e:
         print(f"Error fetching aggregates via RESTClient for {ticker}: {e}")
         return {"error": f"Failed to fetch aggregates for {ticker}: {str(e)}"}
 
-    if not aggs_list:
+    if df.empty:
         return {"error": f"No aggregate data found for {ticker} in the specified range."}
 
     try:
-        df = pd.DataFrame([vars(a) for a in aggs_list])
         df.rename(columns={'t': 'timestamp', 'o': 'open', 'h': 'high', 'l': 'low', 'c': 'close', 'v': 'volume'}, inplace=True)
         df.dropna(subset=['timestamp', 'open', 'high', 'low', 'close', 'volume'], inplace=True)
 
@@ -257,6 +671,70 @@ def get_stock_metrics(
         return {"error": f"Failed to calculate metrics for {ticker}: {str(e)}"}
 
 @mcp.tool()
+@govern_output()
+@_offload
+def get_price_history(
+    ticker: str,
+    multiplier: int = 1,
+    timespan: str = 'day',
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    limit: int = 10000
+) -> Dict[str, Any]:
+    """
+    Fetches OHLCV bars for a ticker and stores them as a data artifact for the coder agent,
+    instead of returning every bar. Use this when the data will be analysed in Python.
+
+    Args:
+        ticker: The ticker symbol (e.g., AAPL).
+        multiplier: The size of the timespan multiplier (e.g., 1).
+        timespan: The size of the time window (e.g., 'day', 'hour', 'minute').
+        from_date: The start date (YYYY-MM-DD). If None, defaults to 365 days before to_date.
+        to_date: The end date (YYYY-MM-DD). Defaults to today.
+        limit: The maximum number of base aggregates fetched.
+
+    Returns:
+        A dictionary with 'artifact': the handle to pass on to the coder agent, who loads the bars
+        in python_repl_tool with `load_artifact("<handle>")` (a DataFrame indexed by timestamp with
+        ticker, open, high, low, close, volume, vwap, transactions columns), plus 'rows', the first
+        and last bar dates, the last close and a short 'preview'.
+        Returns a dictionary with an 'error' key if fetching fails or there are no bars.
+    """
+    to_date = to_date or _market_today()
+    if rest_client is None:
+        return {"error": "Polygon RESTClient is not initialized. Check API Key."}
+
+    ticker = ticker.upper()
+    if from_date is None:
+        from_date = (date.fromisoformat(to_date) - timedelta(days=365)).isoformat()
+
+    try:
+        df = get_ticker_price(ticker, multiplier, timespan, from_date, to_date, limit)
+    except Exception as e:
+        return {"error": f"Failed to fetch aggregates for {ticker}: {str(e)}"}
+    if df.empty:
+        return {"error": f"No aggregate data found for {ticker} in the specified range."}
+
+    try:
+        artifact = save_artifact(
+            df, name=f"{ticker}_{multiplier}{timespan}_{from_date}_{to_date}", source="get_price_history",
+            description=f"{ticker} {multiplier} {timespan} bars {from_date} to {to_date}",
+        )
+    except Exception as e:
+        return {"error": f"Failed to store price history for {ticker}: {str(e)}"}
+    return {
+        "artifact": artifact["handle"],
+        "ticker": ticker,
+        "rows": artifact["rows"],
+        "first_bar": df.index[0].isoformat(),
+        "last_bar": df.index[-1].isoformat(),
+        "last_close": float(df['close'].iloc[-1]),
+        "columns": artifact["columns"],
+        "preview": artifact["preview"],
+    }
+
+@mcp.tool()
+@govern_output()
 def get_ticker_snapshot(ticker: str) -> Dict[str, Any]:
     """
     Get the most recent snapshot (trade, quote, minute/day bars) for a single ticker.
@@ -265,7 +743,7 @@ def get_ticker_snapshot(ticker: str) -> Dict[str, Any]:
         ticker: The ticker symbol (e.g., AAPL).
 
     Returns:
-        A dictionary containing the snapshot data for the ticker, converted from the client response.
+        A flat dictionary of every available snapshot field for the ticker (see `get_all_tickers_snapshot` for field names).
     """
     if rest_client is None:
         return {"error": "Polygon RESTClient is not initialized. Check API Key."}
@@ -274,10 +752,10 @@ def get_ticker_snapshot(ticker: str) -> Dict[str, Any]:
     ticker = ticker.upper()
 
     try:
-        # Call the RESTClient method directly
-        snapshot_obj = rest_client.get_snapshot_ticker(market_type="stocks", ticker=ticker)
-        # Convert the returned object (likely a TickerSnapshot) to a dictionary
-        return _to_dict(snapshot_obj)
+        # Call the RESTClient method through the shared Polygon quota
+        snapshot_obj = _polygon(rest_client.get_snapshot_ticker, market_type="stocks", ticker=ticker)
+        # Flatten the returned TickerSnapshot, keeping every schema field that is present
+        return _serialize_snapshots([snapshot_obj], fields=list(SNAPSHOT_SCHEMA))[0]
     except Exception as e:
         print(f"Error in get_ticker_snapshot MCP tool for {ticker}: {e}")
         # Handle potential 404 or other client errors gracefully
@@ -286,17 +764,29 @@ def get_ticker_snapshot(ticker: str) -> Dict[str, Any]:
         return {"error": f"An unexpected error occurred while fetching snapshot for {ticker}: {str(e)}"}
 
 @mcp.tool()
-def get_all_tickers_snapshot(tickers: List[str], include_otc: bool = False) -> List[Dict[str, Any]]:
+@govern_output()
+def get_all_tickers_snapshot(
+    tickers: List[str],
+    include_otc: bool = False,
+    fields: Optional[List[str]] = None,
+    columnar: bool = False
+) -> Any:
     """
     Get the most recent snapshot data for all tickers in a given market.
 
     Args:
         tickers: A list of ticker symbols to fetch snapshots for.
         include_otc: Whether to include OTC securities in the response (default: False).
+        fields: Flat snapshot fields to return. Defaults to ticker, change_percent, day_close,
+                day_volume, day_vwap, prev_close, prev_volume and last_trade_price. Other available
+                fields: change, updated, fair_market_value, day_open/high/low, prev_open/high/low/vwap,
+                min_open/high/low/close/volume/vwap/accumulated_volume/timestamp,
+                last_trade_size, last_trade_timestamp, bid, bid_size, ask, ask_size.
+        columnar: If True, return {"count": n, "columns": {field: [values...]}} instead of one
+                  dictionary per ticker. Recommended when requesting many tickers.
 
     Returns:
-        A list of dictionaries representing snapshot data for all tickers in the market.
-        Each dictionary is converted from the client's response objects.
+        A list of flat dictionaries (one per ticker) or a columnar dictionary, depending on `columnar`.
         Returns a list containing an error dictionary if the client is not initialized or an error occurs.
     """
     if rest_client is None:
@@ -306,33 +796,40 @@ def get_all_tickers_snapshot(tickers: List[str], include_otc: bool = False) -> L
     capitalized_tickers = [t.upper() for t in tickers]
 
     try:
-        # Call the RESTClient method directly
-        snapshot_iterator = rest_client.get_snapshot_all(
+        # Call the RESTClient method through the shared Polygon quota
+        snapshot_iterator = _polygon(
+            rest_client.get_snapshot_all,
             market_type='stocks',
             tickers=capitalized_tickers,
             include_otc=include_otc
         )
-        # Convert the iterator of snapshot objects to a list of dictionaries
-        snapshots_list = [_to_dict(s) for s in snapshot_iterator]
-        return snapshots_list
+        # Flatten the snapshot objects into the requested projection
+        return _serialize_snapshots(snapshot_iterator, fields=fields, columnar=columnar)
 
     except Exception as e:
         print(f"Error in get_all_tickers_snapshot MCP tool: {e}")
         return [{"error": f"An unexpected error occurred: {str(e)}"}]
 
 @mcp.tool()
-def get_market_movers(direction: str, include_otc: bool = False) -> List[Dict[str, Any]]:
+@govern_output()
+def get_market_movers(
+    direction: str,
+    include_otc: bool = False,
+    fields: Optional[List[str]] = None,
+    columnar: bool = False
+) -> Any:
     """
     Get the top market movers (gainers or losers) based on percentage change.
     Use with caution, it will likely return penny stocks with high volatility.
 
     Args:
         direction: The direction of movement ('gainers' or 'losers').
-        market_type: The market type (default: 'stocks').
         include_otc: Whether to include OTC securities (default: False).
+        fields: Flat snapshot fields to return (same options as `get_all_tickers_snapshot`).
+        columnar: If True, return {"count": n, "columns": {field: [values...]}}.
 
     Returns:
-        A list of dictionaries representing snapshot data for top movers, converted from client response.
+        A list of flat dictionaries representing snapshot data for top movers, or a columnar dictionary.
         Returns a list containing an error dictionary if the client is not initialized,
         an error occurs, or the direction is invalid.
     """
@@ -341,21 +838,22 @@ def get_market_movers(direction: str, include_otc: bool = False) -> List[Dict[st
     if direction not in ['gainers', 'losers']:
         return [{"error": "Invalid direction specified. Use 'gainers' or 'losers'."}]
     try:
-        # Call the RESTClient method directly
-        movers_iterator = rest_client.get_snapshot_direction(
+        # Call the RESTClient method through the shared Polygon quota
+        movers_iterator = _polygon(
+            rest_client.get_snapshot_direction,
             market_type='stocks',
             direction=direction,
             include_otc=include_otc
             )
-        # Convert the iterator of snapshot objects to a list of dictionaries
-        movers_list = [_to_dict(m) for m in movers_iterator]
-        return movers_list
+        # Flatten the snapshot objects into the requested projection
+        return _serialize_snapshots(movers_iterator, fields=fields, columnar=columnar)
 
     except Exception as e:
         print(f"Error in get_market_movers MCP tool for {direction}: {e}")
         return [{"error": f"An unexpected error occurred: {str(e)}"}]
 
 @mcp.tool()
+@govern_output()
 def get_market_status() -> Dict[str, Any]:
     """
     Get the current trading status of the overall US market and specific exchanges.
@@ -367,8 +865,8 @@ def get_market_status() -> Dict[str, Any]:
     if rest_client is None:
         return {"error": "Polygon RESTClient is not initialized. Check API Key."}
     try:
-        # Call the RESTClient method directly
-        status_obj = rest_client.get_market_status()
+        # Call the RESTClient method through the shared Polygon quota
+        status_obj = _polygon(rest_client.get_market_status)
         # Convert the returned object to a dictionary
         return _to_dict(status_obj)
     except Exception as e:
@@ -376,9 +874,93 @@ def get_market_status() -> Dict[str, Any]:
         return {"error": f"An unexpected error occurred: {str(e)}"}
 
 @mcp.tool()
+@govern_output()
+@_offload
+def screen_universe(
+    as_of_date: Optional[str] = None,
+    lookback_days: int = 60,
+    min_price: float = 5.0,
+    min_avg_dollar_volume: float = 10_000_000,
+    filters: Optional[Dict[str, List[Optional[float]]]] = None,
+    return_window: int = 5,
+    volume_window: int = 20,
+    volatility_window: int = 20,
+    sort_by: str = 'return_pct',
+    descending: bool = True,
+    limit: int = 25
+) -> Dict[str, Any]:
+    """
+    Screen every US-listed stock at once using Polygon grouped daily bars.
+
+    Builds (or reuses) a rolling panel of the last `lookback_days` trading sessions for ~10k
+    tickers and evaluates all metrics vectorized. Use this instead of calling per-ticker tools
+    in a loop, and instead of `get_market_movers` when penny stocks should be excluded.
+
+    Args:
+        as_of_date: Last session of the panel (YYYY-MM-DD). Defaults to today; if today's bars are
+                    not yet published the most recent completed session is used.
+        lookback_days: Number of trading sessions in the panel (default 60, use >= 55 for trend_score).
+        min_price: Minimum latest close (default 5.0).
+        min_avg_dollar_volume: Minimum average daily dollar volume over `volume_window` (default 10M).
+        filters: Optional metric bounds as {metric: [min, max]}, use null for an open bound,
+                 e.g. {"return_pct": [10, null], "volume_ratio": [2, null]}.
+                 Metrics: close, return_pct, volume_ratio, avg_dollar_volume, volatility_pct,
+                 zscore, trend_score (-1 to 1), momentum_rank (0 to 1).
+        return_window: Sessions used for `return_pct` (default 5).
+        volume_window: Prior sessions the latest volume is compared with for `volume_ratio` (default 20).
+        volatility_window: Sessions used for annualized `volatility_pct` and `zscore` (default 20).
+        sort_by: Metric to rank matches by (default 'return_pct').
+        descending: Sort order (default True).
+        limit: Maximum number of matches returned (default 25).
+
+    Returns:
+        A dictionary with the panel window, universe size, number of matches and the top matches
+        as a list of {ticker, metric: value} dictionaries rounded to 2 decimals.
+        Note: bars are split-adjusted as of the day they were downloaded.
+    """
+    as_of_date = as_of_date or _market_today()
+    if rest_client is None:
+        return {"error": "Polygon RESTClient is not initialized. Check API Key."}
+    try:
+        panel = _build_universe_panel(as_of_date, max(lookback_days, 2))
+        if not panel:
+            return {"error": f"No grouped daily data available up to {as_of_date}."}
+        metrics = trading_strategies.calculate_universe_metrics(
+            panel['close'], panel['volume'],
+            return_window=return_window, volume_window=volume_window, volatility_window=volatility_window
+        )
+        mask = (metrics['close'] >= min_price) & (metrics['avg_dollar_volume'] >= min_avg_dollar_volume)
+        for metric, bounds in (filters or {}).items():
+            if metric not in metrics.columns:
+                return {"error": f"Unknown filter metric '{metric}'. Available: {', '.join(metrics.columns)}"}
+            low, high = (list(bounds) + [None, None])[:2]
+            if low is not None:
+                mask &= metrics[metric] >= low
+            if high is not None:
+                mask &= metrics[metric] <= high
+        if sort_by not in metrics.columns:
+            return {"error": f"Unknown sort_by metric '{sort_by}'. Available: {', '.join(metrics.columns)}"}
+
+        matches = metrics[mask].sort_values(sort_by, ascending=not descending)
+        top = matches.head(limit).round(2).reset_index(names='ticker')
+        return {
+            "panel_start": panel['close'].index[0],
+            "panel_end": panel['close'].index[-1],
+            "sessions": len(panel['close']),
+            "universe_size": int(metrics['close'].notna().sum()),
+            "matches": len(matches),
+            "results": [{k: v for k, v in row.items() if pd.notna(v)} for row in top.to_dict('records')]
+        }
+    except Exception as e:
+        print(f"Error in screen_universe MCP tool: {e}")
+        return {"error": f"An unexpected error occurred: {str(e)}"}
+
+@mcp.tool()
+@govern_output()
+@_offload
 def get_trend_following_signals(
     ticker: str, 
-    end_date: str = default_to_date,
+    end_date: Optional[str] = None,
     num_bars: int = TREND_MIN_BARS
 ) -> Dict[str, Any]:
     """
@@ -402,6 +984,7 @@ def get_trend_following_signals(
         Only trading days (when the market is open) are used for calculations.
         The strategy uses ADX threshold of 20+ to confirm trend strength.
     """
+    end_date = end_date or _market_today()
     if rest_client is None:
         return {"error": "Polygon RESTClient is not initialized. Check API Key."}
     
@@ -421,9 +1004,11 @@ def get_trend_following_signals(
     return trading_strategies.calculate_trend_signals(df)
 
 @mcp.tool()
+@govern_output()
+@_offload
 def get_mean_reversion_signals(
     ticker: str, 
-    end_date: str = default_to_date,
+    end_date: Optional[str] = None,
     num_bars: int = MEAN_REVERSION_MIN_BARS
 ) -> Dict[str, Any]:
     """
@@ -446,6 +1031,7 @@ def get_mean_reversion_signals(
         Only trading days (when the market is open) are used for calculations.
         Uses Z-score thresholds of ±1.5 combined with Bollinger Band touches and RSI extremes.
     """
+    end_date = end_date or _market_today()
     if rest_client is None:
         return {"error": "Polygon RESTClient is not initialized. Check API Key."}
     
@@ -465,9 +1051,11 @@ def get_mean_reversion_signals(
     return trading_strategies.calculate_mean_reversion_signals(df)
 
 @mcp.tool()
+@govern_output()
+@_offload
 def get_momentum_signals(
     ticker: str, 
-    end_date: str = default_to_date,
+    end_date: Optional[str] = None,
     num_bars: int = MOMENTUM_MIN_BARS
 ) -> Dict[str, Any]:
     """
@@ -491,6 +1079,7 @@ def get_momentum_signals(
         Only trading days (when the market is open) are used for calculations.
         Uses rank normalization of returns for each time window to improve weighting scheme.
     """
+    end_date = end_date or _market_today()
     if rest_client is None:
         return {"error": "Polygon RESTClient is not initialized. Check API Key."}
     
@@ -510,9 +1099,11 @@ def get_momentum_signals(
     return trading_strategies.calculate_momentum_signals(df)
 
 @mcp.tool()
+@govern_output()
+@_offload
 def get_volatility_signals(
     ticker: str, 
-    end_date: str = default_to_date,
+    end_date: Optional[str] = None,
     num_bars: int = VOLATILITY_MIN_BARS
 ) -> Dict[str, Any]:
     """
@@ -536,6 +1127,7 @@ def get_volatility_signals(
         Only trading days (when the market is open) are used for calculations.
         Uses a breakout hypothesis (low volatility suggests potential expansion).
     """
+    end_date = end_date or _market_today()
     if rest_client is None:
         return {"error": "Polygon RESTClient is not initialized. Check API Key."}
     
@@ -555,9 +1147,11 @@ def get_volatility_signals(
     return trading_strategies.calculate_volatility_signals(df)
 
 @mcp.tool()
+@govern_output()
+@_offload
 def get_statistical_arbitrage_signals(
     ticker: str, 
-    end_date: str = default_to_date,
+    end_date: Optional[str] = None,
     num_bars: int = STAT_ARB_MIN_BARS
 ) -> Dict[str, Any]:
     """
@@ -581,6 +1175,7 @@ def get_statistical_arbitrage_signals(
         Only trading days (when the market is open) are used for calculations.
         Uses annualized returns for interpretable skewness and kurtosis statistics.
     """
+    end_date = end_date or _market_today()
     if rest_client is None:
         return {"error": "Polygon RESTClient is not initialized. Check API Key."}
     
@@ -600,9 +1195,11 @@ def get_statistical_arbitrage_signals(
     return trading_strategies.calculate_stat_arb_signals(df)
 
 @mcp.tool()
+@govern_output()
+@_offload
 def get_all_trading_signals(
     ticker: str, 
-    end_date: str = default_to_date,
+    end_date: Optional[str] = None,
     num_bars: int = COMBINED_MIN_BARS
 ) -> Dict[str, Any]:
     """
@@ -625,6 +1222,7 @@ def get_all_trading_signals(
         Each strategy uses its recommended number of bars, appropriately scaled
         based on the provided num_bars parameter.
     """
+    end_date = end_date or _market_today()
     if rest_client is None:
         return {"error": "Polygon RESTClient is not initialized. Check API Key."}
     
@@ -655,5 +1253,29 @@ def get_all_trading_signals(
     }
 
 
+@mcp.tool()
+@govern_output()
+def read_tool_output(handle: str, path: Optional[str] = None, offset: int = 0) -> Dict[str, Any]:
+    """
+    Reads the part of a tool result that was cut to fit the output budget. Any tool whose result
+    was too large returns it shortened, with a 'truncated' field naming what was cut and a handle.
+
+    Args:
+        handle: The 'handle' from the 'truncated' field of the cut-down result.
+        path: Where to read, as dot-separated keys and list indexes (e.g. 'transcript' or
+              'annual.3'); the paths of cut values are listed in 'truncated.omitted'. Defaults to
+              the whole result.
+        offset: First list item, table row or character to return (default: 0). Pass the
+                'next_offset' of the previous call to continue.
+
+    Returns:
+        A dictionary with 'value' (the items, rows or text from `offset` that fit in one response),
+        'total_items' or 'total_chars', and 'next_offset' (None when nothing is left). For an
+        object too large to return at once, 'parts' lists its paths with their estimated tokens.
+        Returns a dictionary with an 'error' key for an unknown or expired handle or a wrong path.
+    """
+    return read_output(handle, path, offset)
+
+
 if __name__ == "__main__":
     mcp.run('stdio')
\ No newline at end of file
@@ -0,0 +1,202 @@
+"""
+Local news index by (ticker, published time), filled in the background by news_ingest.py.
+
+Stories from every provider are stored in Tickertick's shape (id, title, url, site, time in ms,
+lower-case tickers, description, similar_stories), one row per story, and a story found under
+another id at the same canonical URL is stored once. story_tickers holds one row per
+(ticker, time, story), so the newest stories of a set of tickers is a range scan of its primary
+key. ingest_state records, per ticker and provider, the last successful poll, the newest story
+seen, the ranges still to backfill and the last error; readers use it to decide whether the
+index is fresh enough to answer from, and the ingester to fetch only what is missing.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+from disk_cache import CACHE_DIR
+
+INDEX_PATH = CACHE_DIR / "news_index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stories (
+    id TEXT PRIMARY KEY, url_key TEXT, time INTEGER NOT NULL, provider TEXT NOT NULL, story TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS stories_url_key ON stories (url_key);
+CREATE INDEX IF NOT EXISTS stories_time ON stories (time);
+CREATE TABLE IF NOT EXISTS story_tickers (
+    ticker TEXT NOT NULL, time INTEGER NOT NULL, id TEXT NOT NULL, PRIMARY KEY (ticker, time, id)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ingest_state (
+    ticker TEXT NOT NULL, provider TEXT NOT NULL, polled_at REAL, newest INTEGER, error TEXT, backfill TEXT,
+    PRIMARY KEY (ticker, provider));
+"""
+
+
+def url_key(url: Optional[str]) -> Optional[str]:
+    """Hash of a URL without scheme, 'www.', query, fragment or trailing slash."""
+    if not url:
+        return None
+    parts = urlsplit(url.strip().lower())
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    return hashlib.sha1(f"{host}{parts.path.rstrip('/')}".encode()).hexdigest()[:16]
+
+
+class NewsIndex:
+    """Stories by (ticker, published time) plus per-ticker ingestion state, safe across threads and processes."""
+
+    def __init__(self, path: Path = INDEX_PATH):
+        self.path = Path(path)
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    @contextmanager
+    def _connection(self):
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    with sqlite3.connect(self.path, timeout=30) as conn:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.executescript(_SCHEMA)
+                        columns = {row[1] for row in conn.execute("PRAGMA table_info(ingest_state)")}
+                        if "backfill" not in columns: # index created before backfill cursors
+                            conn.execute("ALTER TABLE ingest_state ADD COLUMN backfill TEXT")
+                    conn.close()
+                    self._ready = True
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add(self, stories: Iterable[Dict[str, Any]], provider: str, ticker: Optional[str] = None) -> int:
+        """
+        Store stories and index them under their tickers (and `ticker`, the one they were polled for).
+
+        Returns the number of stories that were not in the index yet.
+        """
+        added = 0
+        with self._connection() as conn:
+            for story in stories:
+                if not story.get("time"):
+                    continue
+                key = url_key(story.get("url"))
+                row = conn.execute("SELECT id FROM stories WHERE url_key = ?", (key,)).fetchone() if key else None
+                story_id = row[0] if row else story["id"]
+                if row is None:
+                    added += conn.execute(
+                        "INSERT OR IGNORE INTO stories (id, url_key, time, provider, story) VALUES (?, ?, ?, ?, ?)",
+                        (story_id, key, int(story["time"]), provider, json.dumps(story)),
+                    ).rowcount
+                tickers = {t.lower() for t in story.get("tickers") or ()}
+                if ticker:
+                    tickers.add(ticker.lower())
+                conn.executemany(
+                    "INSERT OR IGNORE INTO story_tickers (ticker, time, id) VALUES (?, ?, ?)",
+                    [(t, int(story["time"]), story_id) for t in tickers],
+                )
+        return added
+
+    def query(self, tickers: Sequence[str], limit: int, before_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The newest `limit` stories about any of `tickers` (older than story `before_id`, if given), newest first."""
+        tickers = [t.lower() for t in tickers]
+        marks = ", ".join("?" * len(tickers))
+        with self._connection() as conn:
+            before = None
+            if before_id:
+                row = conn.execute("SELECT time FROM stories WHERE id = ?", (before_id,)).fetchone()
+                before = row[0] if row else None
+            rows = conn.execute(
+                f"SELECT DISTINCT time, id FROM story_tickers WHERE ticker IN ({marks}) AND time < ? "
+                "ORDER BY time DESC LIMIT ?",
+                (*tickers, before if before is not None else 2 ** 62, limit),
+            ).fetchall()
+            ids = [story_id for _, story_id in rows]
+            stored = dict(conn.execute(
+                f"SELECT id, story FROM stories WHERE id IN ({', '.join('?' * len(ids))})", ids
+            ).fetchall()) if ids else {}
+        return [json.loads(stored[i]) for i in ids if i in stored]
+
+    def freshness(self, tickers: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Ingestion state of the watched tickers among `tickers`:
+        {ticker: {'polled_at', 'newest', 'backfilling', 'errors'}}.
+
+        'polled_at' is the latest successful poll of any provider (None if none succeeded yet),
+        'newest' the time (ms) of the newest story seen, 'backfilling' whether older stories are
+        still being fetched and 'errors' the last error per provider. Tickers that are not on
+        the ingester's watchlist are left out.
+        """
+        if not self.path.exists():
+            return {}
+        tickers = [t.lower() for t in tickers]
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"SELECT ticker, provider, polled_at, newest, error, backfill FROM ingest_state "
+                f"WHERE ticker IN ({', '.join('?' * len(tickers))})",
+                tickers,
+            ).fetchall()
+        state: Dict[str, Dict[str, Any]] = {}
+        for ticker, provider, polled_at, newest, error, backfill in rows:
+            entry = state.setdefault(ticker, {"polled_at": None, "newest": None, "backfilling": False, "errors": {}})
+            entry["backfilling"] = entry["backfilling"] or bool(backfill)
+            if polled_at is not None:
+                entry["polled_at"] = max(entry["polled_at"] or 0.0, polled_at)
+            if newest is not None:
+                entry["newest"] = max(entry["newest"] or 0, newest)
+            if error:
+                entry["errors"][provider] = error
+        return state
+
+    def newest(self, ticker: str, provider: str) -> Optional[int]:
+        """Time (ms) of the newest story a provider has returned for the ticker, None before the first poll."""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT newest FROM ingest_state WHERE ticker = ? AND provider = ?", (ticker.lower(), provider)
+            ).fetchone()
+        return row[0] if row else None
+
+    def backfill(self, ticker: str, provider: str) -> List[Dict[str, Any]]:
+        """
+        Ranges a provider's polls have not fetched yet, newest first: [{'last': id, 'until': ms}],
+        i.e. the stories older than story `last` and published after `until`.
+        """
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT backfill FROM ingest_state WHERE ticker = ? AND provider = ?", (ticker.lower(), provider)
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] else []
+
+    def record_poll(
+        self, ticker: str, provider: str, newest: Optional[int] = None, error: Optional[str] = None,
+        backfill: Optional[List[Dict[str, Any]]] = None,
+    ):
+        """Record a poll: a success updates polled_at, newest and the backfill ranges, a failure only the error."""
+        ticker = ticker.lower()
+        with self._connection() as conn:
+            if error is None:
+                conn.execute(
+                    "INSERT INTO ingest_state (ticker, provider, polled_at, newest, error, backfill) VALUES (?, ?, ?, ?, NULL, ?) "
+                    "ON CONFLICT (ticker, provider) DO UPDATE SET polled_at = excluded.polled_at, "
+                    "newest = max(coalesce(newest, 0), coalesce(excluded.newest, 0)), error = NULL, "
+                    "backfill = excluded.backfill",
+                    (ticker, provider, time.time(), newest, json.dumps(backfill) if backfill else None),
+                )
+            else:
+                conn.execute(
+                    "INSERT INTO ingest_state (ticker, provider, error) VALUES (?, ?, ?) "
+                    "ON CONFLICT (ticker, provider) DO UPDATE SET error = excluded.error",
+                    (ticker, provider, error),
+                )
+
+    def purge(self, max_age: float) -> int:
+        """Drop stories published more than `max_age` seconds ago; returns how many were removed."""
+        cutoff = int((time.time() - max_age) * 1000)
+        with self._connection() as conn:
+            conn.execute("DELETE FROM story_tickers WHERE time < ?", (cutoff,))
+            return conn.execute("DELETE FROM stories WHERE time < ?", (cutoff,)).rowcount
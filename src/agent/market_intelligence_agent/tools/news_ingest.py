@@ -0,0 +1,154 @@
+"""
+Background news ingestion for a watchlist into the local news index (news_index.py).
+
+Every POLL_INTERVAL seconds each watched ticker is polled on Tickertick (its broad `tt:` feed)
+and, when POLYGON_API_KEY is set, on Polygon's ticker news; only stories newer than the last
+poll are fetched (the first poll backfills BACKFILL_DAYS). A Tickertick poll reads at most
+MAX_TICKERTICK_PAGES pages; when that stops short of the last poll, the rest is recorded as a
+backfill range in the index and fetched by the following polls. Requests go through the same
+rate limiters as the tool servers, at batch priority, so agent runs keep their share of the
+Tickertick window. The researcher's news tools answer watched tickers from the index while it
+is fresh and say how fresh it is.
+
+Usage:
+    python news_ingest.py AAPL MSFT NVDA [--interval 300] [--once]
+    NEWS_WATCHLIST=AAPL,MSFT,NVDA python news_ingest.py
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import market_data
+import tickertick
+from news_index import NewsIndex
+from rate_limiter import BATCH
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 5 * 60
+BACKFILL_DAYS = 3
+RETENTION_DAYS = 14
+TICKERTICK_PAGE = 50
+MAX_TICKERTICK_PAGES = 4 # per ticker and poll for new stories, and as many again for a backfill range
+POLYGON_PAGE = 100
+
+
+async def poll_tickertick(ticker: str, since_ms: int, last_id: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Stories on the ticker's broad feed published after `since_ms` (and before story `last_id`,
+    if given), newest first, and the id to continue from if the page limit was hit before
+    reaching `since_ms` (else None).
+    """
+    stories, cursor = [], last_id
+    for _ in range(MAX_TICKERTICK_PAGES):
+        page = await tickertick._fetch_page(f"tt:{ticker.lower()}", TICKERTICK_PAGE, cursor, priority=BATCH)
+        fresh = [s for s in page if s.get("time", 0) > since_ms]
+        stories += fresh
+        if len(fresh) < len(page) or len(page) < TICKERTICK_PAGE:
+            return stories, None
+        cursor = page[-1]["id"]
+    return stories, cursor
+
+
+def _polygon_story(item: Any) -> Dict[str, Any]:
+    """A Polygon TickerNews in the index's (Tickertick) story shape."""
+    published = datetime.fromisoformat(item.published_utc.replace("Z", "+00:00"))
+    publisher = getattr(item, "publisher", None)
+    return {
+        "id": f"polygon:{item.id}",
+        "title": item.title,
+        "url": item.article_url,
+        "site": getattr(publisher, "name", None),
+        "time": int(published.timestamp() * 1000),
+        "tickers": [t.lower() for t in item.tickers or ()],
+        "description": getattr(item, "description", None),
+    }
+
+
+def poll_polygon(ticker: str, since_ms: int) -> List[Dict[str, Any]]:
+    """Polygon news about the ticker published after `since_ms`."""
+    since = datetime.fromtimestamp(since_ms / 1000, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    items = market_data._polygon(
+        market_data.rest_client.list_ticker_news,
+        ticker=ticker.upper(), published_utc_gt=since, order="desc", sort="published_utc", limit=POLYGON_PAGE,
+        priority=BATCH,
+    )
+    return [_polygon_story(item) for item in items if getattr(item, "published_utc", None)]
+
+
+async def backfill_tickertick(index: NewsIndex, ticker: str, ranges: List[Dict[str, Any]]) -> int:
+    """Continue the newest backfill range by up to MAX_TICKERTICK_PAGES pages; the others wait for later polls."""
+    current, rest = ranges[0], ranges[1:]
+    try:
+        stories, cursor = await poll_tickertick(ticker, current["until"], current["last"])
+    except Exception as e: # the range stays recorded and is retried on the next poll
+        logger.warning(f"tickertick backfill for {ticker} failed: {e}")
+        return 0
+    added = index.add(stories, "tickertick", ticker)
+    index.record_poll(ticker, "tickertick", backfill=([{**current, "last": cursor}] if cursor else []) + rest)
+    return added
+
+
+async def ingest_ticker(index: NewsIndex, ticker: str, provider: str) -> int:
+    """Poll one provider for one ticker and add what is new; failures are recorded, not raised."""
+    since = index.newest(ticker, provider) or int((time.time() - BACKFILL_DAYS * 86400) * 1000)
+    try:
+        if provider == "tickertick":
+            stories, cursor = await poll_tickertick(ticker, since)
+        else:
+            stories, cursor = await asyncio.to_thread(poll_polygon, ticker, since), None
+    except Exception as e:
+        logger.warning(f"{provider} news for {ticker} failed: {e}")
+        index.record_poll(ticker, provider, error=str(e))
+        return 0
+    # newest moves past the stories between `since` and the last page read, so they are kept as
+    # a backfill range until a later poll has fetched them
+    ranges = index.backfill(ticker, provider)
+    if cursor:
+        ranges.insert(0, {"last": cursor, "until": since})
+    added = index.add(stories, provider, ticker)
+    index.record_poll(ticker, provider, newest=max((s["time"] for s in stories), default=None), backfill=ranges)
+    if ranges:
+        added += await backfill_tickertick(index, ticker, ranges)
+    return added
+
+
+async def ingest_once(index: NewsIndex, tickers: Sequence[str]) -> Dict[str, int]:
+    """One poll of every watched ticker on every available provider; returns stories added per ticker."""
+    providers = ["tickertick"] + (["polygon"] if market_data.rest_client is not None else [])
+    jobs = [(ticker, provider) for ticker in tickers for provider in providers]
+    added = await asyncio.gather(*(ingest_ticker(index, ticker, provider) for ticker, provider in jobs))
+    totals = dict.fromkeys(tickers, 0)
+    for (ticker, _), count in zip(jobs, added):
+        totals[ticker] += count
+    return totals
+
+
+async def run(tickers: Sequence[str], interval: float = POLL_INTERVAL, once: bool = False):
+    index = NewsIndex()
+    while True:
+        started = time.monotonic()
+        totals = await ingest_once(index, tickers)
+        purged = index.purge(RETENTION_DAYS * 86400)
+        logger.info(f"ingested {sum(totals.values())} new stories {totals}, purged {purged} "
+                    f"in {time.monotonic() - started:.1f}s")
+        if once:
+            return
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest news for a watchlist into the local news index.")
+    parser.add_argument("tickers", nargs="*", help="watchlist (default: NEWS_WATCHLIST, comma separated)")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="seconds between polls")
+    parser.add_argument("--once", action="store_true", help="poll once and exit (e.g. from cron)")
+    args = parser.parse_args()
+    watchlist = args.tickers or [t.strip() for t in os.getenv("NEWS_WATCHLIST", "").split(",") if t.strip()]
+    if not watchlist:
+        parser.error("no tickers given and NEWS_WATCHLIST is not set")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(run([t.upper() for t in watchlist], args.interval, args.once))
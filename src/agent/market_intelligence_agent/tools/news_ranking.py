@@ -0,0 +1,198 @@
+"""
+Local pre-ranking, near-duplicate collapsing and token-budget packing for news results.
+
+The news tool servers run their results through `rank_and_pack` before returning them:
+items are scored by ticker match, recency and source quality (times any relevance score the
+provider already supplies), near-duplicate headlines are collapsed by the Jaccard similarity
+of their word sets, and the best items are trimmed and packed into a token budget. Token
+counts are estimated as JSON characters / 4, which is close enough for budgeting.
+"""
+import json
+import math
+import os
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("NEWS_TOKEN_BUDGET", "2500"))
+MAX_TEXT_CHARS = 400 # descriptions/snippets are cut to this length before packing
+RECENCY_HALF_LIFE_HOURS = 24.0
+# Headlines whose word sets overlap at least this much (Jaccard) are treated as the same story.
+# On rewrites of one story (synonyms, an added word or source suffix) similarity was 0.71-1.0;
+# on same-company headlines with a different or opposite meaning ("Apple stock falls"/"rises",
+# Q3/Q4, CEO/CFO, cuts/raises prices) it was at most 0.67.
+NEAR_DUPLICATE_JACCARD = 0.7
+
+# Relative weight of a source; unknown domains get DEFAULT_SOURCE_QUALITY
+SOURCE_QUALITY: Dict[str, float] = {
+    "reuters.com": 1.0, "bloomberg.com": 1.0, "wsj.com": 1.0, "ft.com": 1.0, "sec.gov": 1.0,
+    "apnews.com": 0.95, "cnbc.com": 0.9, "barrons.com": 0.9, "economist.com": 0.9, "nytimes.com": 0.9,
+    "marketwatch.com": 0.85, "businessinsider.com": 0.75, "finance.yahoo.com": 0.75, "fool.com": 0.6,
+    "seekingalpha.com": 0.6, "benzinga.com": 0.6, "investorplace.com": 0.5, "zacks.com": 0.5,
+}
+DEFAULT_SOURCE_QUALITY = 0.65
+
+_WORD_RE = re.compile(r"[a-z0-9$%]+")
+_POSSESSIVE_RE = re.compile(r"['’]s\b")
+# A trailing " - Reuters" / " | Yahoo Finance" style source name (at most three words)
+_SOURCE_SUFFIX_RE = re.compile(r"\s+[-|–—]\s+[A-Z][^-|–—\s]*(?:\s+[^-|–—\s]+){0,2}\s*$")
+_EXCHANGES = r"(?:NYSE|NASDAQ|NYSEARCA|NYSEAMERICAN|AMEX|OTC|TSX|LSE|CBOE)"
+# Tickers that are also everyday words; like 1-2 letter tickers they only count when written
+# as $T, (T) or EXCHANGE:T in a headline
+COMMON_WORD_TICKERS = frozenset({
+    "ALL", "ANY", "ARE", "BIG", "CAN", "CAR", "CASH", "DOG", "EAT", "FAST", "FUN", "GOOD", "HAS",
+    "HOME", "KEY", "LIFE", "LOVE", "LOW", "MAN", "MAIN", "NEW", "NOW", "ONE", "OPEN", "OUT", "PLAY",
+    "REAL", "RUN", "SAVE", "SEE", "SHOP", "TRUE", "TWO", "USA", "WELL", "WIN", "YOU",
+})
+
+
+def source_quality(url: Optional[str]) -> float:
+    """Weight of the site a URL belongs to (subdomains inherit their parent's weight)."""
+    host = urlsplit(url or "").netloc.lower().split(":")[0]
+    while host:
+        if host in SOURCE_QUALITY:
+            return SOURCE_QUALITY[host]
+        host = host.partition(".")[2]
+    return DEFAULT_SOURCE_QUALITY
+
+
+def ticker_mention(ticker: str) -> re.Pattern:
+    """
+    Pattern for a headline mention of a ticker. Short (1-2 letter) and common-word tickers must be
+    written as $T, (T) or EXCHANGE:T; others may also appear as a bare upper-case word.
+    """
+    t = re.escape(ticker.upper())
+    tagged = rf"(?:\${t}|\({t}\)|\b{_EXCHANGES}\s*:\s*{t})(?![\w.])"
+    if len(ticker) <= 2 or ticker.upper() in COMMON_WORD_TICKERS:
+        return re.compile(tagged, re.IGNORECASE)
+    return re.compile(rf"{tagged}|(?<![\w$]){t}(?![\w])")
+
+
+def recency_weight(published: Optional[float], now: Optional[float] = None) -> float:
+    """Exponential decay with a RECENCY_HALF_LIFE_HOURS half-life, from 1 (now) towards 0.2 (old)."""
+    if published is None:
+        return 0.6
+    age_hours = max(0.0, ((now or time.time()) - published) / 3600)
+    return 0.2 + 0.8 * 0.5 ** (age_hours / RECENCY_HALF_LIFE_HOURS)
+
+
+def headline_words(text: str) -> frozenset:
+    """Word set of a headline, without possessive 's and a trailing source name."""
+    return frozenset(_WORD_RE.findall(_POSSESSIVE_RE.sub("", _SOURCE_SUFFIX_RE.sub("", text).lower())))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def group_near_duplicates(
+    items: Sequence[Dict[str, Any]],
+    text: Callable[[Dict[str, Any]], str],
+    related: Optional[Callable[[Dict[str, Any]], Sequence[str]]] = None,
+    key: Optional[Callable[[Dict[str, Any]], str]] = None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Group near-duplicate items; each group starts with its first (i.e. best, if sorted) item.
+
+    Two items are near-duplicates when the word sets of their text (see `headline_words`) have
+    a Jaccard similarity of at least NEAR_DUPLICATE_JACCARD, or when `related` of one lists the
+    `key` of the other (e.g. Tickertick's similar_stories ids).
+    """
+    groups: List[List[Dict[str, Any]]] = []
+    word_sets: List[Optional[frozenset]] = []
+    owner: Dict[str, int] = {} # key or related key -> group index
+    for item in items:
+        content = text(item)
+        words = headline_words(content) if content else None
+        match = None
+        if words:
+            match = next((i for i, w in enumerate(word_sets) if w and jaccard(words, w) >= NEAR_DUPLICATE_JACCARD), None)
+        if match is None and key is not None:
+            match = owner.get(key(item))
+        if match is None and related is not None:
+            match = next((owner[r] for r in related(item) or () if r in owner), None)
+        if match is None:
+            groups.append([])
+            word_sets.append(words)
+            match = len(groups) - 1
+        groups[match].append(item)
+        if key is not None:
+            owner.setdefault(key(item), match)
+        for r in (related(item) or ()) if related is not None else ():
+            owner.setdefault(r, match)
+    return groups
+
+
+def estimate_tokens(value: Any) -> int:
+    return math.ceil(len(json.dumps(value, default=str)) / 4)
+
+
+def trim_text(text: Optional[str], limit: int = MAX_TEXT_CHARS) -> Optional[str]:
+    if not text or len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+def pack(items: Sequence[Dict[str, Any]], token_budget: int) -> List[Dict[str, Any]]:
+    """The longest prefix of `items` whose estimated size fits the budget (always at least one item)."""
+    packed: List[Dict[str, Any]] = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(item)
+        if packed and used + cost > token_budget:
+            break
+        packed.append(item)
+        used += cost
+    return packed
+
+
+def rank_and_pack(
+    items: Sequence[Dict[str, Any]],
+    *,
+    title: Callable[[Dict[str, Any]], str],
+    url: Callable[[Dict[str, Any]], Optional[str]],
+    published: Callable[[Dict[str, Any]], Optional[float]],
+    tickers: Sequence[str] = (),
+    item_tickers: Optional[Callable[[Dict[str, Any]], Sequence[str]]] = None,
+    relevance: Optional[Callable[[Dict[str, Any]], Optional[float]]] = None,
+    related: Optional[Callable[[Dict[str, Any]], Sequence[str]]] = None,
+    key: Optional[Callable[[Dict[str, Any]], str]] = None,
+    slim: Callable[[Dict[str, Any]], Dict[str, Any]] = dict,
+    token_budget: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Score, de-duplicate, slim and pack news items.
+
+    Returns {'items': packed slim items, best first, 'groups': the original items behind each
+    packed item (the item and its collapsed near-duplicates), 'considered': number of inputs}.
+
+    Score = ticker match x recency x source quality x provider relevance (when given). Ticker
+    match is 1 for items tagged with, or mentioning (see `ticker_mention`), one of `tickers`, 0.5 otherwise, and 1 for
+    everything when no tickers are given. `slim` maps an item to the fields worth returning.
+    """
+    wanted = {t.lower() for t in tickers}
+    mentions = [ticker_mention(t) for t in tickers]
+    now = time.time()
+
+    def score(item: Dict[str, Any]) -> float:
+        match = 1.0
+        if wanted:
+            tagged = {t.lower() for t in (item_tickers(item) if item_tickers else ()) or ()}
+            mentioned = tagged & wanted or any(m.search(title(item) or "") for m in mentions)
+            match = 1.0 if mentioned else 0.5
+        weight = match * recency_weight(published(item), now) * source_quality(url(item))
+        if relevance is not None:
+            weight *= relevance(item) if relevance(item) is not None else 0.5
+        return weight
+
+    ranked = sorted(items, key=score, reverse=True)
+    groups = group_near_duplicates(ranked, text=lambda i: title(i) or "", related=related, key=key)
+    slimmed = []
+    for group in groups:
+        slim_item = slim(group[0])
+        if len(group) > 1:
+            slim_item["duplicates"] = len(group) - 1
+        slimmed.append(slim_item)
+    packed = pack(slimmed, token_budget or DEFAULT_TOKEN_BUDGET)
+    return {"items": packed, "groups": groups[:len(packed)], "considered": len(items)}
@@ -0,0 +1,329 @@
+"""
+Size budgets for MCP tool results, shared by the tool servers.
+
+Every `@mcp.tool()` function is wrapped in `govern_output`, which measures its result as the JSON
+text that FastMCP sends to the client and compares it with the tool's byte and token
+budgets (TOOL_OUTPUT_MAX_BYTES / TOOL_OUTPUT_MAX_TOKENS by default; tokens are estimated as
+JSON characters / 4). A result within budget is returned untouched. An oversized result is
+stored whole in the shared output store and cut down structurally until it fits: trailing
+list items and table rows are dropped (columnar tables are cut across all columns at once),
+long strings are shortened, and dictionaries share the cut between their large values. The
+returned payload then carries a 'truncated' summary with the original size, what was cut at
+which path, and a handle that `read_output` (exposed as the `read_tool_output` tool) pages
+through.
+
+Per-tool call counts, sizes and truncations are accumulated across the short-lived server
+processes in CACHE_DIR/tool_outputs_metrics.sqlite; `python output_governor.py` prints them.
+"""
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import math
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pydantic_core
+
+from disk_cache import CACHE_DIR, DiskCache
+
+logger = logging.getLogger(__name__)
+
+MAX_TOKENS = int(os.getenv("TOOL_OUTPUT_MAX_TOKENS", "6000"))
+MAX_BYTES = int(os.getenv("TOOL_OUTPUT_MAX_BYTES", str(64 * 1024)))
+CHARS_PER_TOKEN = 4
+SUMMARY_RESERVE = 1024 # bytes kept free for the 'truncated' summary
+MIN_TEXT_CHARS = 200 # strings are never cut below this length
+OUTPUT_TTL_SECONDS = 24 * 3600 # stored full results are kept this long
+
+_outputs = DiskCache("tool_outputs")
+_metrics_path = CACHE_DIR / "tool_outputs_metrics.sqlite"
+_purged = False
+
+
+def _serialize(value: Any) -> str:
+    return json.dumps(value, default=str)
+
+
+def _limit(max_tokens: Optional[int], max_bytes: Optional[int]) -> int:
+    return min(max_bytes or MAX_BYTES, (max_tokens or MAX_TOKENS) * CHARS_PER_TOKEN)
+
+
+def _columns(value: Dict[str, Any]) -> Optional[int]:
+    """Row count if the dictionary is a columnar table (several lists of one length), else None."""
+    lengths = {len(v) for v in value.values() if isinstance(v, list)}
+    lists = sum(isinstance(v, list) for v in value.values())
+    return lengths.pop() if lists > 1 and len(lengths) == 1 else None
+
+
+def _record_cut(omitted: Dict[str, Dict[str, Any]], path: str, unit: str, kept: int, total: int):
+    entry = omitted.setdefault(path or ".", {"path": path or ".", f"total_{unit}": total})
+    entry[f"kept_{unit}"] = kept
+
+
+def _shrink(value: Any, size: int, excess: int, path: str, omitted: Dict[str, Dict[str, Any]]) -> Any:
+    """
+    `value` (serializing to `size` characters) with roughly `excess` characters removed; the
+    cuts are recorded in `omitted`.
+    """
+    if excess <= 0:
+        return value
+    child_path = lambda key: f"{path}.{key}" if path else str(key)
+
+    if isinstance(value, str):
+        if len(value) <= MIN_TEXT_CHARS:
+            return value
+        keep = max(MIN_TEXT_CHARS, len(value) - excess - 1)
+        _record_cut(omitted, path, "chars", keep, len(value))
+        return value[:keep] + "…"
+
+    if isinstance(value, list):
+        if not value:
+            return value
+        budget, used, keep = size - excess, 2, 0 # only the kept prefix is measured
+        first = len(_serialize(value[0]))
+        while keep < len(value):
+            item = first if keep == 0 else len(_serialize(value[keep])) + 2 # ", " separator
+            if keep and used + item > budget:
+                break
+            used += item
+            keep += 1
+        if keep < len(value):
+            _record_cut(omitted, path, "items", keep, len(value))
+            value = value[:keep]
+        if used > budget: # the first item is too large on its own
+            value = [_shrink(value[0], first, used - budget, child_path(0), omitted)] + value[1:]
+        return value
+
+    if isinstance(value, dict):
+        rows = _columns(value)
+        if rows is not None and rows > 1:
+            table = sum(len(_serialize(v)) for v in value.values() if isinstance(v, list))
+            keep = max(1, rows - math.ceil(excess * rows / max(table, 1)))
+            _record_cut(omitted, path, "rows", keep, rows)
+            return {k: v[:keep] if isinstance(v, list) else v for k, v in value.items()}
+        sizes = {k: len(_serialize(v)) for k, v in value.items()}
+        large = {k: s for k, s in sizes.items() if s > MIN_TEXT_CHARS}
+        if large: # share the cut between the large values, in proportion to their size
+            total = sum(large.values())
+            return {
+                k: _shrink(v, sizes[k], math.ceil(excess * sizes[k] / total), child_path(k), omitted) if k in large else v
+                for k, v in value.items()
+            }
+        keys, used, budget = [], 2, size - excess # many small entries: keep the first ones
+        for k in value:
+            entry = sizes[k] + len(_serialize(k)) + 4 # '"key": value, '
+            if keys and used + entry > budget:
+                break
+            keys.append(k)
+            used += entry
+        _record_cut(omitted, path, "keys", len(keys), len(value))
+        return {k: value[k] for k in keys}
+
+    return value
+
+
+def _fit(data: Any, limit: int, size: Optional[int] = None) -> Tuple[Any, List[Dict[str, Any]]]:
+    """`data` cut down to at most `limit` serialized characters, with the list of cuts."""
+    omitted: Dict[str, Dict[str, Any]] = {}
+    size = len(_serialize(data)) if size is None else size
+    for _ in range(4):
+        if size <= limit:
+            return data, list(omitted.values())
+        data = _shrink(data, size, size - limit, "", omitted)
+        size = len(_serialize(data))
+    return (data if size <= limit else None), list(omitted.values())
+
+
+def _store(tool: str, data: Any, text: str) -> str:
+    global _purged
+    if not _purged:
+        _purged = True
+        _outputs.purge(OUTPUT_TTL_SECONDS)
+    handle = f"{tool}-{hashlib.sha1(text.encode()).hexdigest()[:12]}"
+    _outputs.set(handle, data, tag=tool)
+    return handle
+
+
+def _connect_metrics() -> sqlite3.Connection:
+    _metrics_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(_metrics_path, timeout=10, isolation_level=None)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS tool_metrics (tool TEXT PRIMARY KEY, calls INTEGER, truncated INTEGER, "
+        "bytes_in INTEGER, bytes_out INTEGER, max_bytes INTEGER, govern_ms REAL, last_call REAL)"
+    )
+    return conn
+
+
+def _record_call(tool: str, size: int, returned: int, truncated: bool, elapsed_ms: float):
+    try:
+        conn = _connect_metrics()
+        try:
+            conn.execute(
+                "INSERT INTO tool_metrics VALUES (?, 1, ?, ?, ?, ?, ?, ?) ON CONFLICT(tool) DO UPDATE SET "
+                "calls = calls + 1, truncated = truncated + excluded.truncated, "
+                "bytes_in = bytes_in + excluded.bytes_in, bytes_out = bytes_out + excluded.bytes_out, "
+                "max_bytes = MAX(max_bytes, excluded.max_bytes), govern_ms = govern_ms + excluded.govern_ms, "
+                "last_call = excluded.last_call",
+                (tool, int(truncated), size, returned, size, elapsed_ms, time.time()),
+            )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.debug(f"could not record output metrics for {tool}: {e}")
+
+
+def govern(tool: str, result: Any, max_tokens: Optional[int] = None, max_bytes: Optional[int] = None) -> Any:
+    """Return `result` if it fits the budget, otherwise its truncated form with a 'truncated' summary."""
+    started = time.perf_counter()
+    try:
+        data = pydantic_core.to_jsonable_python(result)
+    except Exception:
+        return result # FastMCP will fall back to str(result); nothing to measure structurally
+    text = _serialize(data)
+    size, limit = len(text), _limit(max_tokens, max_bytes)
+    if size <= limit:
+        _record_call(tool, size, size, False, (time.perf_counter() - started) * 1000)
+        return result
+
+    handle = _store(tool, data, text)
+    fitted, omitted = _fit(data, limit - min(SUMMARY_RESERVE, limit // 4), size)
+    summary = {
+        "original_bytes": size,
+        "original_tokens_est": math.ceil(size / CHARS_PER_TOKEN),
+        "limit_bytes": limit,
+        "omitted": omitted,
+        "handle": handle,
+        "note": f"Output was cut to fit the tool output budget. Call read_tool_output(handle='{handle}', "
+                f"path=..., offset=...) to page through the omitted part.",
+    }
+    if isinstance(fitted, dict):
+        fitted = {**fitted, "truncated": summary}
+    elif isinstance(fitted, list):
+        fitted = fitted + [{"truncated": summary}]
+    elif isinstance(fitted, str):
+        fitted = f"{fitted}\n\n[truncated: {json.dumps(summary)}]"
+    else:
+        fitted = {"truncated": summary}
+    returned = len(_serialize(fitted))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _record_call(tool, size, returned, True, elapsed_ms)
+    logger.info(f"{tool}: output of {size} bytes cut to {returned} (limit {limit}) in {elapsed_ms:.1f}ms; handle {handle}")
+    return fitted
+
+
+def govern_output(max_tokens: Optional[int] = None, max_bytes: Optional[int] = None) -> Callable:
+    """
+    Decorator keeping a tool function's (sync or async) results within a size budget.
+
+    Args:
+        max_tokens: Estimated token budget of one result (default TOOL_OUTPUT_MAX_TOKENS).
+        max_bytes: Byte budget of one serialized result (default TOOL_OUTPUT_MAX_BYTES).
+
+    Returns:
+        A decorator for functions registered with `@mcp.tool()`; place it below that line.
+    """
+    def decorator(func: Callable) -> Callable:
+        tool = func.__name__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                result = await func(*args, **kwargs)
+                # Serializing a large result takes a while; keep the server's event loop free
+                return await asyncio.to_thread(govern, tool, result, max_tokens, max_bytes)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return govern(tool, func(*args, **kwargs), max_tokens, max_bytes)
+        # FastMCP resolves string annotations in the wrapper's globals; hand it the resolved ones
+        wrapper.__signature__ = inspect.signature(func, eval_str=True)
+        return wrapper
+    return decorator
+
+
+def read_output(handle: str, path: Optional[str] = None, offset: int = 0, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """
+    A window of a stored full result: the value at `path` (dot-separated keys and list indexes),
+    starting at item/row/character `offset` and sized to the output budget.
+    """
+    entry = _outputs.get(handle)
+    if entry is None:
+        return {"error": f"Unknown or expired output handle '{handle}'."}
+    node = entry.value
+    for part in [p for p in (path or "").split(".") if p]:
+        try:
+            node = node[int(part)] if isinstance(node, list) else node[part]
+        except (KeyError, IndexError, ValueError, TypeError):
+            return {"error": f"Path '{path}' does not exist in output '{handle}' (failed at '{part}')."}
+
+    limit = _limit(max_tokens, None)
+    limit -= min(SUMMARY_RESERVE, limit // 4)
+    response: Dict[str, Any] = {"handle": handle, "path": path or ".", "offset": offset}
+    rows = _columns(node) if isinstance(node, dict) else None
+    if isinstance(node, str):
+        window = node[offset:offset + limit]
+        response.update(value=window, total_chars=len(node))
+        end = offset + len(window)
+    elif isinstance(node, list) or rows is not None:
+        total = len(node) if isinstance(node, list) else rows
+        end, used = offset, 0
+        while end < total:
+            row = node[end] if isinstance(node, list) else {k: v[end] for k, v in node.items() if isinstance(v, list)}
+            used += len(_serialize(row)) + 1
+            if end > offset and used > limit:
+                break
+            end += 1
+        if isinstance(node, list):
+            window, omitted = _fit(node[offset:end], limit)
+        else:
+            window, omitted = _fit({k: v[offset:end] if isinstance(v, list) else v for k, v in node.items()}, limit)
+        response.update(value=window, total_items=total)
+        if omitted:
+            response["omitted"] = omitted
+    elif len(_serialize(node)) <= limit:
+        return {**response, "value": node, "next_offset": None}
+    else: # a large object: list its parts so the caller can pick a path
+        prefix = f"{path}." if path else ""
+        return {**response, "next_offset": None, "parts": {
+            f"{prefix}{k}": math.ceil(len(_serialize(v)) / CHARS_PER_TOKEN) for k, v in node.items()
+        }, "note": "The value is too large to return at once; read one of 'parts' (estimated tokens) by path."}
+    total = response.get("total_chars", response.get("total_items"))
+    response["next_offset"] = end if end < total else None
+    return response
+
+
+def get_output_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-tool call count, truncation count, average/maximum result size and estimated tokens saved."""
+    if not Path(_metrics_path).exists():
+        return {}
+    conn = _connect_metrics()
+    try:
+        rows = conn.execute("SELECT * FROM tool_metrics ORDER BY bytes_in DESC").fetchall()
+    finally:
+        conn.close()
+    return {
+        tool: {
+            "calls": calls,
+            "truncated": truncated,
+            "avg_bytes": bytes_in // calls,
+            "avg_returned_bytes": bytes_out // calls,
+            "max_bytes": max_bytes,
+            "tokens_saved_est": (bytes_in - bytes_out) // CHARS_PER_TOKEN,
+            "avg_govern_ms": round(govern_ms / calls, 2),
+            "last_call": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(last_call)),
+        }
+        for tool, calls, truncated, bytes_in, bytes_out, max_bytes, govern_ms, last_call in rows
+    }
+
+
+if __name__ == "__main__":
+    stats = get_output_stats()
+    print(f"{'tool':<36}{'calls':>7}{'cut':>6}{'avg B':>10}{'avg out B':>11}{'max B':>10}{'tok saved':>11}{'ms':>7}")
+    for tool, s in stats.items():
+        print(f"{tool:<36}{s['calls']:>7}{s['truncated']:>6}{s['avg_bytes']:>10}{s['avg_returned_bytes']:>11}"
+              f"{s['max_bytes']:>10}{s['tokens_saved_est']:>11}{s['avg_govern_ms']:>7}")
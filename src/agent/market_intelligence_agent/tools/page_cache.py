@@ -0,0 +1,214 @@
+"""
+Cached page reading for the browser agent.
+
+Pages are cached on disk by canonical URL with their extracted content (title, markdown text,
+headings, tables) and HTTP validators. Within PAGE_TTL_SECONDS a page is served from the cache;
+after that it is revalidated with a conditional GET (If-None-Match / If-Modified-Since), so an
+unchanged page costs one 304. Pages are first fetched without rendering; only when the static
+HTML carries too little text (client-rendered sites, JavaScript walls, bot blocks) is the page
+rendered in a pooled browser context.
+"""
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, ClassVar, Dict, List, Optional, Type
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+from bs4 import BeautifulSoup
+from langchain.tools import BaseTool
+from markdownify import MarkdownConverter
+from pydantic import BaseModel, Field
+
+from ..config import SEC_USER_AGENT
+from .browser import _sync_runner_loop, get_browser_pool
+from .decorators import create_logged_tool
+from .disk_cache import DiskCache
+from .http_client import LoopLocalClient
+
+logger = logging.getLogger(__name__)
+
+PAGE_TTL_SECONDS = 6 * 3600
+ARCHIVE_TTL_SECONDS = 30 * 86400 # SEC EDGAR archive documents never change once filed
+MAX_PAGE_CHARS = 20000 # text returned per call; longer pages are read with `offset`
+MIN_STATIC_TEXT_CHARS = 500 # less visible text than this in the static HTML means render it
+MAX_TABLES = 10
+MAX_TABLE_ROWS = 50
+REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; LangAlpha research agent)",
+    "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.5",
+}
+
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref|cmpid)$", re.IGNORECASE)
+_JS_REQUIRED = re.compile(r"enable javascript|javascript is (?:disabled|required)|<div id=\"(?:root|__next|app)\"></div>", re.IGNORECASE)
+
+_cache = DiskCache("page_content")
+_http = LoopLocalClient(
+    headers=REQUEST_HEADERS, timeout=20, follow_redirects=True,
+    limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+)
+
+
+def canonical_url(url: str) -> str:
+    """URL with lower-case scheme and host, no fragment, default port, tracking parameters or trailing slash; sorted query."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != {"http": 80, "https": 443}.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _TRACKING_PARAMS.match(k)))
+    return urlunsplit((scheme, host, parts.path.rstrip("/") or "/", query, ""))
+
+
+def _ttl(url: str) -> float:
+    return ARCHIVE_TTL_SECONDS if "sec.gov/archives/" in url.lower() else PAGE_TTL_SECONDS
+
+
+def extract_content(html: str) -> Dict[str, Any]:
+    """Title, markdown text, headings and tables of an HTML page, without scripts, styles and page chrome."""
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.title.get_text(strip=True) if soup.title else None
+    for tag in soup(["head", "script", "style", "noscript", "svg", "nav", "footer", "header", "form", "iframe"]):
+        tag.decompose()
+    headings = [h.get_text(" ", strip=True) for h in soup.find_all(["h1", "h2", "h3"])][:50]
+    tables: List[List[List[str]]] = []
+    for table in soup.find_all("table")[:MAX_TABLES]:
+        rows = [[cell.get_text(" ", strip=True) for cell in row.find_all(["th", "td"])] for row in table.find_all("tr")]
+        rows = [row for row in rows if any(row)][:MAX_TABLE_ROWS]
+        if len(rows) > 1:
+            tables.append(rows)
+    text = MarkdownConverter(heading_style="ATX", strip=["img"]).convert_soup(soup)
+    text = re.sub(r"\n{3,}", "\n\n", text).strip()
+    return {"title": title, "text": text, "headings": headings, "tables": tables}
+
+
+def _needs_rendering(html: str, content: Dict[str, Any]) -> bool:
+    text = content["text"]
+    return len(text) < MIN_STATIC_TEXT_CHARS or (len(text) < 4 * MIN_STATIC_TEXT_CHARS and bool(_JS_REQUIRED.search(html)))
+
+
+def _is_sec(url: str) -> bool:
+    host = (urlsplit(url).hostname or "").lower()
+    return host == "sec.gov" or host.endswith(".sec.gov")
+
+
+def _validators(headers) -> Dict[str, Optional[str]]:
+    return {"etag": headers.get("etag"), "last_modified": headers.get("last-modified")}
+
+
+async def _fetch_static(url: str, cached: Optional[Dict[str, Any]]) -> Optional[httpx.Response]:
+    """Plain GET, conditional when the cached copy has validators; None if the request failed."""
+    headers = {}
+    if _is_sec(url):
+        # SEC EDGAR answers 403 unless the User-Agent names a company and a contact email
+        if SEC_USER_AGENT:
+            headers["User-Agent"] = SEC_USER_AGENT
+        else:
+            logger.warning(f"SEC_USER_AGENT is not set; EDGAR will refuse the static fetch of {url}")
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+    try:
+        return await _http.get().get(url, headers=headers)
+    except httpx.HTTPError as e:
+        logger.info(f"static fetch of {url} failed: {e}")
+        return None
+
+
+async def _render(url: str) -> Dict[str, Any]:
+    html, headers, final_url = await get_browser_pool().fetch_html(url)
+    return {**extract_content(html), **_validators(headers), "final_url": final_url, "rendered": True}
+
+
+async def read_page(url: str, refresh: bool = False) -> Dict[str, Any]:
+    """
+    Content of a web page, from the cache when fresh, else fetched (rendering only if needed).
+
+    The result carries 'cache': 'hit' (served from disk), 'revalidated' (server answered 304),
+    'fetched' (static HTML) or 'rendered' (browser), and 'fetched_at'.
+    """
+    key = canonical_url(url)
+    entry = _cache.get(key)
+    cached = entry.value if entry else None
+    if cached and not refresh and time.time() - entry.fetched_at < _ttl(key):
+        return {**cached, "cache": "hit", "fetched_at": _iso(entry.fetched_at)}
+
+    response = await _fetch_static(url, cached)
+    if response is not None and response.status_code == 304 and cached:
+        _cache.set(key, cached)
+        return {**cached, "cache": "revalidated", "fetched_at": _iso(time.time())}
+
+    page = static = None
+    if response is not None and response.status_code == 200:
+        content_type = response.headers.get("content-type", "")
+        if "html" in content_type or "xml" in content_type:
+            static = {**extract_content(response.text), **_validators(response.headers), "final_url": str(response.url), "rendered": False}
+            if not _needs_rendering(response.text, static):
+                page = static
+        elif content_type.startswith(("text/", "application/json")):
+            page = {"title": None, "text": response.text, "headings": [], "tables": [],
+                    **_validators(response.headers), "final_url": str(response.url), "rendered": False}
+        else:
+            return {"error": f"Unsupported content type {content_type or 'unknown'} at {url}"}
+
+    if page is None:
+        try:
+            page = await _render(url)
+        except Exception as e:
+            if cached: # serve the stale copy rather than nothing
+                return {**cached, "cache": "stale", "fetched_at": _iso(entry.fetched_at), "warning": f"Refresh failed: {e}"}
+            if static: # thin, but what the server sent
+                return {**static, "url": key, "cache": "fetched", "fetched_at": _iso(time.time()), "warning": f"Rendering failed: {e}"}
+            status = f"HTTP {response.status_code}; " if response is not None else ""
+            return {"error": f"Could not load {url}: {status}rendering failed: {e}"}
+
+    page["url"] = key
+    _cache.set(key, page)
+    return {**page, "cache": "rendered" if page["rendered"] else "fetched", "fetched_at": _iso(time.time())}
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="seconds")
+
+
+async def _read_page_text(url: str, offset: int = 0) -> str:
+    page = await read_page(url)
+    if "error" in page:
+        return page["error"]
+    text = page["text"]
+    chunk = text[offset:offset + MAX_PAGE_CHARS]
+    lines = [f"# {page['title']}" if page.get("title") else None, f"URL: {page.get('final_url') or page['url']}",
+             f"Fetched: {page['fetched_at']} ({page['cache']})", page.get("warning"), "", chunk]
+    if offset + MAX_PAGE_CHARS < len(text):
+        lines.append(f"\n[{len(text) - offset - MAX_PAGE_CHARS} more characters; call again with offset={offset + MAX_PAGE_CHARS}]")
+    return "\n".join(line for line in lines if line is not None)
+
+
+class ReadPageInput(BaseModel):
+    """Input for ReadPageTool."""
+
+    url: str = Field(..., description="The URL of the page to read")
+    offset: int = Field(0, description="Character offset to continue reading a long page from")
+
+
+class ReadPageTool(BaseTool):
+    name: ClassVar[str] = "read_page"
+    args_schema: Type[BaseModel] = ReadPageInput
+    description: ClassVar[str] = (
+        "Use this tool to read the content of a web page by URL (e.g. an SEC filing, an investor-relations page or an article). It returns the page title and text as markdown and is much faster than the browser tool, because pages are cached and only rendered when necessary. Use the browser tool only when you need to click, type or search on a site."
+    )
+
+    def _run(self, url: str, offset: int = 0) -> str:
+        """Read the page synchronously, on the browser's shared background loop."""
+        return asyncio.run_coroutine_threadsafe(_read_page_text(url, offset), _sync_runner_loop()).result()
+
+    async def _arun(self, url: str, offset: int = 0) -> str:
+        """Read the page asynchronously, on the caller's event loop."""
+        return await _read_page_text(url, offset)
+
+
+ReadPageTool = create_logged_tool(ReadPageTool)
+read_page_tool = ReadPageTool()
@@ -1,29 +1,36 @@
 import logging
-from typing import Annotated
+from typing import Annotated, Optional
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
-from langchain_experimental.utilities import PythonREPL
 from .decorators import log_io
+from .kernel_pool import KernelError, get_kernel_pool
 
-# Initialize REPL and logger
-repl = PythonREPL()
 logger = logging.getLogger(__name__)
 
 
+def _run_key(config: Optional[RunnableConfig]) -> str:
+    """Namespace key of the graph run the call belongs to (its thread_id)."""
+    configurable = (config or {}).get("configurable") or {}
+    return str(configurable.get("thread_id") or "default")
+
+
 @tool
 @log_io
 def python_repl_tool(
     code: Annotated[
         str, "The python code to execute to do further analysis or calculation."
     ],
+    config: RunnableConfig = None,
 ):
-    """Executes python code and returns the result. The code runs in a static sandbox without interactive mode, so make sure to print output only."""
+    """Executes python code and returns the result. The code runs in a static sandbox without interactive mode, so make sure to print output only. Variables persist between calls in the same run; numpy and pandas are already imported as np and pd. Data artifacts handed over by other agents are loaded by handle with `load_artifact("<handle>")` (a pandas DataFrame); `list_artifacts()` lists the available ones."""
     logger.info("Executing Python code")
     try:
-        result = repl.run(code)
-        logger.info("Code execution successful")
-    except BaseException as e:
-        error_msg = f"Failed to execute. Error: {repr(e)}"
+        output, error = get_kernel_pool().run(code, _run_key(config))
+        logger.info("Code execution successful" if error is None else f"Code raised {error}")
+    except KernelError as e:
+        error_msg = f"Failed to execute. Error: {e}. Variables defined in earlier steps are no longer available."
         logger.error(error_msg)
         return error_msg
+    result = output if error is None else f"{output}{error}"
     result_str = f"Successfully executed:\n```python\n{code}\n```\nStdout: {result}"
-    return result_str
\ No newline at end of file
+    return result_str
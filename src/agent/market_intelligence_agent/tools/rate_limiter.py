@@ -0,0 +1,351 @@
+"""
+Client-side rate limiting and retry scheduling shared by the data-provider tool servers.
+
+Every provider gets one token bucket per process, sized from PROVIDER_QUOTAS (the providers'
+free-tier limits) and overridable with a <PROVIDER>_RATE_LIMIT environment variable (requests
+per minute) for paid plans.
+Callers queue in two priority lanes: interactive requests (agent tool calls) are always
+served before batch requests (backfills, bulk loads) waiting on the same bucket.
+Providers with a strict per-window quota (SHARED_WINDOW_PROVIDERS) use a sliding window
+shared by all tool-server processes instead; batch requests may only fill part of it, so
+agent runs in other processes still find slots while the news ingester backfills.
+
+When a provider reports throttling, its bucket halves its refill rate and then recovers
+additively on successful calls, so repeated throttling is absorbed instead of failing the
+agent step.
+"""
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Tuple, Type
+
+from disk_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BATCH = 1
+
+# provider -> (requests, period in seconds). Defaults are the free-tier limits; set
+# <PROVIDER>_RATE_LIMIT (requests per minute) for a premium plan, e.g. ALPHA_VANTAGE_RATE_LIMIT=75.
+PROVIDER_QUOTAS: Dict[str, Tuple[int, float]] = {
+    "alpha_vantage": (5, 60.0),
+    "fmp": (300, 60.0),
+    "tickertick": (10, 60.0),
+    "polygon": (5, 60.0),
+    "tavily": (100, 60.0),
+}
+# Providers that count requests in a strict window across all of our processes (tool servers
+# and the news ingester share one key, and at a few requests per minute every request counts)
+SHARED_WINDOW_PROVIDERS = {"tickertick", "alpha_vantage", "polygon"}
+# Share of a shared window kept free for interactive requests: lane priority only orders the
+# callers of one process, so batch grants stop at the rest (at least one request)
+SHARED_WINDOW_INTERACTIVE_RESERVE = 0.3
+
+
+class TransientError(RuntimeError):
+    """Raised by provider clients for retryable upstream failures (timeouts, 5xx)."""
+
+
+class ThrottledError(TransientError):
+    """Raised by provider clients when the upstream API reports a rate limit."""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def raise_for_throttle(provider: str, status_code: int, headers: Optional[Mapping[str, str]] = None):
+    """Raise ThrottledError for HTTP 429 and TransientError for 5xx responses."""
+    if status_code == 429:
+        try:
+            retry_after = float((headers or {}).get("Retry-After") or 0)
+        except ValueError:  # HTTP-date form; fall back to the jittered backoff
+            retry_after = 0.0
+        raise ThrottledError(f"{provider} returned HTTP 429", retry_after=retry_after)
+    if status_code >= 500:
+        raise TransientError(f"{provider} returned HTTP {status_code}")
+
+
+class RateLimiter:
+    """Token bucket with interactive/batch priority lanes and AIMD rate adaptation."""
+
+    def __init__(self, name: str, requests: int, period: float, min_rate_fraction: float = 0.1):
+        self.name = name
+        self.capacity = float(requests)
+        self.max_rate = requests / period
+        self.rate = self.max_rate
+        self.min_rate = self.max_rate * min_rate_fraction
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._lanes = (deque(), deque())
+        self.stats: Dict[str, Any] = {
+            "acquired": 0, "waited_seconds": 0.0, "throttled": 0, "retries": 0, "max_queue_depth": 0
+        }
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take(self, priority: int = INTERACTIVE) -> float:
+        """Take a slot if one is free (returns 0), otherwise return the seconds until one may be."""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def _is_next(self, ticket: object, priority: int) -> bool:
+        if any(self._lanes[p] for p in range(priority)):
+            return False
+        return self._lanes[priority][0] is ticket
+
+    def acquire(self, priority: int = INTERACTIVE) -> float:
+        """Block until a token is available for this lane. Returns the seconds spent waiting."""
+        ticket = object()
+        start = time.monotonic()
+        with self._cond:
+            lane = self._lanes[priority]
+            lane.append(ticket)
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], sum(map(len, self._lanes)))
+            try:
+                while True:
+                    # Only the head of the queue waits for a slot; others wait to be notified
+                    wait = self._try_take(priority) if self._is_next(ticket, priority) else None
+                    if wait is not None and wait <= 0:
+                        break
+                    self._cond.wait(wait)
+            finally:
+                lane.remove(ticket)
+                self._cond.notify_all()
+            waited = time.monotonic() - start
+            self.stats["acquired"] += 1
+            self.stats["waited_seconds"] += waited
+        if waited > 1:
+            logger.info(f"{self.name}: waited {waited:.1f}s for a request slot ({self.queue_depth()} queued)")
+        return waited
+
+    async def acquire_async(self, priority: int = INTERACTIVE) -> float:
+        """
+        `acquire` for coroutines: queues in the same lanes but waits with asyncio.sleep, so no
+        thread is held while waiting. Returns the seconds spent waiting.
+        """
+        ticket = object()
+        start = time.monotonic()
+        with self._cond:
+            self._lanes[priority].append(ticket)
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], sum(map(len, self._lanes)))
+        try:
+            while True:
+                with self._cond:
+                    if self._is_next(ticket, priority):
+                        wait = self._try_take(priority)
+                        if wait <= 0:
+                            break
+                    else: # not at the head: check back once the next slot may be free
+                        wait = max(0.0, 1 - self._tokens) / self.rate
+                await asyncio.sleep(min(max(wait, 0.01), 1.0))
+        finally:
+            with self._cond:
+                self._lanes[priority].remove(ticket)
+                self._cond.notify_all()
+        waited = time.monotonic() - start
+        with self._cond:
+            self.stats["acquired"] += 1
+            self.stats["waited_seconds"] += waited
+        if waited > 1:
+            logger.info(f"{self.name}: waited {waited:.1f}s for a request slot ({self.queue_depth()} queued)")
+        return waited
+
+    def queue_depth(self) -> Dict[str, int]:
+        """Number of callers currently waiting in each lane."""
+        with self._cond:
+            return {"interactive": len(self._lanes[INTERACTIVE]), "batch": len(self._lanes[BATCH])}
+
+    def penalize(self):
+        """Multiplicative decrease after the provider reported throttling."""
+        with self._cond:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            self.stats["throttled"] += 1
+        logger.warning(f"{self.name}: throttled by provider, rate lowered to {self.rate * 60:.1f}/min")
+
+    def reward(self):
+        """Additive increase after a successful call, back up to the configured quota."""
+        if self.rate < self.max_rate:
+            with self._cond:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+class SharedWindowLimiter(RateLimiter):
+    """
+    Sliding-window limit (at most `requests` grants in any `period` seconds) shared by every
+    process using the same cache directory.
+
+    Grant times are kept in a SQLite table, so concurrent tool-server processes (e.g. parallel
+    researcher branches) draw from one budget. Within a process, callers still queue in the
+    interactive/batch lanes; only the head of the queue polls the shared window. Batch grants
+    stop short of the window by SHARED_WINDOW_INTERACTIVE_RESERVE, since a batch caller in one
+    process cannot see interactive callers queued in another. If the database is unavailable,
+    the limiter falls back to a per-process token bucket.
+    """
+
+    def __init__(self, name: str, requests: int, period: float, directory: Path = CACHE_DIR):
+        super().__init__(name, requests, period)
+        self.period = period
+        self.path = Path(directory) / "rate_limits.sqlite"
+        self._shared = True
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("CREATE TABLE IF NOT EXISTS grants (provider TEXT NOT NULL, granted_at REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS grants_by_provider ON grants (provider, granted_at)")
+        return conn
+
+    def _try_take(self, priority: int = INTERACTIVE) -> float:
+        if not self._shared:
+            return super()._try_take(priority)
+        allowed = max(1, int(self.rate * self.period + 1e-9))
+        if priority != INTERACTIVE:
+            allowed = max(1, allowed - max(1, int(allowed * SHARED_WINDOW_INTERACTIVE_RESERVE)))
+        now = time.time() # wall clock: comparable across processes
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM grants WHERE provider = ? AND granted_at <= ?", (self.name, now - self.period))
+                count = conn.execute("SELECT COUNT(*) FROM grants WHERE provider = ?", (self.name,)).fetchone()[0]
+                if count < allowed:
+                    conn.execute("INSERT INTO grants (provider, granted_at) VALUES (?, ?)", (self.name, now))
+                    conn.execute("COMMIT")
+                    return 0.0
+                # The window frees up once enough of the oldest grants have expired
+                (expires,) = conn.execute(
+                    "SELECT granted_at FROM grants WHERE provider = ? ORDER BY granted_at LIMIT 1 OFFSET ?",
+                    (self.name, count - allowed),
+                ).fetchone()
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"{self.name}: shared rate window unavailable ({e}); limiting per process")
+            self._shared = False
+            return super()._try_take(priority)
+        return max(0.05, expires + self.period - now)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> RateLimiter:
+    """Return the process-wide limiter for a provider, creating it on first use."""
+    with _limiters_lock:
+        if provider not in _limiters:
+            requests, period = PROVIDER_QUOTAS.get(provider, (60, 60.0))
+            override = os.getenv(f"{provider.upper()}_RATE_LIMIT")
+            if override:
+                requests, period = int(override), 60.0
+            limiter_class = SharedWindowLimiter if provider in SHARED_WINDOW_PROVIDERS else RateLimiter
+            _limiters[provider] = limiter_class(provider, requests, period)
+        return _limiters[provider]
+
+
+def get_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Counters, current rate and queue depth of every limiter created in this process."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {
+        l.name: {**l.stats, "rate_per_min": round(l.rate * 60, 2), "queue_depth": l.queue_depth()}
+        for l in limiters
+    }
+
+
+def call_with_retry(
+    provider: str,
+    fn: Callable[..., Any],
+    *args: Any,
+    priority: int = INTERACTIVE,
+    retries: int = 4,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    retry_on: Tuple[Type[BaseException], ...] = (TransientError,),
+    **kwargs: Any,
+) -> Any:
+    """
+    Call `fn` under the provider's rate limit, retrying failures listed in `retry_on`.
+
+    Retries use full-jitter exponential backoff (uniform in [0, base_delay * 2**attempt],
+    capped at max_delay), never shorter than a ThrottledError's retry_after. Throttling
+    also lowers the provider's rate for every caller in this process.
+    The last exception is re-raised once retries are exhausted.
+    """
+    limiter = get_limiter(provider)
+    for attempt in range(retries + 1):
+        limiter.acquire(priority)
+        try:
+            result = fn(*args, **kwargs)
+        except retry_on as e:
+            if attempt == retries:
+                _record_failure(limiter, e)
+                raise
+            time.sleep(_retry_delay(limiter, e, attempt, retries, base_delay, max_delay))
+        else:
+            limiter.reward()
+            return result
+
+
+async def async_call_with_retry(
+    provider: str,
+    fn: Callable[..., Awaitable[Any]],
+    *args: Any,
+    priority: int = INTERACTIVE,
+    retries: int = 4,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    retry_on: Tuple[Type[BaseException], ...] = (TransientError,),
+    **kwargs: Any,
+) -> Any:
+    """
+    Coroutine version of `call_with_retry` for async clients: awaits `fn(*args, **kwargs)`.
+
+    Waiting for a rate-limit slot and backoff both use asyncio.sleep, so other requests on the
+    event loop keep running meanwhile and no executor thread is tied up.
+    """
+    limiter = get_limiter(provider)
+    for attempt in range(retries + 1):
+        await limiter.acquire_async(priority)
+        try:
+            result = await fn(*args, **kwargs)
+        except retry_on as e:
+            if attempt == retries:
+                _record_failure(limiter, e)
+                raise
+            await asyncio.sleep(_retry_delay(limiter, e, attempt, retries, base_delay, max_delay))
+        else:
+            limiter.reward()
+            return result
+
+
+def _record_failure(limiter: RateLimiter, error: BaseException):
+    if isinstance(error, ThrottledError):
+        limiter.penalize()
+
+
+def _retry_delay(limiter: RateLimiter, error: BaseException, attempt: int, retries: int, base_delay: float, max_delay: float) -> float:
+    """Record a failed attempt and return the full-jitter backoff before the next one."""
+    _record_failure(limiter, error)
+    delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+    delay = max(delay, getattr(error, "retry_after", 0.0))
+    limiter.stats["retries"] += 1
+    logger.warning(f"{limiter.name}: {error}; retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+    return delay
@@ -2,17 +2,55 @@ from mcp.server.fastmcp import FastMCP
 import requests
 import asyncio
 import os
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from typing import List, Optional, Literal
 import json
 import httpx
+from disk_cache import DiskCache
+from http_client import LoopLocalClient
+from news_ranking import DEFAULT_TOKEN_BUDGET, rank_and_pack, trim_text
+from output_governor import govern_output
+from rate_limiter import TransientError, async_call_with_retry, raise_for_throttle
 
 # Create the MCP server with a meaningful name
 mcp = FastMCP("TavilyMCP")
 
 # Tavily API endpoint
 TAVILY_API_ENDPOINT = "https://api.tavily.com/search"
+MAX_QUERIES_PER_CALL = 10
+DEFAULT_MAX_RESULTS = 5 # what Tavily returns when max_results is not set
+MIN_BUDGET_PER_SEARCH = 600 # tokens
+
+_http = LoopLocalClient(timeout=30, limits=httpx.Limits(max_connections=10, max_keepalive_connections=10))
+
+### Search result cache
+# Results are cached by normalized query (case and whitespace ignored) and search options.
+# News goes stale faster than general web results, and a narrow time window ("day") implies the
+# caller wants fresh results, so the TTL is the shorter of the topic's base TTL and 1/24 of the
+# time window. A cached search with more results also serves smaller max_results.
+CACHE_TTL_SECONDS = {"general": 24 * 3600, "news": 3600}
+TIME_RANGE_DAYS = {"day": 1, "days": 1, "week": 7, "weeks": 7, "month": 30, "months": 30, "year": 365, "years": 365}
+
+_cache = DiskCache("tavily_search")
+
+def normalize_query(query: str) -> str:
+    """Lower-cased query with runs of whitespace collapsed; word order and punctuation are kept."""
+    return " ".join(query.lower().split())
+
+def _cache_ttl(topic: Optional[str], days: Optional[int], time_range: Optional[str]) -> float:
+    ttl = CACHE_TTL_SECONDS.get(topic or "general", CACHE_TTL_SECONDS["general"])
+    window_days = days or TIME_RANGE_DAYS.get(time_range or "")
+    return min(ttl, window_days * 3600) if window_days else ttl
 
 # Base API client functions
+async def _post_search(headers, payload):
+    response = await _http.get().post(TAVILY_API_ENDPOINT, headers=headers, json=payload)
+    raise_for_throttle("Tavily", response.status_code, response.headers)
+    response.raise_for_status()  # Raise an exception for bad status codes (4xx)
+    return response.json()
+
 async def async_tavily_search(
     query: str,
     api_key: Optional[str] = None,
@@ -22,10 +60,20 @@ async def async_tavily_search(
     time_range: Literal["days", "weeks", "months", "years"] = None,
     max_results: Optional[int] = None
 ):
-    """Asynchronous function to perform Tavily search using direct API calls"""
+    """Asynchronous function to perform Tavily search using direct API calls, served from the cache while fresh"""
     api_key = api_key or os.getenv("TAVILY_API_KEY", "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")
     if not api_key:
         return {"error": "Tavily API key not provided or found in environment"}
+
+    key = json.dumps([normalize_query(query), search_depth, topic, days, time_range])
+    entry = _cache.get(key)
+    if entry and time.time() - entry.fetched_at < _cache_ttl(topic, days, time_range):
+        wanted = max_results or DEFAULT_MAX_RESULTS
+        if wanted <= (entry.value["max_results"] or DEFAULT_MAX_RESULTS):
+            result = dict(entry.value["response"])
+            if isinstance(result.get("results"), list):
+                result["results"] = result["results"][:wanted]
+            return result
     
     headers = {
         "Content-Type": "application/json",
@@ -52,13 +100,10 @@ async def async_tavily_search(
         payload["max_results"] = max_results
     
     try:
-        # Use httpx for asynchronous request
-        async with httpx.AsyncClient() as client:
-            response = await client.post(TAVILY_API_ENDPOINT, headers=headers, json=payload)
-        
-        response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-        return response.json()
-            
+        result = await async_call_with_retry(
+            "tavily", _post_search, headers, payload, retries=2,
+            retry_on=(TransientError, httpx.TransportError),
+        )
     except httpx.HTTPStatusError as e:
         return {
             "error": f"API request failed with status code {e.response.status_code}",
@@ -66,9 +111,62 @@ async def async_tavily_search(
         }
     except Exception as e:
         return {"error": str(e)}
+    _cache.set(key, {"response": result, "max_results": max_results})
+    return result
+
+def _published_timestamp(value):
+    """Tavily's published_date (RFC 2822 for news, sometimes ISO) as a POSIX timestamp."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return (parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).timestamp()
+    except ValueError:
+        return None
+
+def _slim_result(result):
+    slim = {"title": result.get("title"), "url": result.get("url"), "content": trim_text(result.get("content"))}
+    if result.get("published_date"):
+        slim["published_date"] = result["published_date"]
+    if result.get("score") is not None:
+        slim["score"] = round(result["score"], 3)
+    return slim
+
+def _pack_response(response, token_budget=None, skip_urls=None):
+    """
+    Rank a search response's results, collapse near-duplicates and pack them into the token budget.
+
+    When a `skip_urls` set is given, results whose URL is in it are left out and the URLs of the
+    packed results (and of the near-duplicates collapsed into them) are added to it.
+    """
+    skip_urls = set() if skip_urls is None else skip_urls
+    if "error" in response or not isinstance(response.get("results"), list):
+        return response
+    results = [r for r in response["results"] if r.get("url") not in skip_urls]
+    ranked = rank_and_pack(
+        results,
+        title=lambda r: r.get("title"),
+        url=lambda r: r.get("url"),
+        published=lambda r: _published_timestamp(r.get("published_date")),
+        relevance=lambda r: r.get("score"),
+        slim=_slim_result,
+        token_budget=token_budget,
+    )
+    packed = {k: v for k, v in response.items() if k in ("query", "answer")}
+    packed["results"] = ranked["items"]
+    skip_urls.update(r.get("url") for group in ranked["groups"] for r in group)
+    over_budget = len(results) - sum(map(len, ranked["groups"]))
+    if over_budget:
+        packed["over_budget"] = over_budget # lower ranked results left out to fit the token budget
+    return packed
 
 # Define MCP tools
 @mcp.tool()
+@govern_output()
 async def search(
     query: str,
     search_depth: Literal["basic", "advanced"] = "basic",
@@ -89,9 +187,10 @@ async def search(
         max_results: Maximum number of results to return
     
     Returns:
-        A dictionary containing search results
+        A dictionary with the 'answer' and the 'results' ranked by relevance, recency and source
+        quality, near-duplicates collapsed and trimmed to fit the news token budget
     """
-    return await async_tavily_search(
+    response = await async_tavily_search(
         query=query,
         search_depth=search_depth,
         topic=topic,
@@ -99,6 +198,61 @@ async def search(
         time_range=time_range,
         max_results=max_results
     )
+    return _pack_response(response)
+
+@mcp.tool()
+@govern_output()
+async def search_many(
+    queries: List[str],
+    search_depth: Literal["basic", "advanced"] = "basic",
+    topic: Optional[Literal["general", "news"]] = None,
+    days: Optional[int] = None,
+    time_range: Optional[Literal["day", "week", "month", "year"]] = None,
+    max_results: Optional[int] = 5
+) -> dict:
+    """
+    Run several Tavily web searches concurrently, with the same options for all of them.
+    Prefer this over calling `search` repeatedly when you have several queries in mind.
+    
+    Args:
+        queries: The search queries (at most 10)
+        search_depth: Depth of search, 'basic' or 'advanced'
+        topic: Filter results by by either "general" or "news", you should always use "general" unless you are compiled to search for news
+        days: Number of days to look back for results
+        time_range: Time range for results, only accepts "day", "week", "month", "year"
+        max_results: Maximum number of results to return per query
+    
+    Returns:
+        A dictionary with 'searches': one entry per query, in order, each with the 'query' and its
+        ranked, trimmed search results (or an 'error'). Results already listed for an earlier query
+        are not repeated
+    """
+    queries = [q for q in queries if isinstance(q, str) and q.strip()]
+    if not queries:
+        return {"error": "At least one non-empty query is required."}
+    if len(queries) > MAX_QUERIES_PER_CALL:
+        return {"error": f"At most {MAX_QUERIES_PER_CALL} queries per call, got {len(queries)}."}
+    # Queries that normalize to the same search are sent once
+    unique = {normalize_query(q): q for q in reversed(queries)}
+    results = await asyncio.gather(*[
+        async_tavily_search(
+            query=q,
+            search_depth=search_depth,
+            topic=topic,
+            days=days,
+            time_range=time_range,
+            max_results=max_results
+        )
+        for q in unique.values()
+    ])
+    by_key = dict(zip(unique, results))
+    # The budget is shared between searches; a page already returned for an earlier query is not repeated
+    budget = max(MIN_BUDGET_PER_SEARCH, DEFAULT_TOKEN_BUDGET * 2 // len(unique))
+    searches, returned_urls = [], set()
+    for q in queries:
+        packed = _pack_response(by_key[normalize_query(q)], token_budget=budget, skip_urls=returned_urls)
+        searches.append({**packed, "query": q})
+    return {"searches": searches}
 
 
 # Add this to run the server with stdio transport when executed directly
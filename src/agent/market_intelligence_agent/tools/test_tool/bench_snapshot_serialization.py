@@ -0,0 +1,54 @@
+"""
+Benchmark: recursive `_to_dict` vs. schema-driven snapshot serialization.
+
+Builds a synthetic 500-ticker snapshot (same shape as the Polygon
+`/v2/snapshot/locale/us/markets/stocks/tickers` payload) and compares CPU time
+and JSON payload size for the legacy and flattened serializers.
+
+Usage:
+    python bench_snapshot_serialization.py [num_tickers]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("POLYGON_API_KEY", "benchmark")
+
+from polygon.rest.models import TickerSnapshot  # noqa: E402
+import market_data  # noqa: E402
+
+
+def _fake_snapshot(i: int) -> TickerSnapshot:
+    base = 10.0 + i
+    bar = {"o": base, "h": base * 1.02, "l": base * 0.98, "c": base * 1.01, "v": 1_000_000 + i, "vw": base * 1.005}
+    return TickerSnapshot.from_dict({
+        "ticker": f"T{i:04d}",
+        "todaysChange": base * 0.01,
+        "todaysChangePerc": 1.0,
+        "updated": 1_700_000_000_000_000_000 + i,
+        "day": bar,
+        "prevDay": bar,
+        "min": {**bar, "av": 5_000_000 + i, "t": 1_700_000_000_000, "n": 120},
+        "lastTrade": {"T": f"T{i:04d}", "c": [14, 41], "i": str(i), "p": base, "s": 100, "t": 1_700_000_000_000_000_000, "x": 11},
+        "lastQuote": {"P": base * 1.001, "S": 2, "p": base * 0.999, "s": 3, "t": 1_700_000_000_000_000_000},
+    })
+
+
+def _bench(label, fn, snapshots, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        payload = json.dumps(fn(snapshots))
+    elapsed_ms = (time.perf_counter() - start) / repeat * 1000
+    print(f"{label:<28}{elapsed_ms:>10.2f} ms{len(payload):>12,d} bytes{len(payload) // 4:>10,d} ~tokens")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    snapshots = [_fake_snapshot(i) for i in range(n)]
+    print(f"{n} tickers")
+    _bench("legacy _to_dict", lambda s: [market_data._to_dict(x) for x in s], snapshots)
+    _bench("flat (default fields)", market_data._serialize_snapshots, snapshots)
+    _bench("columnar (default fields)", lambda s: market_data._serialize_snapshots(s, columnar=True), snapshots)
+    _bench("flat (all fields)", lambda s: market_data._serialize_snapshots(s, fields=list(market_data.SNAPSHOT_SCHEMA)), snapshots)
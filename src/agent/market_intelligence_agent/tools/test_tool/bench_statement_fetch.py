@@ -0,0 +1,95 @@
+"""
+Benchmark: serial vs. concurrent statement fetch in `fundamental_data_from_reports`.
+
+"Serial" swaps in a single-worker executor, which reproduces the old one-after-another
+fetch order. "Concurrent" uses the module's shared pool. Both runs start from empty disk
+caches in a temporary directory. By default the Alpha Vantage session is replaced with a
+fake that sleeps `latency` seconds per request and the client-side rate limit is lifted.
+Pass --live (with ALPHA_VANTAGE_API_KEY set) to time real round trips under the configured
+limit (ALPHA_VANTAGE_RATE_LIMIT); this uses 8 API calls per run.
+
+Usage:
+    python bench_statement_fetch.py [--live] [--latency 0.5] [--symbol IBM]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "benchmark")
+os.environ["LANGALPHA_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_statement_fetch_")
+
+import fundamental_data  # noqa: E402
+import rate_limiter  # noqa: E402
+from disk_cache import DiskCache  # noqa: E402
+
+
+class _FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, payload=None, text=""):
+        self._payload = payload
+        self.text = text
+        self.content = text.encode("utf-8")
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+def _fake_get(latency):
+    def get(url, params=None, timeout=None):
+        time.sleep(latency)
+        if "EARNINGS_CALENDAR" in url:
+            return _FakeResponse(text="symbol,name,reportDate,fiscalDateEnding,estimate,currency\r\n"
+                                      "IBM,International Business Machines,2099-01-20,2098-12-31,1.0,USD\r\n")
+        reports = [{"fiscalDateEnding": f"{2024 - i}-12-31", "totalRevenue": "1000", "reportedEPS": "1.0",
+                    "operatingCashflow": "300", "capitalExpenditures": "100",
+                    "commonStockSharesOutstanding": "100"} for i in range(5)]
+        return _FakeResponse({"annualReports": reports, "quarterlyReports": reports,
+                              "annualEarnings": reports, "quarterlyEarnings": reports})
+    return get
+
+
+def _cold_caches():
+    """Point the module's disk caches at an empty directory, so a run fetches everything."""
+    directory = tempfile.mkdtemp(dir=os.environ["LANGALPHA_CACHE_DIR"])
+    fundamental_data._fundamentals_cache = DiskCache("alpha_vantage_fundamentals", directory)
+    fundamental_data._calendar_cache = DiskCache("alpha_vantage_calendar", directory)
+    fundamental_data._calendar_indexes.clear()
+
+
+def _time(symbol, start_year, end_year):
+    _cold_caches()
+    start = time.perf_counter()
+    result = fundamental_data.fundamental_data_from_reports(symbol, start_year, end_year)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--symbol", default="IBM")
+    args = parser.parse_args()
+
+    if not args.live:
+        fundamental_data._session.get = _fake_get(args.latency)
+        rate_limiter._limiters["alpha_vantage"] = rate_limiter.RateLimiter("alpha_vantage", 10 ** 6, 1.0)
+        print(f"simulated latency {args.latency:.2f}s per request")
+
+    pool = fundamental_data._executor
+    fundamental_data._executor = ThreadPoolExecutor(max_workers=1)
+    serial, _ = _time(args.symbol, 2020, 2025)
+    fundamental_data._executor = pool
+    concurrent, result = _time(args.symbol, 2020, 2025)
+
+    print(f"{'serial':<12}{serial:>8.2f} s")
+    print(f"{'concurrent':<12}{concurrent:>8.2f} s  ({serial / concurrent:.1f}x)")
+    print(f"annual reports: {len(result['annual'])}, errors: {result.get('partial_errors') or result.get('error')}")
@@ -0,0 +1,94 @@
+"""
+Benchmark: statement parsing in `_merge_reports`.
+
+Builds synthetic Alpha Vantage payloads with `years` of annual and 4 * `years` quarterly
+reports (all statement fields as strings, as the API returns them), checks that the row and
+columnar outputs carry the same values and times `_merge_reports` for the default request
+(5 fiscal years, 4 quarterly filings) and for the full history, along with the JSON size of
+both output layouts.
+
+Usage:
+    python bench_statement_parsing.py [years]
+"""
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "benchmark")
+
+import fundamental_data  # noqa: E402
+
+# --- synthetic payloads --------------------------------------------------------
+
+_EXTRA_FIELDS = [f"otherField{i}" for i in range(15)]  # real reports carry ~30 fields we do not parse
+
+
+def _reports(dates: List[str], fields: List[str]) -> List[Dict[str, str]]:
+    rng = random.Random(0)
+    out = []
+    for d in dates:
+        row = {"fiscalDateEnding": d, "reportedCurrency": "USD"}
+        for f in fields + _EXTRA_FIELDS:
+            row[f] = "None" if rng.random() < 0.05 else str(rng.randint(-10**9, 10**11))
+        out.append(row)
+    return out
+
+
+def _payloads(years: int) -> Dict[str, Dict[str, Any]]:
+    annual = [f"{2024 - i}-12-31" for i in range(years)]
+    quarterly = [f"{2024 - i // 4}-{(12, 9, 6, 3)[i % 4]:02d}-{(31, 30, 30, 31)[i % 4]}" for i in range(years * 4)]
+    payloads = {}
+    for name, fields in (("income_statement", fundamental_data._IS_FIELDS), ("balance_sheet", fundamental_data._BS_FIELDS),
+                         ("cash_flow", fundamental_data._CF_FIELDS)):
+        payloads[name] = {"annualReports": _reports(annual, fields), "quarterlyReports": _reports(quarterly, fields)}
+    payloads["earnings"] = {
+        "annualEarnings": _reports(annual, fundamental_data._ER_ANNUAL_FIELDS),
+        "quarterlyEarnings": _reports(quarterly, fundamental_data._ER_QUARTERLY_FIELDS),
+    }
+    return payloads
+
+
+def _columns_to_rows(table: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Columnar output as period dicts, without the None placeholders."""
+    return [
+        {name: values[i] for name, values in table.items() if values[i] is not None}
+        for i in range(len(table["fiscalDateEnding"]))
+    ]
+
+
+def _check(args: tuple):
+    rows = fundamental_data._merge_reports(*args)
+    columns = fundamental_data._merge_reports(*args, columnar=True)
+    assert all(v is not None for k in ("annual", "quarterly") for r in rows[k] for v in r.values()), "row output has nulls"
+    assert all(rows[k] == _columns_to_rows(columns[k]) for k in ("annual", "quarterly")), "outputs differ"
+
+
+def _bench(label: str, args: tuple, repeat: int = 100, rounds: int = 7, **kwargs) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fundamental_data._merge_reports(*args, **kwargs)
+        timings.append((time.perf_counter() - start) / repeat * 1000)
+    elapsed_ms = min(timings)  # best round; the machine's noise only ever adds time
+    print(f"{label:<20}{elapsed_ms:>10.3f} ms")
+    return elapsed_ms
+
+
+if __name__ == "__main__":
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    payloads = _payloads(years)
+    for title, args in (
+        (f"default request: 5 years + 4 quarters of {years} years", ("BENCH", payloads, 2020, 2024, 4)),
+        (f"full history: {years} years + {years * 4} quarters", ("BENCH", payloads, 2024 - years + 1, 2024, years * 4)),
+    ):
+        _check(args)
+        print(f"{title} (outputs match)")
+        _bench("row output", args)
+        _bench("columnar output", args, columnar=True)
+        sizes = [len(json.dumps(fundamental_data._merge_reports(*args, columnar=c))) for c in (False, True)]
+        print(f"payload             {sizes[0]:>10,d} bytes (rows), {sizes[1]:,d} bytes (columnar)")
@@ -1,8 +1,16 @@
 from mcp.server.fastmcp import FastMCP
 from typing import List, Optional
-import requests
+import httpx
 import asyncio
+import time
+from itertools import takewhile
 from datetime import datetime, timezone
+from disk_cache import DiskCache
+from http_client import LoopLocalClient
+from news_index import NewsIndex, url_key
+from news_ranking import rank_and_pack, trim_text
+from output_governor import govern_output, read_output
+from rate_limiter import INTERACTIVE, TransientError, async_call_with_retry, raise_for_throttle
 
 # Create the MCP server with a meaningful name
 mcp = FastMCP("TickertickMCP")
@@ -10,24 +18,198 @@ mcp = FastMCP("TickertickMCP")
 # Setup API endpoints
 FEED_URL = 'https://api.tickertick.com/feed'
 TICKERS_URL = 'https://api.tickertick.com/tickers'
-RATE_LIMIT = 10  # 10 requests per minute limit
+RATE_LIMIT = 10  # 10 requests per minute, enforced by the "tickertick" sliding window shared across processes
+REQUEST_TIMEOUT = 15
 
-def get_feed(query, limit=30, last_id=None):
-    """Get feed data from Tickertick API"""
-    url = f"{FEED_URL}?q={query}"
-    
-    if limit:
-        url += f"&n={limit}"
-    
+_http = LoopLocalClient(timeout=REQUEST_TIMEOUT, limits=httpx.Limits(max_connections=4, max_keepalive_connections=4))
+
+async def _request(url, params, priority=INTERACTIVE):
+    """GET a Tickertick endpoint within the shared rate limit, retrying throttled or failed requests."""
+    async def send():
+        response = await _http.get().get(url, params=params)
+        raise_for_throttle("Tickertick", response.status_code, response.headers)
+        return response
+    return await async_call_with_retry(
+        "tickertick", send, priority=priority, retries=2,
+        retry_on=(TransientError, httpx.TransportError),
+    )
+
+### Story store
+# Stories never change once published, so every story seen is kept on disk (keyed by id, with
+# an index by canonical URL) for STORY_TTL_DAYS. Each feed query remembers the ids it returned
+# newest first; a repeated query within FEED_TTL_SECONDS is served locally, and an older one only
+# pulls the stories published since, paging back with `last` until it reaches a known story.
+# Stories already returned by this server process (one agent run) are not returned again.
+STORY_TTL_DAYS = 7
+FEED_TTL_SECONDS = 10 * 60
+REFRESH_PAGE = 10 # page size when checking a known feed for new stories
+MAX_FEED_IDS = 200
+
+_store = DiskCache("tickertick_stories")
+_purged = False
+_returned: set = set() # story ids and URL keys returned in this run
+
+def _url_key(url):
+    key = url_key(url)
+    return "url:" + key if key else None
+
+async def _fetch_page(query, limit, last_id=None, priority=INTERACTIVE):
+    """One page of raw stories (times in ms), newest first."""
+    params = {"q": query, "n": limit}
     if last_id:
-        url += f"&last={last_id}"
-        
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        return convert_timestamp_ms_to_iso(data)
+        params["last"] = last_id
+    response = await _request(FEED_URL, params, priority)
+    if response.status_code != 200:
+        raise RuntimeError(f"API request failed with status code {response.status_code}")
+    return response.json().get("stories", [])
+
+def _remember(stories):
+    global _purged
+    if not _purged:
+        _store.purge(STORY_TTL_DAYS * 86400)
+        _purged = True
+    entries = {f"story:{s['id']}": s for s in stories}
+    entries.update({_url_key(s.get("url")): s["id"] for s in stories if s.get("url")})
+    if entries:
+        _store.set_many(entries)
+
+async def _feed_stories(query, limit, last_id=None):
+    """The newest `limit` stories of a feed (or those older than `last_id`), fetching only what the store lacks."""
+    if last_id: # explicit paging
+        stories = await _fetch_page(query, limit, last_id)
+        _remember(stories)
+        return stories
+
+    key = f"feed:{query}"
+    entry = _store.get(key)
+    state = entry.value if entry else {"ids": [], "exhausted": False}
+    known = state["ids"]
+    if entry and time.time() - entry.fetched_at < FEED_TTL_SECONDS and (len(known) >= limit or state["exhausted"]):
+        fetched = {}
     else:
-        return {"error": f"API request failed with status code {response.status_code}"}
+        known_ids = set(known)
+        page_size = REFRESH_PAGE if known else limit
+        new, cursor, reached_known = [], None, False
+        while True:
+            page = await _fetch_page(query, page_size, cursor)
+            fresh = list(takewhile(lambda s: s["id"] not in known_ids, page))
+            new += fresh
+            reached_known = len(fresh) < len(page) # the page runs into a stored story
+            if reached_known or len(page) < page_size or len(new) >= limit:
+                break
+            cursor = page[-1]["id"]
+        if known and not reached_known:
+            # More new stories than requested: the stored list no longer joins up with them
+            state = {"ids": [], "exhausted": False}
+        ids = [s["id"] for s in new] + state["ids"]
+        exhausted = state["exhausted"] or (not known and len(new) < page_size)
+        if len(ids) < limit and ids and not exhausted: # asked for more than we have: page back from the oldest
+            wanted = limit - len(ids)
+            older = await _fetch_page(query, wanted, ids[-1])
+            new += older
+            ids += [s["id"] for s in older]
+            exhausted = len(older) < wanted
+        _remember(new)
+        state = {"ids": ids[:MAX_FEED_IDS], "exhausted": exhausted}
+        _store.set(key, state)
+        fetched = {s["id"]: s for s in new}
+
+    ids = state["ids"][:limit]
+    missing = [f"story:{i}" for i in ids if i not in fetched]
+    stored = {k[len("story:"):]: e.value for k, e in _store.get_many(missing).items()} if missing else {}
+    return [fetched.get(i) or stored[i] for i in ids if i in fetched or i in stored]
+
+### News index
+# Watchlist tickers are polled in the background by news_ingest.py. While every ticker a request
+# asks about was polled within INDEX_MAX_AGE_SECONDS, the request is answered from the index
+# without calling Tickertick; otherwise it falls through to the live feed.
+INDEX_MAX_AGE_SECONDS = 15 * 60
+
+_index = NewsIndex()
+
+def _iso_ms(timestamp_ms):
+    return datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc).isoformat() if timestamp_ms else None
+
+def _index_freshness(tickers):
+    """Freshness metadata if the index can answer for all `tickers`, else None."""
+    state = _index.freshness(tickers)
+    if len(state) < len({t.lower() for t in tickers}):
+        return None
+    polled_at = min(entry["polled_at"] or 0.0 for entry in state.values())
+    age = time.time() - polled_at
+    if age > INDEX_MAX_AGE_SECONDS:
+        return None
+    freshness = {
+        "source": "index",
+        "polled_at": datetime.fromtimestamp(polled_at, timezone.utc).isoformat(),
+        "age_seconds": round(age),
+        "newest_story": _iso_ms(max(entry["newest"] or 0 for entry in state.values())),
+    }
+    backfilling = sorted(t for t, entry in state.items() if entry["backfilling"])
+    if backfilling: # some older stories of these tickers are not in the index yet
+        freshness["backfilling"] = backfilling
+    errors = {f"{t}:{p}": e for t, entry in state.items() for p, e in entry["errors"].items()}
+    if errors:
+        freshness["provider_errors"] = errors
+    return freshness
+
+def _story_keys(story):
+    return {story["id"], _url_key(story.get("url"))} - {None}
+
+def _slim_story(story):
+    return {
+        "id": story["id"],
+        "title": story.get("title"),
+        "site": story.get("site"),
+        "url": story.get("url"),
+        "time": story.get("time"),
+        "tickers": story.get("tickers"),
+        "description": trim_text(story.get("description")),
+    }
+
+async def get_feed(query, limit=30, last_id=None, tickers=(), indexed=False):
+    """
+    Get feed data from Tickertick API (or the local news index), ranked and packed into the news token budget.
+
+    With `indexed`, the feed is about `tickers` and is answered from the news index when it is
+    fresh for all of them; 'freshness' in the response says where the stories came from.
+    Stories already returned in this run are left out; the rest are ranked by ticker match,
+    recency and source quality, near-duplicates are collapsed, and the best stories that fit
+    NEWS_TOKEN_BUDGET are returned with their main fields only.
+    """
+    freshness = _index_freshness(tickers) if indexed and tickers else None
+    if freshness:
+        stories = _index.query(tickers, limit, before_id=last_id)
+    else:
+        freshness = {"source": "tickertick"}
+        try:
+            stories = await _feed_stories(query, limit, last_id)
+        except (TransientError, httpx.HTTPError, RuntimeError) as e:
+            return {"error": f"API request failed: {e}"}
+
+    unseen = [s for s in stories if not _story_keys(s) & _returned]
+    ranked = rank_and_pack(
+        unseen,
+        title=lambda s: s.get("title"),
+        url=lambda s: s.get("url"),
+        published=lambda s: s["time"] / 1000 if s.get("time") else None,
+        tickers=tickers,
+        item_tickers=lambda s: s.get("tickers"),
+        related=lambda s: s.get("similar_stories"),
+        key=lambda s: s["id"],
+        slim=_slim_story,
+    )
+    for group in ranked["groups"]: # a collapsed near-duplicate counts as returned too
+        for story in group:
+            _returned.update(_story_keys(story))
+
+    response = {"stories": ranked["items"], "last_id": stories[-1]["id"] if stories else None, "freshness": freshness}
+    if len(stories) > len(unseen):
+        response["duplicates_omitted"] = len(stories) - len(unseen)
+    over_budget = len(unseen) - sum(map(len, ranked["groups"]))
+    if over_budget:
+        response["over_budget"] = over_budget # lower ranked stories left out; a repeat call returns them
+    return convert_timestamp_ms_to_iso(response)
     
 def convert_timestamp_ms_to_iso(response):
     """Convert timestamp in milliseconds to ISO format"""
@@ -37,50 +219,54 @@ def convert_timestamp_ms_to_iso(response):
             story['time'] = datetime.fromtimestamp(timestamp_sec, timezone.utc).isoformat()
     return response
 
-def get_ticker_news(ticker, limit=30):
+async def get_ticker_news(ticker, limit=30):
     """Get news for a specific ticker"""
     query = f"z:{ticker}"
-    return get_feed(query, limit)
+    # Not indexed: the index is filled from broad (tt:) polling, which includes passing mentions
+    return await get_feed(query, limit, tickers=[ticker])
 
-def get_broad_ticker_news(ticker, limit=30):
+async def get_broad_ticker_news(ticker, limit=30):
     """Get broader news for a specific ticker"""
     query = f"tt:{ticker}"
-    return get_feed(query, limit)
+    return await get_feed(query, limit, tickers=[ticker], indexed=True)
 
-def get_news_from_source(source, limit=30):
+async def get_news_from_source(source, limit=30):
     """Get news from a specific source"""
     query = f"s:{source}"
-    return get_feed(query, limit)
+    return await get_feed(query, limit)
 
-def get_news_for_multiple_tickers(tickers, limit=30):
+async def get_news_for_multiple_tickers(tickers, limit=30):
     """Get news for multiple tickers"""
     ticker_terms = [f"tt:{ticker}" for ticker in tickers]
     query = f"(or {' '.join(ticker_terms)})"
-    return get_feed(query, limit)
+    return await get_feed(query, limit, tickers=tickers, indexed=True)
 
-def get_curated_news(limit=30):
+async def get_curated_news(limit=30):
     """Get curated news from top financial/technology sources"""
     query = "T:curated"
-    return get_feed(query, limit)
+    return await get_feed(query, limit)
 
-def get_entity_news(entity, limit=30):
+async def get_entity_news(entity, limit=30):
     """Get news about a specific entity"""
     # Replace spaces with underscores as required by the API
     entity = entity.lower().replace(" ", "_")
     query = f"E:{entity}"
-    return get_feed(query, limit)
+    return await get_feed(query, limit)
 
-def search_tickers(query, limit=5):
+async def search_tickers(query, limit=5):
     """Search for tickers matching the query"""
-    url = f"{TICKERS_URL}?p={query}&n={limit}"
-    response = requests.get(url)
+    try:
+        response = await _request(TICKERS_URL, {"p": query, "n": limit})
+    except (TransientError, httpx.HTTPError) as e:
+        return {"error": f"API request failed: {e}"}
     if response.status_code == 200:
         return response.json()
     else:
         return {"error": f"API request failed with status code {response.status_code}"}
 
 @mcp.tool()
-def get_ticker_news_tool(ticker: str, limit: int = 10) -> dict:
+@govern_output()
+async def get_ticker_news_tool(ticker: str, limit: int = 10) -> dict:
     """
     Get news for a specific ticker symbol.
     
@@ -89,12 +275,14 @@ def get_ticker_news_tool(ticker: str, limit: int = 10) -> dict:
         limit: Maximum number of news items to return (default: 10, max: 50)
         
     Returns:
-        A dictionary containing news items related to the ticker
+        A dictionary containing news items related to the ticker; stories already returned earlier in this run
+        are left out and counted in 'duplicates_omitted'
     """
-    return get_ticker_news(ticker, limit)
+    return await get_ticker_news(ticker, limit)
 
 @mcp.tool()
-def get_broad_ticker_news_tool(ticker: str, limit: int = 10) -> dict:
+@govern_output()
+async def get_broad_ticker_news_tool(ticker: str, limit: int = 10) -> dict:
     """
     Get broader news for a specific ticker symbol.
     
@@ -103,12 +291,15 @@ def get_broad_ticker_news_tool(ticker: str, limit: int = 10) -> dict:
         limit: Maximum number of news items to return (default: 10, max: 50)
         
     Returns:
-        A dictionary containing broader news items related to the ticker
+        A dictionary containing broader news items related to the ticker; stories already returned earlier in this run
+        are left out and counted in 'duplicates_omitted'. 'freshness' says whether the stories come from the local
+        news index (and how old it is) or from Tickertick
     """
-    return get_broad_ticker_news(ticker, limit)
+    return await get_broad_ticker_news(ticker, limit)
 
 @mcp.tool()
-def get_news_from_source_tool(source: str, limit: int = 10) -> dict:
+@govern_output()
+async def get_news_from_source_tool(source: str, limit: int = 10) -> dict:
     """
     Get news from a specific source.
     
@@ -117,12 +308,14 @@ def get_news_from_source_tool(source: str, limit: int = 10) -> dict:
         limit: Maximum number of news items to return (default: 10, max: 50)
         
     Returns:
-        A dictionary containing news items from the specified source
+        A dictionary containing news items from the specified source; stories already returned earlier in this run
+        are left out and counted in 'duplicates_omitted'
     """
-    return get_news_from_source(source, limit)
+    return await get_news_from_source(source, limit)
 
 @mcp.tool()
-def get_news_for_multiple_tickers_tool(tickers: List[str], limit: int = 10) -> dict:
+@govern_output()
+async def get_news_for_multiple_tickers_tool(tickers: List[str], limit: int = 10) -> dict:
     """
     Get news for multiple ticker symbols.
     
@@ -131,12 +324,15 @@ def get_news_for_multiple_tickers_tool(tickers: List[str], limit: int = 10) -> d
         limit: Maximum number of news items to return (default: 10, max: 50)
         
     Returns:
-        A dictionary containing news items related to any of the specified tickers
+        A dictionary containing news items related to any of the specified tickers; stories already returned earlier in this run
+        are left out and counted in 'duplicates_omitted'. 'freshness' says whether the stories come from the local
+        news index (and how old it is) or from Tickertick
     """
-    return get_news_for_multiple_tickers(tickers, limit)
+    return await get_news_for_multiple_tickers(tickers, limit)
 
 @mcp.tool()
-def get_curated_news_tool(limit: int = 10) -> dict:
+@govern_output()
+async def get_curated_news_tool(limit: int = 10) -> dict:
     """
     Get curated news from top financial/technology sources. This can be helpful to get a broad overview of the market.
     
@@ -144,12 +340,14 @@ def get_curated_news_tool(limit: int = 10) -> dict:
         limit: Maximum number of news items to return (default: 10, max: 50)
         
     Returns:
-        A dictionary containing curated news items
+        A dictionary containing curated news items; stories already returned earlier in this run
+        are left out and counted in 'duplicates_omitted'
     """
-    return get_curated_news(limit)
+    return await get_curated_news(limit)
 
 @mcp.tool()
-def get_entity_news_tool(entity: str, limit: int = 10) -> dict:
+@govern_output()
+async def get_entity_news_tool(entity: str, limit: int = 10) -> dict:
     """
     Get news about a specific entity (person, etc.)
     
@@ -158,12 +356,14 @@ def get_entity_news_tool(entity: str, limit: int = 10) -> dict:
         limit: Maximum number of news items to return (default: 10, max: 50)
         
     Returns:
-        A dictionary containing news items related to the entity
+        A dictionary containing news items related to the entity; stories already returned earlier in this run
+        are left out and counted in 'duplicates_omitted'
     """
-    return get_entity_news(entity, limit)
+    return await get_entity_news(entity, limit)
 
 @mcp.tool()
-def search_tickers_tool(query: str, limit: int = 5) -> dict:
+@govern_output()
+async def search_tickers_tool(query: str, limit: int = 5) -> dict:
     """
     Search for tickers matching the query.
     
@@ -174,7 +374,28 @@ def search_tickers_tool(query: str, limit: int = 5) -> dict:
     Returns:
         A dictionary containing matching ticker symbols
     """
-    return search_tickers(query, limit)
+    return await search_tickers(query, limit)
+
+@mcp.tool()
+@govern_output()
+async def read_tool_output(handle: str, path: Optional[str] = None, offset: int = 0) -> dict:
+    """
+    Read the part of a tool result that was cut to fit the output budget (any tool whose result was
+    too large returns it shortened, with a 'truncated' field naming what was cut and a handle).
+
+    Args:
+        handle: The 'handle' from the 'truncated' field of the cut-down result.
+        path: Where to read, as dot-separated keys and list indexes (e.g. 'transcript' or
+              'annual.3'); the paths of cut values are listed in 'truncated.omitted'. Defaults to
+              the whole result.
+        offset: First list item, table row or character to return (default: 0). Pass the
+                'next_offset' of the previous call to continue.
+
+    Returns:
+        A dictionary with 'value' (the items, rows or text from `offset` that fit in one response),
+        'total_items' or 'total_chars', and 'next_offset' (None when nothing is left)
+    """
+    return await asyncio.to_thread(read_output, handle, path, offset)
 
 # Add this to run the server with stdio transport when executed directly
 if __name__ == "__main__":
@@ -547,4 +547,67 @@ def get_combined_signals(df: pd.DataFrame) -> Dict[str, Any]:
             "bullish_score": round(bullish_score, 2),
             "bearish_score": round(bearish_score, 2)
         }
-    }
\ No newline at end of file
+    }
+
+def latest_ema(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Latest EMA (span=period, adjust=False) of every column of a 2-D array
+    
+    Iterates over rows instead of columns, which is much faster than DataFrame.ewm
+    for wide panels. Each column starts at its first non-NaN value.
+    """
+    alpha = 2 / (period + 1)
+    ema = values[0].astype(float)
+    for row in values[1:]:
+        ema = np.where(np.isnan(ema), row, alpha * row + (1 - alpha) * ema)
+    return ema
+
+def calculate_universe_metrics(
+    close: pd.DataFrame,
+    volume: pd.DataFrame,
+    return_window: int = 5,
+    volume_window: int = 20,
+    volatility_window: int = 20
+) -> pd.DataFrame:
+    """
+    Calculate screening metrics for every ticker of a price panel at once
+    
+    Args:
+        close: DataFrame of closing prices indexed by date (ascending) with one column per ticker
+        volume: DataFrame of volumes aligned with `close`
+        return_window: Number of bars for the trailing return
+        volume_window: Number of prior bars the latest volume is compared against
+        volatility_window: Number of bars for volatility and the price Z-score
+    
+    Returns:
+        DataFrame indexed by ticker with the latest value of each metric:
+        close, return_pct, volume_ratio, avg_dollar_volume, volatility_pct,
+        zscore, trend_score (-1 to 1, EMA 8/21/55 alignment) and momentum_rank (0-1, cross-sectional)
+    """
+    bars = len(close)
+    return_window = max(1, min(return_window, bars - 1))
+    volume_window = max(1, min(volume_window, bars - 1))
+    volatility_window = max(2, min(volatility_window, bars))
+    
+    last_close = close.iloc[-1]
+    returns = close.pct_change(fill_method=None)
+    metrics = pd.DataFrame(index=close.columns)
+    metrics['close'] = last_close
+    metrics['return_pct'] = (last_close / close.iloc[-1 - return_window] - 1) * 100
+    metrics['volume_ratio'] = volume.iloc[-1] / volume.iloc[-1 - volume_window:-1].mean()
+    metrics['avg_dollar_volume'] = (close * volume).iloc[-volume_window:].mean()
+    metrics['volatility_pct'] = returns.iloc[-volatility_window:].std() * np.sqrt(252) * 100
+    
+    # Z-score of the latest close against its recent mean (mean reversion view)
+    window = close.iloc[-volatility_window:]
+    metrics['zscore'] = (last_close - window.mean()) / window.std()
+    
+    # EMA alignment: +1 when 8 > 21 > 55, -1 when 8 < 21 < 55 (trend following view)
+    filled = close.ffill().to_numpy()
+    ema8, ema21, ema55 = (latest_ema(filled, period) for period in (8, 21, 55))
+    metrics['trend_score'] = (np.sign(ema8 - ema21) + np.sign(ema21 - ema55)) / 2
+    
+    # Cross-sectional percentile of the trailing return (momentum view)
+    metrics['momentum_rank'] = rank_normalize(metrics['return_pct'])
+    
+    return metrics.replace([np.inf, -np.inf], np.nan)
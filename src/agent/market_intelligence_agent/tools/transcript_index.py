@@ -0,0 +1,114 @@
+"""
+Speaker-turn chunking and BM25 passage retrieval for earnings call transcripts.
+
+A transcript is split into one passage per speaker turn; long turns (prepared remarks)
+are split further at sentence boundaries so that every passage stays under
+MAX_PASSAGE_WORDS. Passages are ranked with Okapi BM25 over lower-cased word tokens, which
+needs no model or external service and indexes a full call in a few milliseconds.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+MAX_PASSAGE_WORDS = 180
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_STOPWORDS = frozenset(
+    "a about above after again all also am an and any are as at be because been being below between both but by "
+    "can could did do does doing down during each few for from further had has have having he her here hers him "
+    "his how i if in into is it its itself just me more most my no nor not now of off on once only or other our "
+    "ours out over own same she should so some such than that the their theirs them then there these they this "
+    "those through to too under until up very was we were what when where which while who whom why will with "
+    "would you your yours thank thanks think know really quarter question".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens without stopwords; trailing plural 's' is stripped."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def chunk_transcript(turns: Sequence[Dict[str, Any]], max_words: int = MAX_PASSAGE_WORDS) -> List[Dict[str, Any]]:
+    """
+    Split transcript turns ({"speaker", "title", "content", ...}) into passages.
+
+    Each passage keeps its speaker, title and the index of the turn it came from. Turns longer
+    than `max_words` are cut at sentence boundaries (a single over-long sentence stays whole).
+    """
+    passages: List[Dict[str, Any]] = []
+    for turn_index, turn in enumerate(turns):
+        content = (turn.get("content") or "").strip()
+        if not content:
+            continue
+        base = {"turn": turn_index, "speaker": turn.get("speaker"), "title": turn.get("title")}
+        if len(content.split()) <= max_words:
+            passages.append({**base, "text": content})
+            continue
+        current: List[str] = []
+        words = 0
+        for sentence in _SENTENCE_RE.split(content):
+            length = len(sentence.split())
+            if current and words + length > max_words:
+                passages.append({**base, "text": " ".join(current)})
+                current, words = [], 0
+            current.append(sentence)
+            words += length
+        if current:
+            passages.append({**base, "text": " ".join(current)})
+    return passages
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents."""
+
+    def __init__(self, documents: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+        postings: Dict[str, Tuple[List[int], List[int]]] = defaultdict(lambda: ([], []))
+        lengths = np.zeros(self.size)
+        for doc_id, text in enumerate(documents):
+            counts = Counter(tokenize(text))
+            lengths[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                docs, tfs = postings[term]
+                docs.append(doc_id)
+                tfs.append(tf)
+        average = lengths.mean() if self.size and lengths.mean() > 0 else 1.0
+        self._norm = k1 * (1 - b + b * lengths / average)
+        self._postings = {term: (np.array(docs), np.array(tfs, dtype=float)) for term, (docs, tfs) in postings.items()}
+
+    def _idf(self, term: str) -> float:
+        df = len(self._postings[term][0])
+        return math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for the query (0 for documents sharing no term)."""
+        scores = np.zeros(self.size)
+        for term in set(tokenize(query)):
+            if term not in self._postings:
+                continue
+            docs, tfs = self._postings[term]
+            scores[docs] += self._idf(term) * tfs * (self.k1 + 1) / (tfs + self._norm[docs])
+        return scores
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float]]:
+        """Indices and scores of the `top_k` best matching documents, best first; non-matches are left out."""
+        scores = self.scores(query)
+        top_k = max(0, min(top_k, self.size))
+        if top_k == 0:
+            return []
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.lexsort((best, -scores[best]))] # ties keep transcript order
+        return [(int(i), float(scores[i])) for i in best if scores[i] > 0]